@@ -10,59 +10,600 @@
 '''
 
 
-import dms_tasks_config as config
+import dms_tasks_config
 import sys
 import json
+import asyncio
+import bisect
 import boto3
+import collections
+import contextlib
+import contextvars
+import copy
+import datetime
+import fnmatch
+import functools
+import hashlib
+import heapq
 import logging
-from botocore.exceptions import ClientError
+import math
+import os
+import random
+import re
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import BotoCoreError, ClientError
 
-logging.basicConfig(filename=config.dms_op_log_filepath, filemode='w', format='%(asctime)s - %(message)s', level=logging.INFO)
-logging.info('Process Started..')
-print('Process Started..')
+# num_arg = len(sys.argv) - 1
 
-dms_client = boto3.client('dms', region_name=config.aws_region)
+# Error codes returned by AWS when the API rate limit is exceeded
+THROTTLING_ERROR_CODES = ('Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequestsException')
 
-# num_arg = len(sys.argv) - 1
+# Upper bounds (in seconds) of the buckets of the API latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
 
-# Initializing the variables
-old_src_end_point_arn = ''
-cnt = 0
-dict_src_arns = {}
-dict_tgt_arns = {}
-tsk_exists = 'N'
+# Configuration values, DMS and CloudWatch clients overridden for the fan-out job running in the current context
+job_overrides = contextvars.ContextVar('job_overrides', default=None)
+job_client = contextvars.ContextVar('job_client', default=None)
+job_cloudwatch_client = contextvars.ContextVar('job_cloudwatch_client', default=None)
 
+# Rules of the configuration compiled for the run or the fan-out job running in the current context
+job_rules = contextvars.ContextVar('job_rules', default=None)
 
-# Function to count the creation of tasks
-def counter(read='N'):
-    global cnt
-    if read == 'Y':
-        return cnt
-    else:
-        cnt = cnt + 1
+# (semaphore, AdaptiveThrottle) shared by the DMS API calls of all the fan-out jobs of the region of the current context
+job_api_limits = contextvars.ContextVar('job_api_limits', default=None)
 
-    return cnt
+# DMS client used when no fan-out job is running, created by init_dms_client() or injected by the caller of main()
+default_dms_client = None
 
+# CloudWatch client used by the comparison mode and the start scheduler, created by init_cloudwatch_client() or injected
+# by the caller of main()
+cloudwatch_client = None
 
-# Function to check the validity of the Endpoint
-def check_endpoint_arn(ReplicationInstanceArn, EndpointArn):
+# boto3 DMS and CloudWatch clients shared by the fan-out jobs of each region
+regional_clients = {}
+regional_cloudwatch_clients = {}
+regional_api_limits = {}
+regional_clients_lock = threading.Lock()
+
+
+# Class giving the configuration of dms_tasks_config.py, as overridden by the fan-out job of the current context
+class JobConfig:
+
+    def __getattr__(self, name):
+        overrides = job_overrides.get()
+        if overrides is not None and name in overrides:
+            return overrides[name]
+
+        return getattr(dms_tasks_config, name)
+
+    def __setattr__(self, name, value):
+        setattr(dms_tasks_config, name, value)
+
+
+# Class giving the DMS client of the fan-out job of the current context, or the default client of the run
+class JobClient:
+
+    def __getattr__(self, name):
+        return getattr(job_client.get() or default_dms_client, name)
+
+
+config = JobConfig()
+dms_client = JobClient()
+
+
+# Class adding the region and replication instance of the current fan-out job to the log lines
+class JobLogFilter(logging.Filter):
+
+    def filter(self, record):
+        overrides = job_overrides.get()
+        if overrides is not None and 'job_name' in overrides:
+            record.msg = '[{0}] {1}'.format(overrides['job_name'], record.msg)
+        return True
+
+
+# Function to set up the log file of the run
+def init_logging():
+    logging.basicConfig(filename=config.dms_op_log_filepath, filemode='w', format='%(asctime)s - %(message)s', level=logging.INFO)
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(JobLogFilter())
+    logging.info('Process Started..')
+    print('Process Started..')
+
+
+# Function to set the DMS client used by the script. Any object exposing the boto3 DMS client interface can be injected,
+# otherwise a boto3 client is created for the configured region
+def init_dms_client(client=None):
+    global default_dms_client
+    default_dms_client = client or boto3.client('dms', region_name=config.aws_region)
+
+    return default_dms_client
+
+
+# Function to set the CloudWatch client used by the comparison mode and the start scheduler, injected or created for
+# the configured region
+def init_cloudwatch_client(client=None):
+    global cloudwatch_client
+    cloudwatch_client = client or boto3.client('cloudwatch', region_name=config.aws_region)
+
+    return cloudwatch_client
+
+
+# Function to get the boto3 DMS client of a region, created once and shared by all the fan-out jobs of the region with a
+# connection pool sized for them
+def get_regional_dms_client(region):
+    with regional_clients_lock:
+        if region not in regional_clients:
+            regional_clients[region] = boto3.client(
+                'dms', region_name=region, config=BotoConfig(max_pool_connections=config.fanout_max_pool_connections))
+
+        return regional_clients[region]
+
+
+# Function to get the boto3 CloudWatch client of a region, created once and shared by all the fan-out jobs of the region
+def get_regional_cloudwatch_client(region):
+    with regional_clients_lock:
+        if region not in regional_cloudwatch_clients:
+            regional_cloudwatch_clients[region] = boto3.client(
+                'cloudwatch', region_name=region, config=BotoConfig(max_pool_connections=config.fanout_max_pool_connections))
+
+        return regional_cloudwatch_clients[region]
+
+
+# Function to get the CloudWatch client of the fan-out job of the current context, or the CloudWatch client of the run
+def get_cloudwatch_client():
+    return job_cloudwatch_client.get() or cloudwatch_client
+
+
+# Function to get the limits of the DMS API calls of a region, created once and shared by all the fan-out jobs of the
+# region : at most fanout_max_api_concurrency calls in flight and one adaptive throttle backing off all of them
+def get_regional_api_limits(region):
+    with regional_clients_lock:
+        if region not in regional_api_limits:
+            regional_api_limits[region] = (threading.BoundedSemaphore(config.fanout_max_api_concurrency), AdaptiveThrottle())
+
+        return regional_api_limits[region]
+
+
+# Function to submit a function to an executor so that it runs with the configuration and client of the current job
+def submit_in_context(executor, fn, *args, **kwargs):
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+# Version of the layout of the inventory snapshot file
+INVENTORY_SNAPSHOT_VERSION = 2
+
+# Attributes of a task, as listed without its settings, which tell whether the task changed since the snapshot
+TASK_SIGNATURE_FIELDS = ('ReplicationTaskIdentifier', 'Status', 'SourceEndpointArn', 'TargetEndpointArn',
+                         'ReplicationInstanceArn', 'MigrationType', 'ReplicationTaskStartDate', 'StopReason')
+
+# Statuses in which DMS refuses to modify a task. The table mappings and settings of a task found in one of them, with
+# the signature of the snapshot, cannot have changed since the snapshot as any modification needs a stop and a restart
+UNMODIFIABLE_TASK_STATUSES = ('running', 'starting')
+
+# Attributes of a task which make its clone : the watch mode clones a task again when the digest of these changes, and
+# not when the task is only started or stopped
+WATCH_SIGNATURE_FIELDS = ('ReplicationTaskIdentifier', 'SourceEndpointArn', 'TargetEndpointArn', 'ReplicationInstanceArn',
+                          'MigrationType', 'TableMappings', 'ReplicationTaskSettings')
+
+# Fields of a plan entry sent to create_replication_task
+CREATE_TASK_FIELDS = ('ReplicationTaskIdentifier', 'SourceEndpointArn', 'TargetEndpointArn', 'ReplicationInstanceArn',
+                      'MigrationType', 'TableMappings', 'ReplicationTaskSettings')
+
+# Configuration values which can be set per job in fanout_jobs
+FANOUT_JOB_KEYS = ('aws_region', 'replication_instance_arn', 'replication_instance_id', 'src_endpoint_transforms',
+                   'tgt_endpoint_transforms', 'use_arn_db_transforms', 'use_specific_tasks', 'task_names',
+                   'change_replication_instance', 'new_replication_inst_arn', 'replicationtaskid_prefix',
+                   'task_rename_rules')
+
+# Number of vCPUs of the replication instance sizes
+INSTANCE_SIZE_VCPUS = {'micro': 1, 'small': 1, 'medium': 2, 'large': 2, 'xlarge': 4, '2xlarge': 8, '4xlarge': 16,
+                       '8xlarge': 32, '9xlarge': 36, '12xlarge': 48, '16xlarge': 64, '18xlarge': 72, '24xlarge': 96}
+
+# Memory (GiB) per vCPU of the replication instance families, by the first letter of the family
+INSTANCE_FAMILY_MEMORY_PER_VCPU = {'c': 2, 'r': 8}
+
+# Relative load of the migration types
+MIGRATION_TYPE_LOAD = {'full-load': 1.0, 'cdc': 0.5, 'full-load-and-cdc': 1.5}
+
+# Version of the layout of the plan file
+PLAN_VERSION = 1
+
+# Settings of the configuration the plan entries are built from. A plan made with other values of any of them is not
+# resumed
+PLAN_CONFIG_SETTINGS = ('replicationtaskid_prefix', 'use_arn_db_transforms', 'src_endpoint_transforms',
+                        'tgt_endpoint_transforms', 'task_rename_rules', 'change_replication_instance',
+                        'new_replication_inst_arn', 'use_instance_pool', 'replication_instance_pool',
+                        'full_load_placement_round', 'task_load_source', 'pattern_rule_table_estimate',
+                        'use_task_sharding', 'task_shard_counts', 'table_stats_source', 'table_stats_file',
+                        'task_settings_profiles', 'default_task_settings_profile', 'task_settings_profile_rules',
+                        'enable_logging')
+
+# Prefix marking a rule key of the configuration as a regular expression instead of a glob
+REGEX_RULE_PREFIX = 're:'
+
+# Rules renaming the cloned tasks when task_rename_rules is None : (task name pattern, text to replace, replacement)
+DEFAULT_TASK_RENAME_RULES = [('non-prod*', 'non-prod-', ''), ('prod-*', 'prod-', '')]
+
+# CloudWatch metrics of the DMS tasks collected by the comparison mode
+COMPARISON_METRICS = ('CDCLatencySource', 'CDCLatencyTarget', 'CDCThroughputRowsTarget')
+
+# Maximum number of queries accepted by one CloudWatch GetMetricData call
+MAX_METRIC_DATA_QUERIES = 500
+
+# CloudWatch metrics telling whether a started CDC only task has caught up, and the window (in seconds) they are read in
+CDC_LATENCY_METRICS = ('CDCLatencySource', 'CDCLatencyTarget')
+CDC_LATENCY_WINDOW = 900
+
+# Verdicts of the connection tests of the run, keyed by (ReplicationInstanceArn, EndpointArn)
+connection_verdicts = {}
+
+# Table sizes read during the run, keyed by the statistics file or by the ReplicationTaskArn they were described for
+table_sizes_cache = {}
+
+# Actions of the selection rules which select tables for a task
+SELECTING_RULE_ACTIONS = ('include', 'explicit')
+
+
+# Class to adapt the pace of the API calls made by all the workers of a run. Every throttling error doubles the delay
+# applied before the next call and every successful call halves it again
+class AdaptiveThrottle:
+
+    def __init__(self, base_delay=None, max_delay=None):
+        self.base_delay = config.throttle_base_delay if base_delay is None else base_delay
+        self.max_delay = config.throttle_max_delay if max_delay is None else max_delay
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    # Function to wait for the current delay, jittered so the workers do not retry in lock-step
+    def wait(self):
+        with self.lock:
+            delay = self.delay
+        if delay:
+            time.sleep(random.uniform(delay / 2, delay))
+
+    def throttled(self):
+        with self.lock:
+            self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+
+    def succeeded(self):
+        with self.lock:
+            self.delay = self.delay / 2 if self.delay > self.base_delay else 0.0
+
+
+# Class collecting the metrics of a run : count, errors, retries, throttles, response bytes and latency histogram of
+# every API operation, and the time spent in every phase of the run
+class RunMetrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            self.operations = {}
+            self.phases = {}
+            self.caches = {}
+
+    # Function to get the metrics of one operation, to be called with the lock held
+    def _operation(self, operation_name):
+        if operation_name not in self.operations:
+            self.operations[operation_name] = {'calls': 0, 'errors': 0, 'retries': 0, 'throttles': 0, 'response_bytes': 0,
+                                               'latency_sum': 0.0, 'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+        return self.operations[operation_name]
+
+    # Function to record one attempt of an API call
+    def record_call(self, operation_name, latency, response=None, error_code=None, retry=False):
+        with self.lock:
+            operation = self._operation(operation_name)
+            operation['calls'] += 1
+            operation['latency_sum'] += latency
+            operation['latency_buckets'][bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+            if retry:
+                operation['retries'] += 1
+            if error_code is not None:
+                operation['errors'] += 1
+                if error_code in THROTTLING_ERROR_CODES:
+                    operation['throttles'] += 1
+            if response is not None:
+                response_metadata = response.get('ResponseMetadata', {})
+                operation['retries'] += response_metadata.get('RetryAttempts', 0)
+                operation['response_bytes'] += int(response_metadata.get('HTTPHeaders', {}).get('content-length', 0))
+
+    # Function to record one lookup in a cache of the run
+    def record_cache(self, cache_name, hit):
+        with self.lock:
+            cache = self.caches.setdefault(cache_name, {'hits': 0, 'misses': 0})
+            cache['hits' if hit else 'misses'] += 1
+
+    # Function to time one phase of the run
+    @contextlib.contextmanager
+    def phase(self, phase_name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self.lock:
+                phase = self.phases.setdefault(phase_name, {'count': 0, 'seconds': 0.0})
+                phase['count'] += 1
+                phase['seconds'] += elapsed
+
+    # Function to give the metrics as a JSON serialisable dictionary
+    def as_dict(self):
+        with self.lock:
+            operations = {}
+            for operation_name, operation in sorted(self.operations.items()):
+                operations[operation_name] = dict(operation, latency_sum=round(operation['latency_sum'], 6),
+                                                  latency_buckets=dict(zip([str(bucket) for bucket in LATENCY_BUCKETS] + ['+Inf'],
+                                                                           operation['latency_buckets'])))
+            phases = {phase_name: dict(phase, seconds=round(phase['seconds'], 6))
+                      for phase_name, phase in self.phases.items()}
+
+            caches = {cache_name: dict(cache) for cache_name, cache in self.caches.items()}
+
+            return {'started_at': self.started_at, 'ended_at': time.time(), 'operations': operations, 'phases': phases,
+                    'caches': caches}
+
+    # Function to give the metrics in the Prometheus text exposition format
+    def as_prometheus(self):
+        metrics = self.as_dict()
+        lines = []
+
+        for metric_name, key, help_text in (
+                ('dms_clone_api_calls_total', 'calls', 'API calls made, including retries'),
+                ('dms_clone_api_errors_total', 'errors', 'API calls which returned an error'),
+                ('dms_clone_api_retries_total', 'retries', 'API calls retried'),
+                ('dms_clone_api_throttles_total', 'throttles', 'API calls throttled by the service'),
+                ('dms_clone_api_response_bytes_total', 'response_bytes', 'Bytes received in the API responses')):
+            lines.append('# HELP {0} {1}'.format(metric_name, help_text))
+            lines.append('# TYPE {0} counter'.format(metric_name))
+            for operation_name, operation in metrics['operations'].items():
+                lines.append('{0}{{operation="{1}"}} {2}'.format(metric_name, operation_name, operation[key]))
+
+        lines.append('# HELP dms_clone_api_latency_seconds Latency of the API calls')
+        lines.append('# TYPE dms_clone_api_latency_seconds histogram')
+        for operation_name, operation in metrics['operations'].items():
+            cumulative = 0
+            for bucket, count in operation['latency_buckets'].items():
+                cumulative += count
+                lines.append('dms_clone_api_latency_seconds_bucket{{operation="{0}",le="{1}"}} {2}'.format(
+                    operation_name, bucket, cumulative))
+            lines.append('dms_clone_api_latency_seconds_sum{{operation="{0}"}} {1}'.format(operation_name, operation['latency_sum']))
+            lines.append('dms_clone_api_latency_seconds_count{{operation="{0}"}} {1}'.format(operation_name, operation['calls']))
+
+        lines.append('# HELP dms_clone_phase_duration_seconds Time spent in each phase of the run')
+        lines.append('# TYPE dms_clone_phase_duration_seconds gauge')
+        for phase_name, phase in metrics['phases'].items():
+            lines.append('dms_clone_phase_duration_seconds{{phase="{0}"}} {1}'.format(phase_name, phase['seconds']))
+
+        for metric_name, key, help_text in (
+                ('dms_clone_cache_hits_total', 'hits', 'Documents found in the cache of their transform'),
+                ('dms_clone_cache_misses_total', 'misses', 'Documents transformed as not found in the cache')):
+            lines.append('# HELP {0} {1}'.format(metric_name, help_text))
+            lines.append('# TYPE {0} counter'.format(metric_name))
+            for cache_name, cache in metrics['caches'].items():
+                lines.append('{0}{{cache="{1}"}} {2}'.format(metric_name, cache_name, cache[key]))
+
+        lines.append('# HELP dms_clone_last_run_timestamp_seconds Time the run ended')
+        lines.append('# TYPE dms_clone_last_run_timestamp_seconds gauge')
+        lines.append('dms_clone_last_run_timestamp_seconds {0}'.format(metrics['ended_at']))
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = RunMetrics()
+
+
+# Class caching the transforms of the settings and table mapping documents by their content. The tasks mostly share a
+# few identical documents, hence each unique document is transformed once and all its tasks share the same result. The
+# least recently used results are dropped beyond document_cache_size entries
+class DocumentCache:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = collections.OrderedDict()     # (cache name, sha256 of the document, arguments) -> result
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+
+    # Function to give the result of transform(document, *args), computed only for the first document with this content
+    # and these arguments. Every lookup is recorded in the metrics of the run
+    def transform(self, cache_name, document, transform, *args):
+        key = (cache_name, hashlib.sha256(document.encode()).digest()) + args
+        with self.lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                metrics.record_cache(cache_name, hit=True)
+                return self.results[key]
+
+        result = transform(document, *args)
+        with self.lock:
+            result = self.results.setdefault(key, result)
+            while len(self.results) > config.document_cache_size:
+                self.results.popitem(last=False)
+        metrics.record_cache(cache_name, hit=False)
+
+        return result
+
+    # Function to give the first copy seen of a document, so that the other copies with the same content are released
+    def intern(self, cache_name, document):
+        return self.transform(cache_name, document, str)
+
+
+document_cache = DocumentCache()
+
+
+# Function to write the metrics of the run as JSON and as a Prometheus textfile
+def export_metrics():
+    for metrics_file, content in ((config.metrics_json_file, json.dumps(metrics.as_dict(), indent=2)),
+                                  (config.metrics_prom_file, metrics.as_prometheus())):
+        temp_file = metrics_file + '.tmp'
+        with open(temp_file, 'w') as output_file:
+            output_file.write(content)
+        os.replace(temp_file, metrics_file)     # the textfile collector must never read a partly written file
+
+    logging.info('Metrics of the run exported to {0} and {1}..'.format(config.metrics_json_file, config.metrics_prom_file))
+
+
+# Function to call a DMS API, backing off and retrying as long as the service throttles the call. Every attempt is
+# recorded in the metrics of the run. In a fan-out job the calls go through the limits shared by the jobs of the region
+def call_with_retries(operation, throttle, **kwargs):
+    operation_name = getattr(operation, '__name__', 'unknown')
+    api_limits = job_api_limits.get()
+    api_slots = contextlib.nullcontext()
+    if api_limits is not None:
+        api_slots, throttle = api_limits
+
+    attempt = 0
+    while True:
+        throttle.wait()
+        started = time.monotonic()
+        try:
+            with api_slots:
+                response = operation(**kwargs)
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code')
+            metrics.record_call(operation_name, time.monotonic() - started, error_code=error_code, retry=attempt > 0)
+            if error_code not in THROTTLING_ERROR_CODES or attempt >= config.max_api_retries:
+                raise
+            attempt = attempt + 1
+            throttle.throttled()
+            logging.info('API call throttled, retrying (attempt {0} of {1})..'.format(attempt, config.max_api_retries))
+            continue
+
+        metrics.record_call(operation_name, time.monotonic() - started, response=response, retry=attempt > 0)
+        throttle.succeeded()
+        return response
+
+
+# Function to start the connection test of one endpoint from one replication instance. A test already running for the
+# pair is not an error, its outcome is picked up by the polling of describe_connections
+def start_connection_test(ReplicationInstanceArn, EndpointArn, throttle):
     try:
-        response = dms_client.test_connection(
-            ReplicationInstanceArn = ReplicationInstanceArn,
-            EndpointArn = EndpointArn
-        )
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            logging.info('Connection testing for EndpointArn : {0} Passed'.format(EndpointArn))
-            return True
-        else:
-            logging.info('Connection testing for EndpointArn : {0} Failed..'.format(EndpointArn))
-            return False
+        call_with_retries(dms_client.test_connection, throttle,
+                          ReplicationInstanceArn = ReplicationInstanceArn,
+                          EndpointArn = EndpointArn)
+        return True
     except dms_client.exceptions.InvalidResourceStateFault:
-        logging.info('Connection testing for EndpointArn : {0} Passed'.format(EndpointArn))
+        logging.info('Connection testing for EndpointArn : {0} is already in progress..'.format(EndpointArn))
         return True
     except ClientError as e:
-        logging.exception(e)
-        exit(1)
+        logging.exception('Error in starting the connection test for EndpointArn : {0} : {1}'.format(EndpointArn, e))
+        return False
+
+
+# Function to get the latest connection status of the given endpoints from one replication instance, in batches
+def get_connection_statuses(ReplicationInstanceArn, EndpointArns, throttle):
+    statuses = {}
+    for endpoint_arns in chunk_filter_values(EndpointArns):
+        filters = [
+            {"Name": 'replication-instance-arn', "Values": [ReplicationInstanceArn]},
+            {"Name": 'endpoint-arn', "Values": endpoint_arns}
+        ]
+        for connection in paginate(dms_client.describe_connections, 'Connections', throttle, Filters=filters):
+            statuses[connection['EndpointArn']] = (connection['Status'], connection.get('LastFailureMessage'))
+
+    return statuses
+
+
+# Function to test the connection of every unique (replication instance, endpoint) pair once per run. All the tests are
+# started in parallel, then polled through describe_connections until each one is successful or failed. The verdicts
+# are cached in connection_verdicts for the rest of the run
+def test_endpoint_connections(pairs):
+    pairs = [pair for pair in dict.fromkeys(pairs) if pair not in connection_verdicts]
+    if not pairs:
+        return connection_verdicts
+
+    logging.info('Testing the connection of {0} endpoints..'.format(len(pairs)))
+    throttle = AdaptiveThrottle()
+    pending = {}      # ReplicationInstanceArn -> set of EndpointArns still being tested
+
+    with ThreadPoolExecutor(max_workers=max(1, min(config.max_connection_test_workers, len(pairs)))) as executor:
+        futures = [submit_in_context(executor, start_connection_test, pair[0], pair[1], throttle) for pair in pairs]
+        started = [future.result() for future in futures]
+
+    for (ReplicationInstanceArn, EndpointArn), is_started in zip(pairs, started):
+        if is_started:
+            pending.setdefault(ReplicationInstanceArn, set()).add(EndpointArn)
+        else:
+            connection_verdicts[(ReplicationInstanceArn, EndpointArn)] = False
+
+    deadline = time.monotonic() + config.connection_test_timeout
+    while pending:
+        time.sleep(config.connection_poll_interval)
+
+        for ReplicationInstanceArn in list(pending):
+            statuses = get_connection_statuses(ReplicationInstanceArn, pending[ReplicationInstanceArn], throttle)
+
+            for EndpointArn, (status, failure_message) in statuses.items():
+                if EndpointArn not in pending[ReplicationInstanceArn] or status not in ('successful', 'failed'):
+                    continue
+                if status == 'successful':
+                    logging.info('Connection testing for EndpointArn : {0} Passed'.format(EndpointArn))
+                else:
+                    logging.info('Connection testing for EndpointArn : {0} Failed : {1}'.format(EndpointArn, failure_message))
+                connection_verdicts[(ReplicationInstanceArn, EndpointArn)] = status == 'successful'
+                pending[ReplicationInstanceArn].discard(EndpointArn)
+
+            if not pending[ReplicationInstanceArn]:
+                del pending[ReplicationInstanceArn]
+
+        if pending and time.monotonic() > deadline:
+            for ReplicationInstanceArn, EndpointArns in pending.items():
+                for EndpointArn in EndpointArns:
+                    logging.info('Connection testing for EndpointArn : {0} timed out..'.format(EndpointArn))
+                    connection_verdicts[(ReplicationInstanceArn, EndpointArn)] = False
+            break
+
+    return connection_verdicts
+
+
+# Function to check the validity of the Endpoint, tested only once per run
+def check_endpoint_arn(ReplicationInstanceArn, EndpointArn):
+    return test_endpoint_connections([(ReplicationInstanceArn, EndpointArn)])[(ReplicationInstanceArn, EndpointArn)]
+
+
+# Function to page through a DMS describe_* API using the Marker returned by the service. The next page is requested on
+# a background thread while the caller is still processing the current page. Throttled pages are retried and DMS answers
+# a describe call whose filters match nothing with ResourceNotFoundFault, which is treated as an empty result
+def paginate(operation, result_key, throttle=None, **kwargs):
+    kwargs.setdefault('MaxRecords', config.max_records)
+    kwargs.pop('Marker', None)
+    throttle = throttle or AdaptiveThrottle()
+
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        next_page = submit_in_context(prefetcher, call_with_retries, operation, throttle, **kwargs)
+        while next_page is not None:
+            try:
+                response = next_page.result()
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') == 'ResourceNotFoundFault' and 'Marker' not in kwargs:
+                    return
+                raise
+            marker = response.get('Marker')
+
+            if marker:
+                kwargs['Marker'] = marker
+                next_page = submit_in_context(prefetcher, call_with_retries, operation, throttle, **kwargs)
+            else:
+                next_page = None
+
+            yield from response.get(result_key, [])
+
+
+# Function to split a list of filter values into chunks accepted by a single DMS filter
+def chunk_filter_values(values, chunk_size=None):
+    chunk_size = chunk_size or config.max_filter_values
+    values = list(dict.fromkeys(values))     # de-duplicating while keeping the order
+
+    for idx in range(0, len(values), chunk_size):
+        yield values[idx:idx + chunk_size]
 
 
 # Function to get all the endpoints for a particular endpoint type
@@ -81,48 +622,56 @@ def get_target_endpoints(endpoint_type='N'):
                     endpoint_type
                 ]
             }
-        ],
-        "MaxRecords": config.max_records,
-        "Marker": ""
+        ]
     }
-    while True:
-        response = dms_client.describe_endpoints(**kwargs)
-        yield from response['Endpoints']
-        try:
-            kwargs['nextToken'] = response['nextToken']
-        except KeyError:
-            break
+    yield from paginate(dms_client.describe_endpoints, 'Endpoints', **kwargs)
 
 
-# Function to get the replication tasks for the old arn
-def get_replication_tasks():
-    kwargs = {
-        "Filters": [
-            {
-                "Name": config.replication_task_filter,
-                "Values": [
-                    config.replication_instance_arn
-                ]
-            }
-        ],
-        "MaxRecords": config.max_records,
-        "Marker": ""
-    }
-    while True:
-        response = dms_client.describe_replication_tasks(**kwargs)
-        yield from response['ReplicationTasks']
-        try:
-            kwargs['nextToken'] = response['nextToken']
-        except KeyError:
-            break
+# Function to get the replication tasks for the old arn. When only specific tasks are required the task ids are
+# pushed to the service as a filter instead of listing every task on the replication instance
+def get_replication_tasks(without_settings=False):
+    for filters in replication_task_filter_sets():
+        yield from paginate(dms_client.describe_replication_tasks, 'ReplicationTasks', Filters=filters,
+                            WithoutSettings=without_settings)
+
+
+# Function to build the filters listing the replication tasks of the run, one set of filters per describe call
+def replication_task_filter_sets():
+    filters = [
+        {
+            "Name": config.replication_task_filter,
+            "Values": [
+                config.replication_instance_arn
+            ]
+        }
+    ]
+
+    # Task names given as patterns cannot be pushed to the service, the tasks are then selected as they are listed
+    if config.use_specific_tasks != 'Y' or transform_rules().task_selection.patterns:
+        return [filters]
+
+    return [filters + [{"Name": 'replication-task-id', "Values": task_ids}]
+            for task_ids in chunk_filter_values(config.task_names)]
 
 
-# Function to create new DMS tasks
+# Function to get the full description of the replication tasks with the given ARNs, in batches
+def get_replication_tasks_by_arn(ReplicationTaskArns):
+    for task_arns in chunk_filter_values(ReplicationTaskArns):
+        filters = [{"Name": 'replication-task-arn', "Values": task_arns}]
+        yield from paginate(dms_client.describe_replication_tasks, 'ReplicationTasks', Filters=filters)
+
+
+# Function to create new DMS tasks. Returns the result of the creation instead of stopping the run so that it can be
+# called from several workers at once
 def create_new_dms_tasks(ReplicationTaskIdentifier, SourceEndpointArn, TargetEndpointArn, ReplicationInstanceArn,
-                         MigrationType, TableMappings, ReplicationTaskSettings):
+                         MigrationType, TableMappings, ReplicationTaskSettings, throttle=None):
     logging.info('Creating DMS task {0}'.format(ReplicationTaskIdentifier))
+    result = {'ReplicationTaskIdentifier': ReplicationTaskIdentifier, 'ReplicationTaskArn': None}
+    throttle = throttle or AdaptiveThrottle()
+
     try:
-        response = dms_client.create_replication_task(
+        response = call_with_retries(
+            dms_client.create_replication_task, throttle,
             ReplicationTaskIdentifier = ReplicationTaskIdentifier,
             SourceEndpointArn = SourceEndpointArn,
             TargetEndpointArn = TargetEndpointArn,
@@ -133,298 +682,2345 @@ def create_new_dms_tasks(ReplicationTaskIdentifier, SourceEndpointArn, TargetEnd
         )
         status = response['ReplicationTask']['Status']
         ReplicationTaskCreationDate = response['ReplicationTask']['ReplicationTaskCreationDate'].replace(tzinfo=None)
-        logging.info('Task created at {0}'.format(ReplicationTaskCreationDate))
+        logging.info('Task {0} created at {1}'.format(ReplicationTaskIdentifier, ReplicationTaskCreationDate))
         logging.info('The status for DMS task {0} is {1}'.format(ReplicationTaskIdentifier, status))
-        counter()
-        return True
+        result.update(Result='created', Status=status, ReplicationTaskArn=response['ReplicationTask'].get('ReplicationTaskArn'))
     except dms_client.exceptions.ResourceAlreadyExistsFault:
         logging.info('The provided ReplicationTaskIdentifier {0} already exists hence skipping creation of this task and proceeding next..'.format(ReplicationTaskIdentifier))
-        tsk_exists = 'Y'
-        return True
+        result.update(Result='exists')
     except Exception as e:
-        logging.exception(e)
-        exit(1)
+        logging.exception('Error in creating DMS task {0} : {1}'.format(ReplicationTaskIdentifier, e))
+        result.update(Result='failed', Error=str(e))
+
+    return result
+
+
+# Function to create all the requested DMS tasks on a bounded pool of workers sharing one adaptive throttle. Only the
+# CREATE_TASK_FIELDS of the requests are sent to DMS and each completed creation is recorded in the journal, if any.
+# Returns the result of every task in the order of the requests
+def create_dms_tasks(create_requests, journal=None):
+    throttle = AdaptiveThrottle()
+    workers = max(1, min(config.max_create_workers, len(create_requests)))
+    logging.info('Creating {0} DMS tasks using {1} workers..'.format(len(create_requests), workers))
+
+    def create_and_record(create_request):
+        result = create_new_dms_tasks(throttle=throttle, **{field: create_request[field] for field in CREATE_TASK_FIELDS})
+        if journal is not None and result['Result'] != 'failed':
+            journal.record('create', ReplicationTaskIdentifier=result['ReplicationTaskIdentifier'],
+                           Result=result['Result'], ReplicationTaskArn=result['ReplicationTaskArn'],
+                           Status=result.get('Status'))
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [submit_in_context(executor, create_and_record, create_request) for create_request in create_requests]
+        return [future.result() for future in futures]
+
+
+# Function to wait until every task created in the run has left the creating state. Each poll describes the pending
+# tasks in batches through a replication-task-arn filter, so the number of API calls grows with the polls and not with
+# the tasks. The final status is recorded in the result of every task
+def wait_for_tasks_ready(results):
+    pending = {result['ReplicationTaskArn']: result for result in results
+               if result['Result'] == 'created' and result.get('ReplicationTaskArn')}
+    if not pending:
+        return results
+
+    logging.info('Waiting for {0} new tasks to be ready..'.format(len(pending)))
+    throttle = AdaptiveThrottle()
+    interval = config.ready_poll_interval
+    deadline = time.monotonic() + config.ready_wait_timeout
+
+    while pending:
+        time.sleep(random.uniform(interval / 2, interval))
+        interval = min(config.ready_poll_max_interval, interval * 1.5)
+
+        for task_arn, task in describe_tasks_by_arn(list(pending), throttle).items():
+            result = pending.get(task_arn)
+            if result is None:
+                continue
+            result['Status'] = task['Status']
+            if task['Status'] not in ('creating', 'modifying'):
+                logging.info('The status for DMS task {0} is {1}'.format(result['ReplicationTaskIdentifier'], task['Status']))
+                del pending[task_arn]
+
+        if pending and time.monotonic() > deadline:
+            for result in pending.values():
+                logging.info('DMS task {0} is still {1} after {2} seconds..'.format(
+                    result['ReplicationTaskIdentifier'], result['Status'], config.ready_wait_timeout))
+            break
 
+    return results
 
-# Function to edit the prefix for new task identifier
-def edit_task_name_prefix(task_name):
-    # Block to check the name prefix and edit it accordingly
-    if task_name.startswith('non-prod'):
-        edited_task_name = config.replicationtaskid_prefix + task_name.replace('non-prod-', '')
-    elif task_name.startswith('prod-'):
-        edited_task_name = config.replicationtaskid_prefix + task_name.replace('prod-', '')
-    else:
-        edited_task_name = config.replicationtaskid_prefix + task_name
 
-    return edited_task_name
+# Function to describe the given tasks, without their settings, in batches through a replication-task-arn filter
+def describe_tasks_by_arn(ReplicationTaskArns, throttle):
+    tasks = {}
+    for task_arns in chunk_filter_values(ReplicationTaskArns):
+        filters = [{"Name": 'replication-task-arn', "Values": task_arns}]
+        for task in paginate(dms_client.describe_replication_tasks, 'ReplicationTasks', throttle,
+                             Filters=filters, WithoutSettings=True):
+            tasks[task['ReplicationTaskArn']] = task
 
+    return tasks
 
-# Function to generate the mapping of endpoint identifiers and its corresponding ARNS for both Source and Target
-def gen_endpoint_mapping_dict():
-    logging.info('Generating the mappings for Source and Target End Point arns')
 
-    try:
-        for src_arns in get_target_endpoints('Source'):
-            source_identifier = src_arns['EndpointIdentifier']
-            SourceEndpointArn = src_arns['EndpointArn']
+# Function to tell whether a started task still holds its slot on the replication instance : a task with a full load
+# holds it until the full load is finished, a CDC only task until its latest source and target CDC latency, if known,
+# are both within cdc_settle_latency, otherwise until it has been running for cdc_settle_seconds
+def task_holds_start_slot(task, started_at, cdc_latency=None):
+    status = task['Status']
+    if status in ('failed', 'stopped', 'deleting'):
+        return False
+    if status in ('starting', 'ready', 'modifying'):
+        return True
 
-            dict_src_arns[SourceEndpointArn] = source_identifier
+    stats = task.get('ReplicationTaskStats', {})
+    if task['MigrationType'] == 'cdc':
+        if cdc_latency is not None:
+            return cdc_latency > config.cdc_settle_latency
+        return time.monotonic() - started_at < config.cdc_settle_seconds
 
-        logging.info('Generation of mappings for Source End Point arns is successfull..')
+    return stats.get('FullLoadProgressPercent', 0) < 100 or stats.get('TablesLoading', 0) > 0 \
+        or stats.get('TablesQueued', 0) > 0
 
-    except ClientError as e:
-        logging.exception('Error in generating the source mappings arns : ' + e)
-        exit(1)
+
+# Function to get the latest CDC latency (in seconds) of the given running tasks from CloudWatch, the higher of the
+# source and target latency. Tasks without datapoints yet are left out, as are all the tasks when CloudWatch cannot be read
+def get_cdc_latencies(task_instances, throttle):
+    if not task_instances:
+        return {}
 
     try:
-        for tgt_arns in get_target_endpoints('Target'):
-            target_endpoint_id = tgt_arns['EndpointIdentifier']
-            TargetEndpointArn = tgt_arns['EndpointArn']
+        values = get_task_metric_values(task_instances, throttle, CDC_LATENCY_METRICS, CDC_LATENCY_WINDOW, 60)
+    except (BotoCoreError, ClientError) as e:
+        logging.info('CDC latency of the started tasks is not available : {0}..Using cdc_settle_seconds'.format(e))
+        return {}
+
+    return {task_arn: max(metric_values[0] for metric_values in task_values.values())
+            for task_arn, task_values in values.items() if all(task_values.values())}
+
+
+# Function to start the new tasks on a schedule. Each replication instance runs at most
+# max_concurrent_full_loads_per_instance loading tasks at a time, the largest tasks are started first and a queued task
+# is only started once a running one has finished its full load, or caught up for a CDC only task. The tasks started by
+# a previous run of the plan hold their slot as well. The tasks of every instance are polled together in batches. The
+# start of every task is recorded in its result and in the journal, a created task which is not ready is not started
+def start_tasks_staggered(results, plan, journal=None, started_arns=()):
+    entries = {entry['ReplicationTaskIdentifier']: entry for entry in plan}
+    queues = {}       # ReplicationInstanceArn -> results waiting to be started, largest first
+    started = []      # results of the tasks started by a previous run
+    for result in results:
+        if result.get('ReplicationTaskArn') in started_arns:
+            result['StartStatus'] = 'started'
+            started.append(result)
+            continue
+        if result['Result'] != 'created':
+            continue
+        if result.get('Status') != 'ready':
+            logging.info('DMS task {0} is {1} instead of ready..Hence it is not started'.format(
+                result['ReplicationTaskIdentifier'], result.get('Status')))
+            result['StartStatus'] = 'not started'
+            continue
+        entry = entries[result['ReplicationTaskIdentifier']]
+        result['EstimatedLoad'] = entry.get('EstimatedLoad') or estimate_task_load(entry)
+        queues.setdefault(entry['ReplicationInstanceArn'], []).append(result)
+    for queue in queues.values():
+        queue.sort(key=lambda result: (-result['EstimatedLoad'], result['ReplicationTaskIdentifier']))
+
+    logging.info('Starting {0} tasks on {1} replication instances, at most {2} loading per instance..'.format(
+        sum(len(queue) for queue in queues.values()), len(queues), config.max_concurrent_full_loads_per_instance))
+    throttle = AdaptiveThrottle()
+    running = {instance_arn: {} for instance_arn in queues}     # instance -> {ReplicationTaskArn: started_at}
+    for result in started:
+        instance_arn = entries[result['ReplicationTaskIdentifier']]['ReplicationInstanceArn']
+        if instance_arn in running:
+            running[instance_arn][result['ReplicationTaskArn']] = time.monotonic()
+    deadline = time.monotonic() + config.start_timeout
+    instance_identifiers = {}
+
+    while any(queues.values()):
+        active_arns = [task_arn for tasks in running.values() for task_arn in tasks]
+        described = describe_tasks_by_arn(active_arns, throttle) if active_arns else {}
+
+        cdc_instances = {task_arn: task['ReplicationInstanceArn'] for task_arn, task in described.items()
+                         if task['MigrationType'] == 'cdc' and task['Status'] == 'running'}
+        if cdc_instances and get_cloudwatch_client() is not None:
+            missing_instances = set(cdc_instances.values()) - set(instance_identifiers)
+            if missing_instances:
+                instance_identifiers.update({instance_arn: instance['ReplicationInstanceIdentifier'] for instance_arn, instance
+                                             in get_replication_instances(missing_instances).items()})
+            cdc_latencies = get_cdc_latencies({task_arn: instance_identifiers.get(instance_arn, instance_arn.split(':')[-1])
+                                               for task_arn, instance_arn in cdc_instances.items()}, throttle)
+        else:
+            cdc_latencies = {}
 
-            dict_tgt_arns[TargetEndpointArn] = target_endpoint_id
+        for instance_arn, queue in queues.items():
+            for task_arn, started_at in list(running[instance_arn].items()):
+                task = described.get(task_arn)
+                if task is None or not task_holds_start_slot(task, started_at, cdc_latencies.get(task_arn)):
+                    del running[instance_arn][task_arn]
 
-        logging.info('Generation of mappings for Target End Point arns is successfull..' + '\n')
+            while queue and len(running[instance_arn]) < config.max_concurrent_full_loads_per_instance:
+                result = queue.pop(0)
+                try:
+                    call_with_retries(dms_client.start_replication_task, throttle,
+                                      ReplicationTaskArn=result['ReplicationTaskArn'],
+                                      StartReplicationTaskType='start-replication')
+                except ClientError as e:
+                    logging.info('Error in starting DMS task {0} : {1}'.format(result['ReplicationTaskIdentifier'], e))
+                    result['StartStatus'] = 'failed'
+                    continue
 
-    except ClientError as e:
-        logging.exception('Error in generating the Target mappings arns : ' + e)
-        exit(1)
+                logging.info('Started DMS task {0} on {1}..'.format(result['ReplicationTaskIdentifier'], instance_arn))
+                result['StartStatus'] = 'started'
+                running[instance_arn][result['ReplicationTaskArn']] = time.monotonic()
+                if journal is not None:
+                    journal.record('start', ReplicationTaskIdentifier=result['ReplicationTaskIdentifier'],
+                                   ReplicationTaskArn=result['ReplicationTaskArn'])
 
+        if not any(queues.values()):
+            break
+        if time.monotonic() > deadline:
+            for queue in queues.values():
+                for result in queue:
+                    logging.info('DMS task {0} was not started within {1} seconds..'.format(
+                        result['ReplicationTaskIdentifier'], config.start_timeout))
+                    result['StartStatus'] = 'not started'
+            break
+        time.sleep(config.start_poll_interval)
+
+    return results
+
+
+# Function to tell whether a rule key is a pattern : a regular expression prefixed with REGEX_RULE_PREFIX, or a glob
+def is_rule_pattern(key):
+    return key.startswith(REGEX_RULE_PREFIX) or any(char in key for char in '*?[')
+
+
+# Function to split a glob, as matched by fnmatch, into its tokens : ('*', regex) and ('?', regex) for the wildcards,
+# ('[', regex) for a set of characters and ('', character) for a plain character
+def glob_tokens(pattern):
+    tokens = []
+    idx = 0
+    while idx < len(pattern):
+        char = pattern[idx]
+        idx += 1
+        if char == '*':
+            tokens.append(('*', '(.*)'))
+        elif char == '?':
+            tokens.append(('?', '(.)'))
+        elif char == '[':
+            end = idx + 1 if pattern[idx:idx + 1] == '!' else idx
+            end = end + 1 if pattern[end:end + 1] == ']' else end
+            end = pattern.find(']', end)
+            if end < 0:
+                tokens.append(('', char))
+                continue
+            chars = pattern[idx:end].replace('\\', '\\\\')
+            idx = end + 1
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            elif chars.startswith('^'):
+                chars = '\\' + chars
+            tokens.append(('[', '[{0}]'.format(chars)))
+        else:
+            tokens.append(('', char))
 
-# Function to validate the Source and Target end points provided in config file
-def validate_src_tgt_endpoints():
-    logging.info('Starting validating of Source and Target mappings from config file')
-    valid = 'Y'
+    return tokens
 
-    # Block to validate the Source mappings
-    try:
-        src_mapping_lst = []     # Create an empty list
 
-        if config.use_arn_db_transforms == 'Y':
-            for src_arns in get_target_endpoints('Source'):
-                src_mapping_lst.append(src_arns['EndpointArn'])
+# Function to translate a glob, as matched by fnmatch, into a regular expression capturing what each * and ? matched
+def glob_to_regex(pattern):
+    return ''.join(re.escape(text) if kind == '' else text for kind, text in glob_tokens(pattern))
+
+
+# Function to tell whether every key matched by the glob other is matched by the glob pattern. The wildcards and sets
+# of other stand for any character they may match, so only a * of pattern absorbs them, a ? or a set of pattern only
+# the single characters it is sure to match
+def glob_covers(pattern, other):
+    outer, inner = glob_tokens(pattern), glob_tokens(other)
 
+    @functools.lru_cache(maxsize=None)
+    def covers(outer_idx, inner_idx):
+        if outer_idx == len(outer):
+            return inner_idx == len(inner)
+        kind, text = outer[outer_idx]
+        if kind == '*':
+            return covers(outer_idx + 1, inner_idx) or (inner_idx < len(inner) and covers(outer_idx, inner_idx + 1))
+        if inner_idx == len(inner):
+            return False
+        inner_kind, inner_text = inner[inner_idx]
+        if kind == '?':
+            matched = inner_kind != '*'
+        elif kind == '[':
+            matched = (inner_kind == '' and re.fullmatch(text, inner_text) is not None) or \
+                (inner_kind == '[' and inner_text == text)
         else:
-            for src_arns in get_target_endpoints('Source'):
-                src_mapping_lst.append(src_arns['EndpointIdentifier'])
+            matched = inner_kind == '' and inner_text == text
+        return matched and covers(outer_idx + 1, inner_idx + 1)
 
-        for kys, vals in config.src_endpoint_transforms.items():
-            try:
-                ret = src_mapping_lst.index(kys)
-            except ValueError:
-                valid = 'N'
-                logging.info('Old Source Endpoint ARN/Identifier -> {0} is not valid..Kindly rectify and run again'.format(kys))
+    return covers(0, 0)
 
+
+# Function to tell whether the regex of a rule can go into the combined regular expression of its rule set. Globs always
+# can, while a regular expression with a backreference, a named group or an inline flag would change meaning or fail to
+# compile among the groups of the other rules, so it is matched on its own. Only the (?: extension is let through
+def is_combinable_regex(key, regex):
+    if not key.startswith(REGEX_RULE_PREFIX):
+        return True
+    return re.search(r'\(\?(?!:)|\\\d', regex) is None
+
+
+# Class holding an ordered list of (key, value) rules compiled once. Plain keys go into a hash index and the patterns
+# into one combined regular expression, so that a lookup costs one dictionary access and one regex match however many
+# rules there are. Regexes which cannot be combined are matched on their own. As with a linear scan, the first rule in
+# the list matching the key wins
+class RuleSet:
+
+    def __init__(self, name, rules):
+        self.name = name
+        self.exact = {}           # key -> (position of the rule, value)
+        self.patterns = []        # (position of the rule, key, compiled regex, value)
+        self.pattern_groups = {}  # index of the group of a pattern in the combined regex -> index in patterns
+        self.separate = []        # indexes in patterns of the regexes matched on their own, in the order of the rules
+        alternatives = []
+        group = 0
+
+        for position, (key, value) in enumerate(rules):
+            if not is_rule_pattern(key):
+                self.exact.setdefault(key, (position, value))
+                continue
+            regex = key[len(REGEX_RULE_PREFIX):] if key.startswith(REGEX_RULE_PREFIX) else glob_to_regex(key)
             try:
-                ret = src_mapping_lst.index(vals)
-            except ValueError:
-                valid = 'N'
-                logging.info('New Source Endpoint ARN/Identifier -> {0} is not valid..Kindly rectify and run again'.format(vals))
+                compiled = re.compile(regex)
+            except re.error as e:
+                raise ValueError('Rule {0} of {1} is not a valid regular expression : {2}'.format(key, name, e))
+            if not is_combinable_regex(key, regex):
+                self.separate.append(len(self.patterns))
+                self.patterns.append((position, key, compiled, value))
+                continue
+            group += 1
+            self.pattern_groups[group] = len(self.patterns)
+            self.patterns.append((position, key, compiled, value))
+            alternatives.append('({0})'.format(regex))
+            group += compiled.groups
+
+        self.combined = re.compile('|'.join(alternatives)) if alternatives else None
+
+    # Function to find the first rule matching the key. Returns (key of the rule, value, match of the pattern or None for
+    # a plain key), or None when no rule matches. The regexes which cannot be combined are only tried when they come
+    # before the best rule found in the hash index and the combined regex
+    def match(self, key):
+        best = None
+        exact = self.exact.get(key)
+        if exact is not None:
+            best = (exact[0], key, exact[1], None)
+        found = self.combined.fullmatch(key) if self.combined is not None else None
+        if found is not None:
+            position, rule_key, compiled, value = self.patterns[self.pattern_groups[found.lastindex]]
+            if best is None or position < best[0]:
+                best = (position, rule_key, value, compiled.fullmatch(key))
+        for index in self.separate:
+            position, rule_key, compiled, value = self.patterns[index]
+            if best is not None and position > best[0]:
+                break
+            separate_found = compiled.fullmatch(key)
+            if separate_found is not None:
+                best = (position, rule_key, value, separate_found)
+                break
+
+        return None if best is None else best[1:]
+
+    # Function to get the value of the first rule matching the key
+    def lookup(self, key, default=None):
+        found = self.match(key)
+        return default if found is None else found[1]
+
+    # Function to rewrite a key with the value of the first rule matching it. The value of a glob has its * and ? filled
+    # in order with what the wildcards of the key matched, the value of a regular expression can use its groups as \1
+    def rewrite(self, key):
+        found = self.match(key)
+        if found is None:
+            return None
+        rule_key, value, match = found
+        if match is None:
+            return value
+        if rule_key.startswith(REGEX_RULE_PREFIX):
+            return match.expand(value)
+
+        groups = iter(match.groups())
+        return re.sub(r'[*?]', lambda wildcard: next(groups, ''), value)
+
+    # Function to find the rules which can never match as an earlier rule takes every key they could match. A plain key
+    # is shadowed by an earlier pattern matching it and a glob by an earlier glob covering it. Whether a regular
+    # expression covers a glob, or is covered, cannot be told from its text, hence it never counts as shadowing
+    def shadowed_rules(self):
+        shadowed = []
+        for key, (position, _) in self.exact.items():
+            found = self.match(key)
+            if found[2] is not None:
+                shadowed.append((key, found[0]))
+        for position, key, _, _ in self.patterns:
+            if key.startswith(REGEX_RULE_PREFIX):
+                continue
+            for earlier_position, earlier_key, _, _ in self.patterns:
+                if earlier_position < position and not earlier_key.startswith(REGEX_RULE_PREFIX) and \
+                        glob_covers(earlier_key, key):
+                    shadowed.append((key, earlier_key))
+                    break
 
-    except ClientError as e:
-        logging.exception('Error in validating the Source mapping arns/identifiers : ' + e)
+        return shadowed
+
+    # Function to find the keys matched by several rules giving different values, the first of them winning
+    def overlaps(self, keys):
+        overlapping = []
+        for key in keys:
+            values = [(rule_key, value) for _, rule_key, compiled, value in self.patterns if compiled.fullmatch(key)]
+            if key in self.exact:
+                values.append((key, self.exact[key][1]))
+            if len(set(repr(value) for _, value in values)) > 1:
+                overlapping.append((key, [rule_key for rule_key, _ in values]))
+
+        return overlapping
+
+
+# Class holding the rule sets of the configuration : the selection of the tasks in task_names, their renaming, the
+# Source and Target endpoint transforms, the performance profiles and the shard counts
+class TransformRules:
+
+    def __init__(self):
+        self.task_selection = RuleSet('task_names', [(task_name, True) for task_name in config.task_names]
+                                      if config.use_specific_tasks == 'Y' else [])
+        rename_rules = DEFAULT_TASK_RENAME_RULES if config.task_rename_rules is None else config.task_rename_rules
+        self.task_rename = RuleSet('task_rename_rules', [
+            (task_pattern, (re.compile(search[len(REGEX_RULE_PREFIX):]) if search.startswith(REGEX_RULE_PREFIX) else search,
+                            replacement))
+            for task_pattern, search, replacement in rename_rules])
+        self.endpoints = {'Source': RuleSet('src_endpoint_transforms', list(config.src_endpoint_transforms.items())),
+                          'Target': RuleSet('tgt_endpoint_transforms', list(config.tgt_endpoint_transforms.items()))}
+        self.settings_profiles = RuleSet('task_settings_profile_rules', list(config.task_settings_profile_rules))
+        self.shard_counts = RuleSet('task_shard_counts', list(config.task_shard_counts.items())
+                                    if config.use_task_sharding == 'Y' else [])
+
+    def rule_sets(self):
+        return [self.task_selection, self.task_rename, self.endpoints['Source'], self.endpoints['Target'],
+                self.settings_profiles, self.shard_counts]
+
+    # Function to tell whether a task is selected by task_names, every task being selected without use_specific_tasks
+    def select_task(self, task_name):
+        return config.use_specific_tasks != 'Y' or self.task_selection.match(task_name) is not None
+
+
+# Function to compile the rules of the configuration for the run or the fan-out job of the current context. Rules which
+# are not valid regular expressions or are shadowed by an earlier rule stop the run, a shadowed task name is only logged
+def compile_transform_rules():
+    try:
+        rules = TransformRules()
+    except (re.error, ValueError) as e:
+        logging.info('Invalid regular expression in the rules of the config file : {0}..Kindly rectify and run again'.format(e))
+        print('Invalid regular expression in the rules of the config file : {0}..Kindly rectify and run again'.format(e))
         exit(1)
 
-    # Block to validate the Target mappings
-    try:
-        tgt_mapping_lst = []      # Create an empty list
+    shadowed = [(rule_set.name, key, earlier_key) for rule_set in rules.rule_sets()
+                for key, earlier_key in rule_set.shadowed_rules()]
+    for rule_set_name, key, earlier_key in shadowed:
+        logging.info('Rule {0} of {1} is shadowed by the earlier rule {2}..'.format(key, rule_set_name, earlier_key))
+    if any(rule_set_name != 'task_names' for rule_set_name, _, _ in shadowed):
+        print('Shadowed rules present in config file..Kindly check the log file {0}'.format(config.dms_op_log_filepath))
+        exit(1)
 
-        if config.use_arn_db_transforms == 'Y':
-            for tgt_arns in get_target_endpoints('Target'):
-                tgt_mapping_lst.append(tgt_arns['EndpointArn'])
+    job_rules.set(rules)
+    return rules
+
+
+# Function to get the rules compiled for the current context, compiling them on first use
+def transform_rules():
+    return job_rules.get() or compile_transform_rules()
 
+
+# Function to edit the prefix for new task identifier. The first of the task_rename_rules matching the task name
+# replaces every occurrence of its text in the name, then replicationtaskid_prefix is prepended
+def edit_task_name_prefix(task_name):
+    rename = transform_rules().task_rename.lookup(task_name)
+    if rename is not None:
+        search, replacement = rename
+        if isinstance(search, str):
+            task_name = task_name.replace(search, replacement) if search else task_name
         else:
-            for tgt_arns in get_target_endpoints('Target'):
-                tgt_mapping_lst.append(tgt_arns['EndpointIdentifier'])
+            task_name = search.sub(replacement, task_name)
 
+    return config.replicationtaskid_prefix + task_name
 
-        for kys, vals in config.tgt_endpoint_transforms.items():
-            try:
-                ret = tgt_mapping_lst.index(kys)
-            except ValueError:
-                valid = 'N'
-                logging.info('Old Target Endpoint ARN/Identifier -> {0} is not valid..Kindly rectify and run again'.format(kys))
 
-            try:
-                ret = tgt_mapping_lst.index(vals)
-            except ValueError:
-                valid = 'N'
-                logging.info('New Target Endpoint ARN/Identifier -> {0} is not valid..Kindly rectify and run again'.format(vals))
+# Class holding the Source and Target endpoints of the account. The endpoints are listed once per run and indexed by
+# ARN, by identifier and by endpoint type so that validation, mapping and the per-task loop are all O(1) lookups
+class EndpointInventory:
+
+    def __init__(self):
+        self.endpoints_by_arn = {}                       # EndpointArn -> endpoint description
+        self.arn_by_identifier = {}                      # EndpointIdentifier -> EndpointArn
+        self.by_type = {'Source': {}, 'Target': {}}      # Endpoint type -> {EndpointArn : EndpointIdentifier}
+
+    # Function to register one endpoint description under the given endpoint type
+    def add(self, endpoint_type, endpoint):
+        endpoint_arn = endpoint['EndpointArn']
+        endpoint_identifier = endpoint['EndpointIdentifier']
+
+        self.endpoints_by_arn[endpoint_arn] = endpoint
+        self.arn_by_identifier[endpoint_identifier] = endpoint_arn
+        self.by_type.setdefault(endpoint_type, {})[endpoint_arn] = endpoint_identifier
+
+    # Function to remove one endpoint from the inventory
+    def discard(self, endpoint_arn):
+        endpoint = self.endpoints_by_arn.pop(endpoint_arn, None)
+        if endpoint is None:
+            return
+        if self.arn_by_identifier.get(endpoint['EndpointIdentifier']) == endpoint_arn:
+            del self.arn_by_identifier[endpoint['EndpointIdentifier']]
+        for endpoints in self.by_type.values():
+            endpoints.pop(endpoint_arn, None)
+
+    # Function to give the endpoint descriptions per endpoint type, as stored in the inventory snapshot
+    def endpoints_by_type(self):
+        return {endpoint_type: [self.endpoints_by_arn[endpoint_arn] for endpoint_arn in endpoints]
+                for endpoint_type, endpoints in self.by_type.items()}
+
+    # Function to re-describe the given endpoints (ARNs or identifiers as per use_arn_db_transforms) and replace their
+    # entries in the inventory
+    def refresh(self, keys, use_arn=None):
+        use_arn = config.use_arn_db_transforms == 'Y' if use_arn is None else use_arn
+        keys = list(dict.fromkeys(keys))
+
+        for key in keys:
+            self.discard(key if use_arn else self.arn_by_identifier.get(key))
+
+        for endpoint_keys in chunk_filter_values(keys):
+            filters = [{"Name": 'endpoint-arn' if use_arn else 'endpoint-id', "Values": endpoint_keys}]
+            for endpoint in paginate(dms_client.describe_endpoints, 'Endpoints', Filters=filters):
+                self.add(endpoint['EndpointType'].capitalize(), endpoint)
+
+        return self
+
+    # Function to list the endpoints of every type exactly once
+    def load(self):
+        for endpoint_type in self.by_type:
+            for endpoint in get_target_endpoints(endpoint_type):
+                self.add(endpoint_type, endpoint)
+
+        return self
+
+    # Function to check whether an ARN or identifier (as per use_arn_db_transforms) exists for the endpoint type
+    def contains(self, endpoint_type, key):
+        endpoints = self.by_type.get(endpoint_type, {})
+
+        if config.use_arn_db_transforms == 'Y':
+            return key in endpoints
 
+        return self.arn_by_identifier.get(key) in endpoints
+
+    # Function to get the identifier of an endpoint ARN for the endpoint type, None if it is not of that type
+    def identifier(self, endpoint_type, endpoint_arn):
+        return self.by_type.get(endpoint_type, {}).get(endpoint_arn)
+
+    # Function to resolve the new endpoint ARN for the current endpoint ARN as per the transform rules of the endpoint
+    # type. Returns None when the current endpoint is not part of the transforms
+    def new_endpoint_arn(self, endpoint_type, endpoint_arn):
+        endpoint_identifier = self.identifier(endpoint_type, endpoint_arn)
+        if endpoint_identifier is None:
+            return None
+
+        endpoint_rules = transform_rules().endpoints[endpoint_type]
+        if config.use_arn_db_transforms == 'Y':
+            return endpoint_rules.rewrite(endpoint_arn)
+
+        new_endpoint_identifier = endpoint_rules.rewrite(endpoint_identifier)
+        if new_endpoint_identifier is None:
+            return None
+
+        new_endpoint_arn = self.arn_by_identifier.get(new_endpoint_identifier)
+        if new_endpoint_arn not in self.by_type[endpoint_type]:
+            return None
+
+        return new_endpoint_arn
+
+
+# Function to build the inventory of Source and Target endpoints used for the whole run
+def build_endpoint_inventory():
+    logging.info('Generating the inventory of Source and Target End Points')
+
+    try:
+        inventory = EndpointInventory().load()
     except ClientError as e:
-        logging.exception('Error in validating the Target mappings arns/identifiers : ' + e)
+        logging.exception('Error in generating the inventory of End Points : {0}'.format(e))
         exit(1)
 
+    logging.info('Inventory generated with {0} Source and {1} Target End Points..'.format(
+        len(inventory.by_type['Source']), len(inventory.by_type['Target'])) + '\n')
+
+    return inventory
+
+
+# Function to validate the Source and Target end points provided in config file
+def validate_src_tgt_endpoints(inventory):
+    logging.info('Starting validating of Source and Target mappings from config file')
+    valid = 'Y'
+
+    # Block to validate the Source mappings
+    for kys, vals in config.src_endpoint_transforms.items():
+        if is_rule_pattern(kys):
+            continue
+        if not inventory.contains('Source', kys):
+            valid = 'N'
+            logging.info('Old Source Endpoint ARN/Identifier -> {0} is not valid..Kindly rectify and run again'.format(kys))
+
+        if not inventory.contains('Source', vals):
+            valid = 'N'
+            logging.info('New Source Endpoint ARN/Identifier -> {0} is not valid..Kindly rectify and run again'.format(vals))
+
+    # Block to validate the Target mappings
+    for kys, vals in config.tgt_endpoint_transforms.items():
+        if is_rule_pattern(kys):
+            continue
+        if not inventory.contains('Target', kys):
+            valid = 'N'
+            logging.info('Old Target Endpoint ARN/Identifier -> {0} is not valid..Kindly rectify and run again'.format(kys))
+
+        if not inventory.contains('Target', vals):
+            valid = 'N'
+            logging.info('New Target Endpoint ARN/Identifier -> {0} is not valid..Kindly rectify and run again'.format(vals))
+
+    # Block to validate the pattern rules against every endpoint they match, and to report the endpoints matched by
+    # several rules giving different new endpoints
+    for endpoint_type, endpoint_rules in transform_rules().endpoints.items():
+        if not endpoint_rules.patterns:
+            continue
+        keys = list(inventory.by_type[endpoint_type]) if config.use_arn_db_transforms == 'Y' \
+            else list(inventory.by_type[endpoint_type].values())
+        winning_rules = {key: found[0] for key, found in ((key, endpoint_rules.match(key)) for key in keys)
+                         if found is not None}
+        matched = list(winning_rules)
+        for _, rule_key, _, _ in endpoint_rules.patterns:
+            if rule_key not in winning_rules.values():
+                logging.info('{0} Endpoint rule -> {1} matches no End Point..'.format(endpoint_type, rule_key))
+        for key in matched:
+            if not inventory.contains(endpoint_type, endpoint_rules.rewrite(key)):
+                valid = 'N'
+                logging.info('New {0} Endpoint ARN/Identifier -> {1} for {2} is not valid..Kindly rectify and run again'.format(
+                    endpoint_type, endpoint_rules.rewrite(key), key))
+        for key, rule_keys in endpoint_rules.overlaps(matched):
+            logging.info('{0} Endpoint {1} is matched by the rules {2}..The first one applies'.format(
+                endpoint_type, key, ', '.join(rule_keys)))
+
     if valid == 'N':
         logging.info('Invalid Endpoints present in config file..Kindly validate and re-run again..')
         print('Invalid Endpoints present in config file..Kindly validate and re-run again..')
         exit(1)
     else:
         logging.info('Source and Target Mappings have been fully validated..')
-        return src_mapping_lst, tgt_mapping_lst
 
 
-# Function to edit the replication task settings to enable Cloudwatch Logs
-def edit_task_settings(ReplicationTaskSettings):
+# Function to read the inventory snapshot of a previous run. Returns None when there is no usable snapshot for the
+# current region, replication instance and task selection
+def read_inventory_snapshot():
     try:
-        tsk_sttngs_dict = json.loads(ReplicationTaskSettings)    # converting the string to a dictionary object
-        tsk_sttngs_dict['Logging']['EnableLogging'] = config.enable_logging
-        tsk_sttngs_dict['Logging']['CloudWatchLogGroup'] = None
-        tsk_sttngs_dict['Logging']['CloudWatchLogStream'] = None
-        tsk_stngs_to_str = json.dumps(tsk_sttngs_dict)           # converting the dictionary back to string
+        with open(config.inventory_snapshot_file) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.info('Ignoring the unreadable inventory snapshot {0} : {1}'.format(config.inventory_snapshot_file, e))
+        return None
+
+    if snapshot.get('version') != INVENTORY_SNAPSHOT_VERSION or snapshot.get('key') != list(inventory_snapshot_key()):
+        logging.info('Inventory snapshot {0} was taken for another configuration..'.format(config.inventory_snapshot_file))
+        return None
+
+    return snapshot
+
+
+# Function to save the endpoints and tasks of the run as the inventory snapshot used by the next runs. The snapshot is
+# written as JSON, the dates of the tasks being kept as text
+def write_inventory_snapshot(inventory, tasks):
+    snapshot = {
+        'version': INVENTORY_SNAPSHOT_VERSION,
+        'key': inventory_snapshot_key(),
+        'taken_at': time.time(),
+        'endpoints': inventory.endpoints_by_type(),
+        'tasks': tasks
+    }
+    temp_file = config.inventory_snapshot_file + '.tmp'
+    with open(temp_file, 'w') as snapshot_file:
+        json.dump(snapshot, snapshot_file, default=str)
+    os.replace(temp_file, config.inventory_snapshot_file)
+
+    logging.info('Inventory snapshot saved to {0}..'.format(config.inventory_snapshot_file))
+
+
+# Function to identify the configuration an inventory snapshot was taken for
+def inventory_snapshot_key():
+    task_names = sorted(config.task_names) if config.use_specific_tasks == 'Y' else None
+    return config.aws_region, config.replication_instance_arn, task_names
+
+
+# Function to get the signature of a task, compared as text since the dates of the snapshot tasks are kept as text
+def task_signature(task):
+    return tuple(str(task.get(field)) for field in TASK_SIGNATURE_FIELDS)
+
+
+# Function to bring the tasks of a snapshot up to date. The tasks are listed without their settings and table mappings,
+# which cannot tell whether a task was modified since the snapshot. A snapshot task is only kept as it is when its
+# signature is unchanged and it is running since the same start date, any other task is described in full again
+def refresh_snapshot_tasks(snapshot_tasks):
+    snapshot_tasks = {task['ReplicationTaskArn']: task for task in snapshot_tasks}
+    tasks = {}
+    changed_arns = []
+    uncertain = 0
+
+    for task in get_replication_tasks(without_settings=True):
+        task_arn = task['ReplicationTaskArn']
+        known_task = snapshot_tasks.get(task_arn)
+        if known_task is not None and task_signature(known_task) == task_signature(task):
+            if task['Status'] in UNMODIFIABLE_TASK_STATUSES:
+                tasks[task_arn] = known_task
+                continue
+            uncertain = uncertain + 1
+        tasks[task_arn] = None
+        changed_arns.append(task_arn)
+
+    for task in get_replication_tasks_by_arn(changed_arns):
+        tasks[task['ReplicationTaskArn']] = task
+
+    logging.info('Incremental refresh of the tasks : {0} unchanged, {1} new or changed, {2} possibly modified, {3} removed..'.format(
+        len(tasks) - len(changed_arns), len(changed_arns) - uncertain, uncertain, len(set(snapshot_tasks) - set(tasks))))
+
+    return [task for task in tasks.values() if task is not None]
 
-        return tsk_stngs_to_str
+
+# Function to get the endpoint inventory and the replication tasks of the run. Without a snapshot everything is listed
+# from DMS and the tasks are streamed. With a snapshot younger than inventory_snapshot_ttl it is used as it is, except
+# for the endpoints named in the transforms which are always described again : tasks created or modified since the
+# snapshot are then missed until it is refreshed. An older snapshot is refreshed incrementally and force_full_refresh
+# lists everything again
+def load_inventory():
+    if config.use_inventory_snapshot != 'Y':
+        return build_endpoint_inventory(), get_replication_tasks()
+
+    snapshot = None if config.force_full_refresh == 'Y' else read_inventory_snapshot()
+
+    try:
+        if snapshot is None:
+            logging.info('Listing the full inventory of End Points and tasks..')
+            inventory = build_endpoint_inventory()
+            tasks = list(get_replication_tasks())
+        else:
+            age = time.time() - snapshot['taken_at']
+            logging.info('Using the inventory snapshot {0} taken {1:.0f} seconds ago..'.format(config.inventory_snapshot_file, age))
+
+            inventory = EndpointInventory()
+            for endpoint_type, endpoints in snapshot['endpoints'].items():
+                for endpoint in endpoints:
+                    inventory.add(endpoint_type, endpoint)
+
+            tasks = snapshot['tasks'] if age < config.inventory_snapshot_ttl else refresh_snapshot_tasks(snapshot['tasks'])
+
+            # Block to re-describe the endpoints of the transforms and any endpoint of the tasks missing from the snapshot
+            # Endpoints matched by pattern rules cannot be described by name, hence they are all listed again
+            if any(endpoint_rules.patterns for endpoint_rules in transform_rules().endpoints.values()):
+                inventory = build_endpoint_inventory()
+            inventory.refresh([key for key, value in list(config.src_endpoint_transforms.items())
+                               + list(config.tgt_endpoint_transforms.items())
+                               if not is_rule_pattern(key) for key in (key, value)])
+            missing_arns = [endpoint_arn for task in tasks
+                            for endpoint_arn in (task['SourceEndpointArn'], task['TargetEndpointArn'])
+                            if endpoint_arn not in inventory.endpoints_by_arn]
+            inventory.refresh(missing_arns, use_arn=True)
+
+        write_inventory_snapshot(inventory, tasks)
 
     except ClientError as e:
-        logging.exception('Error in editing ReplicationTaskSettings : ' + e)
+        logging.exception('Error in loading the inventory of End Points and tasks : {0}'.format(e))
         exit(1)
 
+    return inventory, tasks
 
-def main():
-    new_target_endpoint_arn = ''
-    new_source_endpoint_arn = ''
-    reg_cnt = 0
 
-    src_mapping_lst, tgt_mapping_lst = validate_src_tgt_endpoints()
+# Function to get the name of the performance profile of a task : the profile of the first rule of
+# task_settings_profile_rules matching the task name, otherwise default_task_settings_profile
+def task_settings_profile(task_name):
+    return transform_rules().settings_profiles.lookup(task_name, config.default_task_settings_profile)
 
-    if config.use_arn_db_transforms == 'N':
-        # Function calls to create the dictionary mapping for source and target arns
-        gen_endpoint_mapping_dict()
 
-    try:
-        for event in get_replication_tasks():
-            ReplicationTaskIdentifier = event['ReplicationTaskIdentifier']
+# Function to merge the sections of a performance profile into the task settings
+def merge_settings(settings, profile):
+    for key, value in profile.items():
+        if isinstance(value, dict) and isinstance(settings.get(key), dict):
+            merge_settings(settings[key], value)
+        else:
+            settings[key] = copy.deepcopy(value)
+
+    return settings
+
+
+# Function to check that the tuning of the task settings is a legal combination for the migration type. Returns the
+# list of the problems found
+def validate_task_settings(tsk_sttngs_dict, MigrationType):
+    problems = []
+    full_load = tsk_sttngs_dict.get('FullLoadSettings', {})
+    target_metadata = tsk_sttngs_dict.get('TargetMetadata', {})
+    tuning = tsk_sttngs_dict.get('ChangeProcessingTuning', {})
+
+    for section, values, setting, low, high in (
+            ('FullLoadSettings', full_load, 'MaxFullLoadSubTasks', 1, 49),
+            ('FullLoadSettings', full_load, 'CommitRate', 1, 50000),
+            ('TargetMetadata', target_metadata, 'ParallelLoadThreads', 0, 32),
+            ('TargetMetadata', target_metadata, 'ParallelLoadBufferSize', 0, 1000),
+            ('ChangeProcessingTuning', tuning, 'MemoryLimitTotal', 1, None),
+            ('ChangeProcessingTuning', tuning, 'MemoryKeepTime', 1, None),
+            ('ChangeProcessingTuning', tuning, 'BatchApplyMemoryLimit', 1, None)):
+        value = values.get(setting)
+        if value is None:
+            continue
+        if not isinstance(value, int) or isinstance(value, bool) or value < low or (high is not None and value > high):
+            problems.append('{0}.{1} is {2} but must be an integer {3}'.format(
+                section, setting, value, 'between {0} and {1}'.format(low, high) if high is not None else 'of at least {0}'.format(low)))
+
+    if target_metadata.get('ParallelLoadBufferSize') and not target_metadata.get('ParallelLoadThreads'):
+        problems.append('TargetMetadata.ParallelLoadBufferSize requires TargetMetadata.ParallelLoadThreads')
+
+    if target_metadata.get('BatchApplyEnabled'):
+        if MigrationType == 'full-load':
+            problems.append('TargetMetadata.BatchApplyEnabled only applies to tasks replicating changes, not to full-load tasks')
+        if target_metadata.get('SupportLobs') and target_metadata.get('FullLobMode'):
+            problems.append('TargetMetadata.BatchApplyEnabled is not supported in full LOB mode')
+
+    if tuning.get('BatchApplyTimeoutMin', 0) > tuning.get('BatchApplyTimeoutMax', float('inf')):
+        problems.append('ChangeProcessingTuning.BatchApplyTimeoutMin is greater than BatchApplyTimeoutMax')
+
+    if tuning.get('BatchApplyMemoryLimit', 0) > tuning.get('MemoryLimitTotal', float('inf')):
+        problems.append('ChangeProcessingTuning.BatchApplyMemoryLimit is greater than MemoryLimitTotal')
+
+    return problems
+
+
+# Function to edit the replication task settings to enable Cloudwatch Logs and to apply the performance profile, if
+# any. Raises ValueError when the resulting settings are not legal for the migration type
+def edit_task_settings(ReplicationTaskSettings, profile_name=None, MigrationType=None):
+    tsk_sttngs_dict = json.loads(ReplicationTaskSettings)    # converting the string to a dictionary object
+    tsk_sttngs_dict['Logging']['EnableLogging'] = config.enable_logging
+    tsk_sttngs_dict['Logging']['CloudWatchLogGroup'] = None
+    tsk_sttngs_dict['Logging']['CloudWatchLogStream'] = None
+
+    if profile_name is not None:
+        merge_settings(tsk_sttngs_dict, config.task_settings_profiles[profile_name])
+        problems = validate_task_settings(tsk_sttngs_dict, MigrationType)
+        if problems:
+            raise ValueError('Profile {0} gives illegal task settings : {1}'.format(profile_name, '; '.join(problems)))
+
+    tsk_stngs_to_str = json.dumps(tsk_sttngs_dict)           # converting the dictionary back to string
+
+    return tsk_stngs_to_str
+
+
+# Function to validate the performance profiles named in the config file before any task is planned
+def validate_settings_profiles():
+    profile_names = [profile_name for _, profile_name in config.task_settings_profile_rules]
+    if config.default_task_settings_profile is not None:
+        profile_names.append(config.default_task_settings_profile)
+
+    unknown_profiles = sorted(set(profile_names) - set(config.task_settings_profiles))
+    if unknown_profiles:
+        logging.info('Unknown performance profiles {0} in config file..Kindly rectify and run again'.format(', '.join(unknown_profiles)))
+        print('Unknown performance profiles {0} in config file..Kindly rectify and run again'.format(', '.join(unknown_profiles)))
+        exit(1)
 
-            # Block to filter only on specific tasks
-            if config.use_specific_tasks == 'Y':
+
+# Function to get the number of shards requested for a task, 1 when the task is not to be sharded
+def task_shard_count(task_name):
+    if config.use_task_sharding != 'Y':
+        return 1
+
+    return max(1, int(transform_rules().shard_counts.lookup(task_name, 1)))
+
+
+# Function to normalise a schema and table name into the key used by the table statistics
+def table_key(schema_name, table_name):
+    return '{0}.{1}'.format(schema_name, table_name).upper()
+
+
+# Function to get the size of every table of a task, either from describe_table_statistics of the current task or from
+# the statistics file given in the config file (a JSON document of "SCHEMA.TABLE": rows). The sizes are read once per
+# run and kept in table_sizes_cache
+def get_table_sizes(ReplicationTaskArn):
+    cache_key = config.table_stats_file if config.table_stats_source == 'file' else ReplicationTaskArn
+    if cache_key in table_sizes_cache:
+        return table_sizes_cache[cache_key]
+
+    if config.table_stats_source == 'file':
+        with open(config.table_stats_file) as stats_file:
+            table_sizes = {key.upper(): rows for key, rows in json.load(stats_file).items()}
+    else:
+        table_sizes = {}
+        for table in paginate(dms_client.describe_table_statistics, 'TableStatistics', ReplicationTaskArn=ReplicationTaskArn):
+            rows = table.get('FullLoadRows', 0) + table.get('Inserts', 0) - table.get('Deletes', 0)
+            table_sizes[table_key(table['SchemaName'], table['TableName'])] = max(rows, 0)
+
+    table_sizes_cache[cache_key] = table_sizes
+    return table_sizes
+
+
+# Function to tell whether two names of object locators, with % as wildcard, may match the same schema or table. Two
+# names both holding a wildcard are taken as overlapping
+def locator_names_overlap(name, other_name):
+    if '%' in name and '%' in other_name:
+        return True
+    if '%' in name:
+        return fnmatch.fnmatchcase(other_name, name.replace('%', '*'))
+    if '%' in other_name:
+        return fnmatch.fnmatchcase(name, other_name.replace('%', '*'))
+
+    return name == other_name
+
+
+# Function to get the tables, among the given table keys, selected by the include and explicit selection rules of table
+# mappings
+def selected_table_keys(rules, table_keys):
+    patterns = [table_key(rule.get('object-locator', {}).get('schema-name', '%'),
+                          rule.get('object-locator', {}).get('table-name', '%')).replace('%', '*')
+                for rule in rules if rule.get('rule-type') == 'selection'
+                and rule.get('rule-action') in SELECTING_RULE_ACTIONS]
+
+    return {key for key in table_keys if any(fnmatch.fnmatchcase(key, pattern) for pattern in patterns)}
+
+
+# Function to split the table mappings of a task into shard_count table mappings whose tables are balanced by size.
+# Include and explicit selection rules naming one table are the units spread across the shards, with the table-settings
+# rules of their table. Include rules with a wildcard cannot be split and are kept whole in one unit weighed by all the
+# tables they match, together with the single table rules and the other wildcard includes which may select the same
+# tables. Exclude and all the other rules are copied to every shard. Returns the table mappings of each shard with the total
+# size of its tables. Raises ValueError when a known table would be lost or selected by more than one shard
+def shard_table_mappings(TableMappings, shard_count, table_sizes):
+    rules = json.loads(TableMappings)['rules']
+    units = {}            # unit key -> rules of the unit
+    locators = {}         # unit key -> (schema name, table name) of its include rule
+    shared_rules = []     # rules copied to every shard
+
+    for rule in rules:
+        locator = rule.get('object-locator', {})
+        schema_name, table_name = locator.get('schema-name', '%'), locator.get('table-name', '%')
+        is_explicit = '%' not in schema_name and '%' not in table_name
+
+        if rule.get('rule-type') == 'selection' and rule.get('rule-action') in SELECTING_RULE_ACTIONS:
+            unit = table_key(schema_name, table_name) if is_explicit else 'pattern:{0}'.format(rule.get('rule-id'))
+            units.setdefault(unit, []).append(rule)
+            locators[unit] = (schema_name.upper(), table_name.upper())
+        elif rule.get('rule-type') == 'table-settings' and is_explicit:
+            units.setdefault(table_key(schema_name, table_name), []).append(rule)
+        else:
+            shared_rules.append(rule)
+
+    # Block to merge every unit into the first wildcard unit which may select the same tables, so that no table is
+    # selected by two shards
+    merged_into = {unit: unit for unit in locators}
+
+    def merged_root(unit):
+        while merged_into[unit] != unit:
+            unit = merged_into[unit]
+        return unit
+
+    for unit in locators:
+        if not unit.startswith('pattern:'):
+            continue
+        for other_unit in locators:
+            if other_unit != unit and all(locator_names_overlap(name, other_name) for name, other_name
+                                          in zip(locators[unit], locators[other_unit])):
+                merged_into[merged_root(other_unit)] = merged_root(unit)
+
+    selected = {}         # unit key -> keys of the units merged into it
+    for unit in locators:
+        selected.setdefault(merged_root(unit), []).append(unit)
+    for root, merged_units in selected.items():
+        for unit in merged_units:
+            if unit != root:
+                units[root].extend(units.pop(unit))
+
+    # Block to weigh the units, a table without statistics weighs as much as the average known table
+    known_sizes = [size for size in table_sizes.values() if size > 0]
+    default_size = sum(known_sizes) / len(known_sizes) if known_sizes else 1
+    table_keys = set(table_sizes) | {unit for unit in locators if not unit.startswith('pattern:')}
+    unit_sizes = {unit: sum(table_sizes.get(key) or default_size for key in selected_table_keys(units[unit], table_keys))
+                  or default_size for unit in selected}
+
+    # Block to assign the largest units first, each one to the shard with the least load so far
+    shard_count = max(1, min(shard_count, len(selected)))
+    shards = [(0, idx, []) for idx in range(shard_count)]
+    heapq.heapify(shards)
+    for unit in sorted(selected, key=lambda unit: (-unit_sizes[unit], unit)):
+        load, idx, shard_units = heapq.heappop(shards)
+        shard_units.append(unit)
+        heapq.heappush(shards, (load + unit_sizes[unit], idx, shard_units))
+    shards = sorted(shards, key=lambda shard: shard[1])
+
+    sharded_mappings = []
+    for load, _, shard_units in shards:
+        shard_rules = [rule for unit in shard_units for rule in units[unit]]
+        for unit, unit_rules in units.items():
+            if unit not in selected:
+                shard_rules.extend(unit_rules)     # table-settings rules of a table which is not selected explicitly
+        sharded_mappings.append((shard_rules + shared_rules, load))
+
+    # Block to make sure no known table is lost or selected by more than one shard
+    shard_tables = [selected_table_keys(shard_rules, table_keys) for shard_rules, _ in sharded_mappings]
+    if sum(len(tables) for tables in shard_tables) != len(set().union(*shard_tables)) \
+            or set().union(*shard_tables) != selected_table_keys(rules, table_keys):
+        raise ValueError('Sharding of the table mappings lost or duplicated tables')
+
+    return [(json.dumps({'rules': shard_rules}), load) for shard_rules, load in sharded_mappings]
+
+
+# Function to split one plan entry into the plan entries of its shards as per task_shard_counts. The identifier of each
+# shard is the edited task name followed by its shard number
+def shard_plan_entry(entry):
+    shard_count = task_shard_count(entry['CurrentReplicationTaskIdentifier'])
+    if shard_count == 1:
+        return [entry]
+
+    table_sizes = get_table_sizes(entry['CurrentReplicationTaskArn'])
+    sharded_mappings = shard_table_mappings(entry['TableMappings'], shard_count, table_sizes)
+    if len(sharded_mappings) == 1:
+        logging.info('Task {0} selects a single table or pattern hence it is not sharded..'.format(
+            entry['CurrentReplicationTaskIdentifier']))
+        return [entry]
+
+    shard_entries = []
+    for idx, (TableMappings, load) in enumerate(sharded_mappings, start=1):
+        shard_entries.append(dict(entry,
+                                  ReplicationTaskIdentifier='{0}-shard-{1:02d}'.format(entry['ReplicationTaskIdentifier'], idx),
+                                  TableMappings=TableMappings,
+                                  Shard='{0}/{1}'.format(idx, len(sharded_mappings)),
+                                  ShardLoad=load))
+    logging.info('Task {0} is sharded into {1} tasks with loads {2}..'.format(
+        entry['CurrentReplicationTaskIdentifier'], len(shard_entries), ', '.join(
+            '{0:.0f}'.format(shard_entry['ShardLoad']) for shard_entry in shard_entries)))
+
+    return shard_entries
+
+
+# Function to estimate the capacity of a replication instance class from its vCPUs and memory (GiB), e.g. dms.r5.xlarge
+def instance_capacity(instance_class):
+    parts = instance_class.split('.')
+    family, size = (parts[1], parts[2]) if len(parts) == 3 else ('', parts[-1])
+    vcpus = INSTANCE_SIZE_VCPUS.get(size, 2)
+
+    if family.startswith('t'):
+        memory_gib = {'micro': 1, 'small': 2, 'medium': 4, 'large': 8}.get(size, 4)
+    else:
+        memory_gib = vcpus * INSTANCE_FAMILY_MEMORY_PER_VCPU.get(family[:1], 4)
+
+    return vcpus + memory_gib / 4
+
+
+# Function to count the tables selected by table mappings, a selection rule with a wildcard counting as
+# pattern_rule_table_estimate tables
+def count_selected_tables(TableMappings):
+    tables = 0
+    for rule in json.loads(TableMappings)['rules']:
+        if rule.get('rule-type') != 'selection' or rule.get('rule-action') not in SELECTING_RULE_ACTIONS:
+            continue
+        locator = rule.get('object-locator', {})
+        is_pattern = '%' in locator.get('schema-name', '%') or '%' in locator.get('table-name', '%')
+        tables += config.pattern_rule_table_estimate if is_pattern else 1
+
+    return tables
+
+
+# Function to estimate the load of a planned task from the tables it selects, their size when table statistics are
+# used, and its migration type
+def estimate_task_load(entry):
+    load = document_cache.transform('SelectedTables', entry['TableMappings'], count_selected_tables)
+    if config.task_load_source == 'stats':
+        rows = entry['ShardLoad'] if 'ShardLoad' in entry else sum(get_table_sizes(entry['CurrentReplicationTaskArn']).values())
+        load += rows / 1000000
+
+    return load * MIGRATION_TYPE_LOAD.get(entry['MigrationType'], 1.0)
+
+
+# Function to describe the given replication instances in batches through a replication-instance-arn filter
+def get_replication_instances(ReplicationInstanceArns):
+    instances = {}
+    for instance_arns in chunk_filter_values(ReplicationInstanceArns):
+        filters = [{"Name": 'replication-instance-arn', "Values": instance_arns}]
+        for instance in paginate(dms_client.describe_replication_instances, 'ReplicationInstances', Filters=filters):
+            instances[instance['ReplicationInstanceArn']] = instance
+
+    return instances
+
+
+# Function to get the replication instance classes of the instance pool
+def get_instance_classes(ReplicationInstanceArns):
+    instance_classes = {instance_arn: instance['ReplicationInstanceClass']
+                        for instance_arn, instance in get_replication_instances(ReplicationInstanceArns).items()}
+
+    missing_instances = set(ReplicationInstanceArns) - set(instance_classes)
+    if missing_instances:
+        logging.info('Replication instances {0} of the pool are not valid..Kindly rectify and run again'.format(
+            ', '.join(sorted(missing_instances))))
+        print('Invalid replication instances present in the pool of the config file..Kindly validate and re-run again..')
+        exit(1)
+
+    return instance_classes
+
+
+# Function to place the planned tasks on the replication instance pool. The tasks are taken largest load first and each
+# one goes to the instance whose utilisation (load over capacity) stays the lowest. The tasks with a full load are
+# spread in rounds of full_load_placement_round per instance : an instance only takes more once every instance of the
+# pool has as many, the start scheduler then runs them max_concurrent_full_loads_per_instance at a time. The placement
+# is logged and written to placement_file
+def place_plan_entries(plan):
+    instance_classes = get_instance_classes(config.replication_instance_pool)
+    placement = {instance_arn: {'ReplicationInstanceClass': instance_classes[instance_arn],
+                                'Capacity': instance_capacity(instance_classes[instance_arn]),
+                                'Load': 0.0, 'FullLoads': 0, 'Tasks': []}
+                 for instance_arn in config.replication_instance_pool}
+
+    entry_loads = [(estimate_task_load(entry), entry) for entry in plan]
+    for load, entry in sorted(entry_loads, key=lambda entry_load: (-entry_load[0], entry_load[1]['ReplicationTaskIdentifier'])):
+        has_full_load = entry['MigrationType'] in ('full-load', 'full-load-and-cdc')
+        candidates = list(placement)
+        if has_full_load and config.full_load_placement_round is not None:
+            full_load_rounds = {instance_arn: instance['FullLoads'] // config.full_load_placement_round
+                                for instance_arn, instance in placement.items()}
+            fewest_rounds = min(full_load_rounds.values())
+            candidates = [instance_arn for instance_arn in candidates if full_load_rounds[instance_arn] == fewest_rounds]
+
+        instance_arn = min(candidates, key=lambda arn: ((placement[arn]['Load'] + load) / placement[arn]['Capacity'], arn))
+        instance = placement[instance_arn]
+        instance['Load'] += load
+        instance['FullLoads'] += 1 if has_full_load else 0
+        instance['Tasks'].append(entry['ReplicationTaskIdentifier'])
+        entry['ReplicationInstanceArn'] = instance_arn
+        entry['EstimatedLoad'] = round(load, 3)
+
+    for instance_arn, instance in placement.items():
+        logging.info('Placement on {0} ({1}) : {2} tasks, {3} full loads, utilisation {4:.2f}'.format(
+            instance_arn, instance['ReplicationInstanceClass'], len(instance['Tasks']), instance['FullLoads'],
+            instance['Load'] / instance['Capacity']))
+        if config.full_load_placement_round is not None and instance['FullLoads'] > config.full_load_placement_round:
+            logging.info('{0} full loads are placed on {1} beyond one placement round..They are started in turn'.format(
+                instance['FullLoads'] - config.full_load_placement_round, instance_arn))
+
+    with open(config.placement_file, 'w') as placement_file:
+        json.dump(placement, placement_file, indent=2)
+    print('Placement of {0} tasks on {1} replication instances written to {2}'.format(
+        len(plan), len(placement), config.placement_file))
+
+    return placement
+
+
+# Class appending the completed steps of a plan to the journal file, one JSON document per line. The file is only ever
+# appended to so that a run dying at any point leaves every step recorded before it intact
+class RunJournal:
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.lock = threading.Lock()
+
+    def record(self, step, **fields):
+        line = json.dumps(dict(fields, step=step, recorded_at=time.time()), default=str)
+        with self.lock:
+            with open(self.journal_file, 'a') as journal:
+                journal.write(line + '\n')
+                journal.flush()
+
+
+# Function to read the steps already completed for the plan from the journal file. A partly written last line, left by
+# a run which died while writing it, is ignored
+def read_run_journal():
+    completed = {'connections': set(), 'creates': {}, 'starts': set(), 'complete': False}
+    try:
+        with open(config.journal_file) as journal:
+            for line in journal:
                 try:
-                    task_nm = config.task_names.index(ReplicationTaskIdentifier)
+                    entry = json.loads(line)
                 except ValueError:
                     continue
+                if entry['step'] == 'connection':
+                    completed['connections'].add((entry['ReplicationInstanceArn'], entry['EndpointArn']))
+                elif entry['step'] == 'create':
+                    completed['creates'][entry['ReplicationTaskIdentifier']] = entry
+                elif entry['step'] == 'start':
+                    completed['starts'].add(entry['ReplicationTaskArn'])
+                elif entry['step'] == 'complete':
+                    completed['complete'] = True
+    except FileNotFoundError:
+        pass
+
+    return completed
+
+
+# Function to read the plan file. Returns None when there is no plan for the current configuration. A plan which is not
+# complete yet and was made for another configuration stops the run instead of being resumed or replaced, as part of its
+# tasks may already have been created as per the other configuration
+def read_plan():
+    try:
+        with open(config.plan_file) as plan_file:
+            plan = json.load(plan_file)
+    except FileNotFoundError:
+        return None
+
+    if plan.get('version') != PLAN_VERSION or plan.get('key') != list(plan_key()):
+        if plan.get('version') == PLAN_VERSION and not read_run_journal()['complete']:
+            logging.info('Unfinished plan {0} was made for another configuration..'.format(config.plan_file))
+            print('Unfinished plan {0} was made for another configuration..Kindly restore the configuration or archive the plan and run again'.format(config.plan_file))
+            exit(1)
+        logging.info('Plan {0} was made for another configuration..'.format(config.plan_file))
+        return None
+
+    return plan
+
+
+# Function to identify the configuration a plan was made for : the region, the replication instance, the task selection
+# and a digest of the PLAN_CONFIG_SETTINGS
+def plan_key():
+    task_names = sorted(config.task_names) if config.use_specific_tasks == 'Y' else None
+    plan_settings = {setting: getattr(config, setting, None) for setting in PLAN_CONFIG_SETTINGS}
+    settings_digest = hashlib.sha256(json.dumps(plan_settings, sort_keys=True, default=str).encode()).hexdigest()
+    return config.aws_region, config.replication_instance_arn, task_names, settings_digest
+
+
+# Function to write a new plan and start its journal. The plan and journal of a previous plan are kept alongside with
+# the time they were archived as suffix
+def write_plan(entries):
+    suffix = datetime.datetime.now().strftime("%y-%m-%d-%H-%M-%S")
+    for run_file in (config.plan_file, config.journal_file):
+        if os.path.exists(run_file):
+            os.replace(run_file, '{0}.{1}'.format(run_file, suffix))
+
+    plan = {'version': PLAN_VERSION, 'key': plan_key(), 'created_at': time.time(), 'entries': entries}
+    temp_file = config.plan_file + '.tmp'
+    with open(temp_file, 'w') as plan_file:
+        json.dump(plan, plan_file)
+    os.replace(temp_file, config.plan_file)
+
+    logging.info('Plan of {0} tasks written to {1}..'.format(len(entries), config.plan_file))
+
+    return plan
+
+
+# Function to plan the clone of one task : its plan entries, several when the task is sharded, or none when its endpoints
+# are not transformed. Raises ValueError when its performance profile gives illegal settings
+def plan_task(event, inventory):
+    ReplicationTaskIdentifier = event['ReplicationTaskIdentifier']
+    rep_task_edited_name = edit_task_name_prefix(ReplicationTaskIdentifier)
+
+    SourceEndpointArn = event['SourceEndpointArn']
+    TargetEndpointArn = event['TargetEndpointArn']
+    ReplicationInstanceArn = event['ReplicationInstanceArn']
+    MigrationType = event['MigrationType']
+
+    new_source_endpoint_arn = inventory.new_endpoint_arn('Source', SourceEndpointArn)
+    if new_source_endpoint_arn is None:
+        return []
+
+    new_target_endpoint_arn = inventory.new_endpoint_arn('Target', TargetEndpointArn)
+    if new_target_endpoint_arn is None:
+        return []
+
+    # The settings are only transformed for the tasks which are cloned, a task which is not cloned cannot fail the plan
+    TableMappings = document_cache.intern('TableMappings', event['TableMappings'])
+    profile_name = task_settings_profile(ReplicationTaskIdentifier)
+    ReplicationTaskSettings = document_cache.transform('ReplicationTaskSettings', event['ReplicationTaskSettings'],
+                                                       edit_task_settings, profile_name, MigrationType)
+
+    new_replication_instance_arn = ReplicationInstanceArn
+    if config.change_replication_instance == 'Y':
+        logging.info('Change in Replication instance..Switching to new replication instance for creation of new task..')
+        new_replication_instance_arn = config.new_replication_inst_arn
+
+    # Printing the values in the log file
+    logging.info('''Parameters for the program are :
+            CurrentReplicationTaskIdentifier : {0}
+            NewReplicationTaskIdentifier     : {1}
+            CurrentReplicationInstanceArn    : {2}
+            CurrentSourceEndpointArn         : {3}
+            NewSourceEndpointArn             : {4}
+            CurrentTargetEndpointArn         : {5}
+            NewTargetEndpointArn             : {6}
+            MigrationType                    : {7}
+            SettingsProfile                  : {8}'''.format(ReplicationTaskIdentifier, rep_task_edited_name, new_replication_instance_arn,
+                                SourceEndpointArn, new_source_endpoint_arn, TargetEndpointArn, new_target_endpoint_arn, MigrationType,
+                                profile_name))
+
+    if TargetEndpointArn == new_target_endpoint_arn \
+            and SourceEndpointArn != new_source_endpoint_arn:
+        logging.info('Change in Source End Point ARN. Hence proceeding to create tasks only for whose source arn changed..')
+    elif SourceEndpointArn == new_source_endpoint_arn \
+            and TargetEndpointArn != new_target_endpoint_arn:
+        logging.info('Change in Target End Point ARN. Hence proceeding to create tasks only for whose target arn changed..')
+    else:
+        logging.info('Change in both Source and Target End Point ARN. Hence proceeding to create tasks for both changed arns..')
+
+    return shard_plan_entry({
+        'CurrentReplicationTaskIdentifier': ReplicationTaskIdentifier,
+        'CurrentReplicationTaskArn': event['ReplicationTaskArn'],
+        'CurrentSourceEndpointArn': SourceEndpointArn,
+        'CurrentTargetEndpointArn': TargetEndpointArn,
+        'CurrentReplicationInstanceArn': ReplicationInstanceArn,
+        'ReplicationTaskIdentifier': rep_task_edited_name,
+        'SourceEndpointArn': new_source_endpoint_arn,
+        'TargetEndpointArn': new_target_endpoint_arn,
+        'ReplicationInstanceArn': new_replication_instance_arn,
+        'MigrationType': MigrationType,
+        'TableMappings': TableMappings,
+        'ReplicationTaskSettings': ReplicationTaskSettings,
+        'SettingsProfile': profile_name
+    })
+
+
+# Function to compute the plan of the run : for every task to clone, the current task and the complete create request
+# of its clone with the new identifier, endpoints, replication instance and transformed settings. The inventory and tasks
+# are loaded unless given by the caller
+def build_plan(inventory=None, replication_tasks=None):
+    plan = []
+    invalid_tasks = []
+    validate_settings_profiles()
+
+    # Endpoints are listed once and shared by the validation and the per-task loop
+    with metrics.phase('inventory'):
+        if inventory is None:
+            inventory, replication_tasks = load_inventory()
+        validate_src_tgt_endpoints(inventory)
+
+    rules = transform_rules()
 
-            rep_task_edited_name = edit_task_name_prefix(ReplicationTaskIdentifier)
+    try:
+        for event in replication_tasks:
+            ReplicationTaskIdentifier = event['ReplicationTaskIdentifier']
 
-            SourceEndpointArn = event['SourceEndpointArn']
-            TargetEndpointArn = event['TargetEndpointArn']
-            ReplicationInstanceArn = event['ReplicationInstanceArn']
-            MigrationType = event['MigrationType']
-            TableMappings = event['TableMappings']
-            ReplicationTaskSettings = event['ReplicationTaskSettings']
-            ReplicationTaskSettings = edit_task_settings(ReplicationTaskSettings)
+            # Block to filter only on specific tasks
+            if not rules.select_task(ReplicationTaskIdentifier):
+                continue
 
-            if config.use_arn_db_transforms == 'Y':
-                try:
-                    ret = src_mapping_lst.index(SourceEndpointArn)
-                    new_source_endpoint_arn = config.src_endpoint_transforms[SourceEndpointArn]
+            try:
+                plan.extend(plan_task(event, inventory))
+            except ValueError as e:
+                logging.info('Task {0} : {1}'.format(ReplicationTaskIdentifier, e))
+                invalid_tasks.append(ReplicationTaskIdentifier)
 
-                except ValueError:
-                    continue
-                except KeyError:
-                    continue
+    except ClientError as e:
+        logging.exception(e)
+        exit(1)
 
-                try:
-                    ret = tgt_mapping_lst.index(TargetEndpointArn)
-                    new_target_endpoint_arn = config.tgt_endpoint_transforms[TargetEndpointArn]
+    if plan and config.use_instance_pool == 'Y':
+        place_plan_entries(plan)
 
-                except ValueError:
-                    continue
-                except KeyError:
-                    continue
+    caches = metrics.as_dict()['caches']
+    logging.info('Document cache : {0}'.format(', '.join('{0} {1} hits {2} misses'.format(
+        cache_name, cache['hits'], cache['misses']) for cache_name, cache in sorted(caches.items()))))
 
-            elif config.use_arn_db_transforms == 'N':
-                try:
-                    new_src_endpnt_id = config.src_endpoint_transforms[dict_src_arns[SourceEndpointArn]]
+    if invalid_tasks:
+        logging.info('{0} tasks get illegal settings from their performance profile..Kindly rectify and run again'.format(len(invalid_tasks)))
+        print('{0} tasks get illegal settings from their performance profile..Kindly check the log file {1}'.format(
+            len(invalid_tasks), config.dms_op_log_filepath))
+        exit(1)
 
-                except KeyError:
-                    continue
+    return plan
+
+
+# Function to apply the plan : test the new endpoints, create the tasks and wait for them to be ready. With a journal,
+# the steps recorded by a previous run of the same plan are skipped without any API call. The results are summarised
+# by report_task_creation unless report is False
+def apply_plan(plan, journal=None, completed=None, report=True):
+    completed = completed or {'connections': set(), 'creates': {}, 'starts': set(), 'complete': False}
+    resumed = [dict(completed['creates'][entry['ReplicationTaskIdentifier']], Resumed=True)
+               for entry in plan if entry['ReplicationTaskIdentifier'] in completed['creates']]
+    pending = [entry for entry in plan if entry['ReplicationTaskIdentifier'] not in completed['creates']]
+    if resumed:
+        logging.info('Resuming the plan : {0} tasks were completed by a previous run, {1} remaining..'.format(
+            len(resumed), len(pending)))
+
+    # Block to test every new endpoint once, from the replication instance its tasks will run on
+    connection_pairs = []
+    for entry in pending:
+        connection_pairs.append((entry['ReplicationInstanceArn'], entry['SourceEndpointArn']))
+        connection_pairs.append((entry['ReplicationInstanceArn'], entry['TargetEndpointArn']))
+
+    for pair in completed['connections']:
+        connection_verdicts[pair] = True
+    with metrics.phase('connection_tests'):
+        verdicts = test_endpoint_connections(connection_pairs)
+    if journal is not None:
+        for pair in dict.fromkeys(connection_pairs):
+            if verdicts[pair] and pair not in completed['connections']:
+                journal.record('connection', ReplicationInstanceArn=pair[0], EndpointArn=pair[1])
+
+    if not all(verdicts[pair] for pair in connection_pairs):
+        logging.info('Provided End points are not valid/active...Please rectify and run again')
+        print('Provided End points are not valid/active...Please rectify and run again')
+        exit(1)
+
+    with metrics.phase('create_tasks'):
+        results = resumed + create_dms_tasks(pending, journal) if pending else resumed
+    if config.wait_for_ready_tasks == 'Y' or config.start_new_tasks == 'Y':
+        with metrics.phase('wait_ready'):
+            wait_for_tasks_ready(results)
 
-                for keys, values in dict_src_arns.items():
-                    if values == new_src_endpnt_id:
-                        new_source_endpoint_arn = keys
+    if config.start_new_tasks == 'Y':
+        with metrics.phase('start_tasks'):
+            start_tasks_staggered(results, plan, journal, completed['starts'])
 
+    if journal is not None and all(result['Result'] != 'failed' and result.get('StartStatus') in (None, 'started')
+                                   for result in results):
+        journal.record('complete')
+    if report:
+        report_task_creation(results)
+
+    return results
+
+
+# Function to plan and apply the clone of the tasks of one replication instance as per the configuration
+def run_clone():
+    if config.use_async_engine == 'Y':
+        if config.use_run_journal == 'Y' or config.use_instance_pool == 'Y' or config.use_inventory_snapshot == 'Y':
+            logging.info('The run journal, the instance pool and the inventory snapshot need the whole inventory or plan '
+                         'upfront..Using the synchronous engine')
+        else:
+            return asyncio.run(async_clone())
+
+    if config.use_run_journal != 'Y':
+        plan = build_plan()
+        journal, completed = None, None
+    else:
+        journal = RunJournal(config.journal_file)
+        saved_plan = read_plan()
+        completed = read_run_journal() if saved_plan is not None else None
+
+        if saved_plan is not None and not completed['complete']:
+            logging.info('Resuming the unfinished plan {0}..'.format(config.plan_file))
+            print('Resuming the unfinished plan {0}..'.format(config.plan_file))
+            plan = saved_plan['entries']
+        else:
+            plan = write_plan(build_plan())['entries']
+            completed = None
+
+    if not plan:
+        logging.info('Provided ARNs are not part of the replication tasks..Hence no tasks are created')
+        print('Provided ARNs are not part of the replication tasks..Hence no tasks are created')
+        return []
+
+    return apply_plan(plan, journal, completed)
+
+
+# Marker put on the queues of the asynchronous pipeline once a stage has no more items for the next one
+PIPELINE_END = object()
+
+
+# Function to run one stage of the asynchronous pipeline on worker_count workers. Each item taken from in_queue is given
+# to handle, whose output items are put on out_queue. The bounded queues give the backpressure between the stages
+async def run_pipeline_stage(in_queue, out_queue, worker_count, handle):
+
+    async def worker():
+        while True:
+            item = await in_queue.get()
+            if item is PIPELINE_END:
+                await in_queue.put(PIPELINE_END)      # for the other workers of the stage
+                return
+            for output_item in await handle(item):
+                await out_queue.put(output_item)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, worker_count))))
+    await out_queue.put(PIPELINE_END)
+
+
+# Function to clone the tasks through an asynchronous pipeline : pages of tasks feed their transformation and the plan
+# entries feed the connection tests of their new endpoints, with a bounded queue between two stages and a bounded
+# number of workers per stage. The blocking boto3 calls run on a pool of threads sized for the stages, the event loop
+# only schedules them. As in the synchronous engine the tasks are only created once the settings of every task and the
+# connection of every endpoint have passed, any invalid settings or failed connection ends the run without creates
+async def async_clone():
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+        max_workers=4 + config.async_transform_workers + config.max_connection_test_workers + config.max_create_workers))
+    validate_settings_profiles()
+    with metrics.phase('inventory'):
+        inventory = await asyncio.to_thread(build_endpoint_inventory)
+        validate_src_tgt_endpoints(inventory)
+
+    throttle = AdaptiveThrottle()
+    task_queue, entry_queue, end_queue = (asyncio.Queue(maxsize=config.async_queue_size) for _ in range(3))
+    connection_tests = {}     # (ReplicationInstanceArn, EndpointArn) -> future of the verdict of its connection test
+    untested_pairs = []       # pairs waiting for the next batch of connection tests
+    batches = []              # asyncio task running the batches of connection tests
+    rules = transform_rules()
+    plan, checked, invalid_tasks, failed_pairs = [], [], [], []
+    aborted = asyncio.Event()
+
+    async def list_tasks():
+        for filters in replication_task_filter_sets():
+            kwargs = {'Filters': filters, 'MaxRecords': config.max_records}
+            while not aborted.is_set():
                 try:
-                    ret_id = dict_tgt_arns.get(TargetEndpointArn, 'None')
+                    response = await asyncio.to_thread(call_with_retries, dms_client.describe_replication_tasks,
+                                                       throttle, **kwargs)
+                except ClientError as e:
+                    if e.response.get('Error', {}).get('Code') == 'ResourceNotFoundFault' and 'Marker' not in kwargs:
+                        break
+                    raise
+                for task in response.get('ReplicationTasks', []):
+                    await task_queue.put(task)
+                if not response.get('Marker'):
+                    break
+                kwargs['Marker'] = response['Marker']
+        await task_queue.put(PIPELINE_END)
+
+    async def transform(event):
+        if aborted.is_set() or not rules.select_task(event['ReplicationTaskIdentifier']):
+            return []
+        try:
+            entries = await asyncio.to_thread(plan_task, event, inventory)
+        except ValueError as e:
+            logging.info('Task {0} : {1}'.format(event['ReplicationTaskIdentifier'], e))
+            invalid_tasks.append(event['ReplicationTaskIdentifier'])
+            aborted.set()
+            return []
+        plan.extend(entries)
+        return entries
+
+    # The pairs met while a batch of tests is running are tested together in the next batch, so that the tests are
+    # polled through describe_connections in batches as in the synchronous engine. An error of a batch is passed on to
+    # the workers waiting for its verdicts, so that it ends the pipeline as the errors of the listing do
+    async def test_connection_batches():
+        while untested_pairs:
+            batch = list(untested_pairs)
+            del untested_pairs[:]
+            try:
+                verdicts = await asyncio.to_thread(test_endpoint_connections, batch)
+            except Exception as e:
+                for pair in batch:
+                    connection_tests[pair].set_exception(e)
+                    connection_tests[pair].exception()     # raised by the workers awaiting it, not logged as lost
+                continue
+            for pair in batch:
+                connection_tests[pair].set_result(verdicts[pair])
+
+    async def check_connections(entry):
+        pairs = [(entry['ReplicationInstanceArn'], entry['SourceEndpointArn']),
+                 (entry['ReplicationInstanceArn'], entry['TargetEndpointArn'])]
+        for pair in pairs:
+            if pair not in connection_tests:
+                connection_tests[pair] = asyncio.get_running_loop().create_future()
+                untested_pairs.append(pair)
+        if untested_pairs and (not batches or batches[-1].done()):
+            batches.append(asyncio.ensure_future(test_connection_batches()))
+        verdicts = [await connection_tests[pair] for pair in pairs]
+        for pair, verdict in zip(pairs, verdicts):
+            if not verdict and pair not in failed_pairs:
+                failed_pairs.append(pair)
+                aborted.set()
+        if all(verdicts) and not aborted.is_set():
+            checked.append(entry)
+        return []
+
+    # The workers checking the connections mostly wait for the verdict of a batch, hence there are as many of them as
+    # items queued between two stages
+    with metrics.phase('async_pipeline'):
+        try:
+            await asyncio.gather(
+                list_tasks(),
+                run_pipeline_stage(task_queue, entry_queue, config.async_transform_workers, transform),
+                run_pipeline_stage(entry_queue, end_queue, config.async_queue_size, check_connections))
+        except (BotoCoreError, ClientError) as e:
+            logging.exception(e)
+            exit(1)
+
+    if invalid_tasks:
+        logging.info('{0} tasks get illegal settings from their performance profile..Kindly rectify and run again'.format(len(invalid_tasks)))
+        print('{0} tasks get illegal settings from their performance profile..Kindly check the log file {1}'.format(
+            len(invalid_tasks), config.dms_op_log_filepath))
+        exit(1)
+    if failed_pairs:
+        logging.info('Provided End points are not valid/active...Please rectify and run again')
+        print('Provided End points are not valid/active...Please rectify and run again')
+        exit(1)
+
+    if not plan:
+        logging.info('Provided ARNs are not part of the replication tasks..Hence no tasks are created')
+        print('Provided ARNs are not part of the replication tasks..Hence no tasks are created')
+        return []
+
+    order = {entry['ReplicationTaskIdentifier']: idx for idx, entry in enumerate(plan)}
+    checked.sort(key=lambda entry: order[entry['ReplicationTaskIdentifier']])
+    with metrics.phase('create_tasks'):
+        results = await asyncio.to_thread(create_dms_tasks, checked)
+    if config.wait_for_ready_tasks == 'Y' or config.start_new_tasks == 'Y':
+        with metrics.phase('wait_ready'):
+            await asyncio.to_thread(wait_for_tasks_ready, results)
+    if config.start_new_tasks == 'Y':
+        with metrics.phase('start_tasks'):
+            await asyncio.to_thread(start_tasks_staggered, results, plan)
+    report_task_creation(results)
+
+    return results
+
+
+# Function to get the pairs of original and cloned tasks of the last plan from the plan and journal files. A sharded
+# task is paired with all its shards
+def get_comparison_pairs():
+    saved_plan = read_plan()
+    if saved_plan is None:
+        logging.info('No plan found in {0} for the current configuration..Hence there are no tasks to compare'.format(
+            config.plan_file))
+        print('No plan found for the current configuration..Kindly run the clone with use_run_journal set to Y first')
+        exit(1)
 
-                    if ret_id != 'None':
-                        new_tgt_endpnt_id = config.tgt_endpoint_transforms[ret_id]
-                    else:
-                        continue
+    creates = read_run_journal()['creates']
+    pairs = {}
+    for entry in saved_plan['entries']:
+        created = creates.get(entry['ReplicationTaskIdentifier'])
+        if created is None or not created.get('ReplicationTaskArn'):
+            logging.info('No clone of DMS task {0} is recorded in the journal..Hence it is not compared'.format(
+                entry['ReplicationTaskIdentifier']))
+            continue
+        pair = pairs.setdefault(entry['CurrentReplicationTaskArn'], {
+            'ReplicationTaskIdentifier': entry['CurrentReplicationTaskIdentifier'],
+            'Old': {entry['CurrentReplicationTaskArn']: entry['CurrentReplicationInstanceArn']},
+            'New': {}})
+        pair['New'][created['ReplicationTaskArn']] = entry['ReplicationInstanceArn']
+
+    return list(pairs.values())
+
+
+# Function to sum the table statistics of one task : the rows of its full load, the changes applied by CDC and the
+# time taken by the full load, from the start of its first table to the end of its last one
+def get_task_table_statistics(ReplicationTaskArn, throttle):
+    summary = {'Tables': 0, 'FullLoadRows': 0, 'CdcChanges': 0, 'FullLoadSeconds': None}
+    started, ended = None, None
+    for table in paginate(dms_client.describe_table_statistics, 'TableStatistics', throttle,
+                          ReplicationTaskArn=ReplicationTaskArn):
+        summary['Tables'] += 1
+        summary['FullLoadRows'] += table.get('FullLoadRows', 0)
+        summary['CdcChanges'] += table.get('Inserts', 0) + table.get('Updates', 0) + table.get('Deletes', 0)
+        if table.get('FullLoadStartTime') and table.get('FullLoadEndTime'):
+            started = min(started or table['FullLoadStartTime'], table['FullLoadStartTime'])
+            ended = max(ended or table['FullLoadEndTime'], table['FullLoadEndTime'])
+
+    if started is not None:
+        summary['FullLoadSeconds'] = (ended - started).total_seconds()
+
+    return summary
+
+
+# Function to get the CloudWatch datapoints of the metrics, COMPARISON_METRICS by default, of the given tasks over the
+# window (in seconds) before now, the comparison period by default. The datapoints are keyed by task and metric, newest
+# first. The queries of all the tasks are sent in batches of MAX_METRIC_DATA_QUERIES per GetMetricData call
+def get_task_metric_values(task_instances, throttle, metric_names=COMPARISON_METRICS, window=None, period=None):
+    ended = datetime.datetime.now(datetime.timezone.utc)
+    started = ended - datetime.timedelta(seconds=window or config.comparison_period_hours * 3600)
+
+    queries = {}      # query Id -> (ReplicationTaskArn, metric name, query)
+    for task_arn, instance_identifier in task_instances.items():
+        for metric_name in metric_names:
+            query_id = 'q{0}'.format(len(queries))
+            queries[query_id] = (task_arn, metric_name, {
+                'Id': query_id,
+                'MetricStat': {
+                    'Metric': {'Namespace': 'AWS/DMS', 'MetricName': metric_name, 'Dimensions': [
+                        {'Name': 'ReplicationInstanceIdentifier', 'Value': instance_identifier},
+                        {'Name': 'ReplicationTaskIdentifier', 'Value': task_arn.split(':')[-1]}]},
+                    'Period': period or config.comparison_metric_period,
+                    'Stat': 'Average'},
+                'ReturnData': True})
+
+    values = {task_arn: {metric_name: [] for metric_name in metric_names} for task_arn in task_instances}
+    query_ids = list(queries)
+    for idx in range(0, len(query_ids), MAX_METRIC_DATA_QUERIES):
+        kwargs = {'MetricDataQueries': [queries[query_id][2] for query_id in query_ids[idx:idx + MAX_METRIC_DATA_QUERIES]],
+                  'StartTime': started, 'EndTime': ended, 'ScanBy': 'TimestampDescending'}
+        while True:
+            response = call_with_retries(get_cloudwatch_client().get_metric_data, throttle, **kwargs)
+            for result in response['MetricDataResults']:
+                task_arn, metric_name, _ = queries[result['Id']]
+                values[task_arn][metric_name].extend(result['Values'])
+            if not response.get('NextToken'):
+                break
+            kwargs['NextToken'] = response['NextToken']
+        kwargs.pop('NextToken', None)
+
+    return values
+
+
+# Function to get the nearest rank percentile of a list of values
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+# Function to summarise one side of a pair, made of one task or of the shards of a task. The shards run side by side,
+# hence their rows and throughputs add up, their full load lasts as long as the slowest one and their latency
+# datapoints are pooled
+def summarise_comparison_side(task_arns, table_statistics, metric_values):
+    rows = sum(table_statistics[task_arn]['FullLoadRows'] for task_arn in task_arns)
+    durations = [table_statistics[task_arn]['FullLoadSeconds'] for task_arn in task_arns
+                 if table_statistics[task_arn]['FullLoadSeconds']]
+    throughputs = [metric_values[task_arn]['CDCThroughputRowsTarget'] for task_arn in task_arns]
+
+    summary = {
+        'Tasks': len(task_arns),
+        'FullLoadRows': rows,
+        'CdcChanges': sum(table_statistics[task_arn]['CdcChanges'] for task_arn in task_arns),
+        'FullLoadRowsPerSec': round(rows / max(durations), 2) if durations else None,
+        'CdcRowsPerSec': round(sum(sum(values) / len(values) for values in throughputs if values), 2)
+        if any(throughputs) else None
+    }
+    for metric_name in ('CDCLatencySource', 'CDCLatencyTarget'):
+        latencies = [value for task_arn in task_arns for value in metric_values[task_arn][metric_name]]
+        summary[metric_name] = {'p50': percentile(latencies, 50), 'p90': percentile(latencies, 90),
+                                'p99': percentile(latencies, 99)}
+
+    return summary
+
+
+# Function to compare the two sides of a pair. Gives the change (in %) of the throughputs and latencies and the ones
+# which moved the wrong way by more than comparison_regression_threshold
+def compare_pair_sides(old, new):
+    changes, regressions = {}, []
+    measures = [(key, old[key], new[key], 1) for key in ('FullLoadRowsPerSec', 'CdcRowsPerSec')]
+    measures += [('{0}.{1}'.format(metric_name, pct), old[metric_name][pct], new[metric_name][pct], -1)
+                 for metric_name in ('CDCLatencySource', 'CDCLatencyTarget') for pct in ('p50', 'p90', 'p99')]
+
+    for key, old_value, new_value, direction in measures:
+        if not old_value or new_value is None:
+            continue
+        changes[key] = round((new_value - old_value) / old_value * 100, 1)
+        if changes[key] * direction < -config.comparison_regression_threshold:
+            regressions.append(key)
+
+    return changes, regressions
+
+
+# Function to compare the throughput and latency of the tasks cloned by the last plan with their original tasks. The
+# table statistics of all the tasks are collected concurrently and their CloudWatch metrics in batched GetMetricData
+# calls. The report is logged, written to comparison_file and returned
+def run_comparison():
+    pairs = get_comparison_pairs()
+    if not pairs:
+        logging.info('No cloned tasks to compare..')
+        print('No cloned tasks to compare..')
+        return []
+
+    task_instances = {task_arn: instance_arn for pair in pairs for side in ('Old', 'New')
+                      for task_arn, instance_arn in pair[side].items()}
+    logging.info('Comparing {0} cloned tasks through {1} tasks..'.format(len(pairs), len(task_instances)))
+    throttle = AdaptiveThrottle()
+
+    with metrics.phase('compare'):
+        instances = get_replication_instances(set(task_instances.values()))
+        with ThreadPoolExecutor(max_workers=max(1, min(config.max_comparison_workers, len(task_instances)))) as executor:
+            futures = {task_arn: submit_in_context(executor, get_task_table_statistics, task_arn, throttle)
+                       for task_arn in task_instances}
+            metric_values = get_task_metric_values(
+                {task_arn: instances[instance_arn]['ReplicationInstanceIdentifier'] if instance_arn in instances
+                 else instance_arn.split(':')[-1] for task_arn, instance_arn in task_instances.items()}, throttle)
+            table_statistics = {task_arn: future.result() for task_arn, future in futures.items()}
+
+    report = []
+    for pair in pairs:
+        old = summarise_comparison_side(list(pair['Old']), table_statistics, metric_values)
+        new = summarise_comparison_side(list(pair['New']), table_statistics, metric_values)
+        changes, regressions = compare_pair_sides(old, new)
+        report.append({'ReplicationTaskIdentifier': pair['ReplicationTaskIdentifier'], 'Old': old, 'New': new,
+                       'Change': changes, 'Regressions': regressions})
+        logging.info('Comparison of DMS task {0} : full load {1} -> {2} rows/sec, CDC {3} -> {4} rows/sec, target '
+                     'latency p90 {5} -> {6} sec{7}'.format(
+                         pair['ReplicationTaskIdentifier'], old['FullLoadRowsPerSec'], new['FullLoadRowsPerSec'],
+                         old['CdcRowsPerSec'], new['CdcRowsPerSec'], old['CDCLatencyTarget']['p90'],
+                         new['CDCLatencyTarget']['p90'],
+                         ' : REGRESSION of ' + ', '.join(regressions) if regressions else ''))
+
+    with open(config.comparison_file, 'w') as comparison_file:
+        json.dump(report, comparison_file, indent=2)
+
+    regressed = [row for row in report if row['Regressions']]
+    logging.info('{0} of the {1} cloned tasks regressed..'.format(len(regressed), len(report)))
+    print('{0} of the {1} cloned tasks regressed..Kindly check the comparison report {2}'.format(
+        len(regressed), len(report), config.comparison_file))
+
+    return report
+
+
+# Function to describe the given tasks, without their settings, in batches through a replication-task-id filter
+def describe_tasks_by_identifier(ReplicationTaskIdentifiers, throttle):
+    tasks = {}
+    for task_ids in chunk_filter_values(ReplicationTaskIdentifiers):
+        filters = [{"Name": 'replication-task-id', "Values": task_ids}]
+        for task in paginate(dms_client.describe_replication_tasks, 'ReplicationTasks', throttle,
+                             Filters=filters, WithoutSettings=True):
+            tasks[task['ReplicationTaskIdentifier']] = task
+
+    return tasks
+
+
+# Function to get the original tasks superseded by the last plan : every task whose clones, all of its shards for a
+# sharded task, are recorded in the journal and exist in DMS with the endpoints and replication instance of their plan
+# entry. A clone which already existed before the plan may be another task, it is only trusted once it matches. The
+# plan must have completed
+def get_superseded_tasks():
+    saved_plan = read_plan()
+    completed = read_run_journal() if saved_plan is not None else None
+    if saved_plan is None or not completed['complete']:
+        logging.info('No completed plan found in {0} for the current configuration..Hence no task is cleaned up'.format(
+            config.plan_file))
+        print('No completed plan found for the current configuration..Kindly complete the clone before the clean up')
+        exit(1)
 
-                except KeyError:
-                    continue
+    clones = describe_tasks_by_identifier([entry['ReplicationTaskIdentifier'] for entry in saved_plan['entries']],
+                                          AdaptiveThrottle())
+    superseded = {}       # ReplicationTaskArn -> old task, None once one of its clones is missing
+    for entry in saved_plan['entries']:
+        created = completed['creates'].get(entry['ReplicationTaskIdentifier'])
+        clone = clones.get(entry['ReplicationTaskIdentifier'])
+        task_arn = entry['CurrentReplicationTaskArn']
+        if created is None or created['Result'] == 'failed':
+            superseded[task_arn] = None
+        elif clone is None or any(clone[field] != entry[field] for field in
+                                  ('SourceEndpointArn', 'TargetEndpointArn', 'ReplicationInstanceArn')):
+            logging.info('DMS task {0} is missing or does not match its plan entry..Hence {1} is kept'.format(
+                entry['ReplicationTaskIdentifier'], entry['CurrentReplicationTaskIdentifier']))
+            superseded[task_arn] = None
+        elif superseded.setdefault(task_arn, {}) is not None:
+            superseded[task_arn].update(ReplicationTaskArn=task_arn,
+                                        ReplicationTaskIdentifier=entry['CurrentReplicationTaskIdentifier'],
+                                        ReplicationInstanceArn=entry['CurrentReplicationInstanceArn'])
+
+    return [task for task in superseded.values() if task is not None]
+
+
+# Function to stop and delete the superseded tasks. Each replication instance works on at most
+# max_cleanup_tasks_per_instance tasks at a time : a running task is stopped, then deleted once stopped, and its slot is
+# released once it is gone. The tasks in progress are polled together in batches. Returns the outcome of every task
+def cleanup_tasks(tasks):
+    throttle = AdaptiveThrottle()
+    queues = {}
+    for task in tasks:
+        queues.setdefault(task['ReplicationInstanceArn'], []).append(task)
+    in_progress = {}      # ReplicationTaskArn -> task being stopped or deleted
+    deadline = time.monotonic() + config.cleanup_timeout
+
+    def act(operation, task, outcome):
+        try:
+            call_with_retries(operation, throttle, ReplicationTaskArn=task['ReplicationTaskArn'])
+            task['Cleanup'] = outcome
+        except dms_client.exceptions.ResourceNotFoundFault:
+            task['Cleanup'] = 'deleted'
+        except ClientError as e:
+            logging.info('Error in cleaning up DMS task {0} : {1}'.format(task['ReplicationTaskIdentifier'], e))
+            task['Cleanup'] = 'failed'
+
+    while any(queues.values()) or in_progress:
+        for instance_arn, queue in queues.items():
+            busy = sum(1 for task in in_progress.values() if task['ReplicationInstanceArn'] == instance_arn)
+            while queue and busy < config.max_cleanup_tasks_per_instance:
+                task = queue.pop(0)
+                task['Cleanup'] = 'queued'
+                in_progress[task['ReplicationTaskArn']] = task
+                busy += 1
+
+        described = describe_tasks_by_arn(list(in_progress), throttle)
+        for task_arn, task in list(in_progress.items()):
+            status = described[task_arn]['Status'] if task_arn in described else None
+            if status is None:
+                logging.info('DMS task {0} has been deleted..'.format(task['ReplicationTaskIdentifier']))
+                task['Cleanup'] = 'deleted'
+            elif status in ('running', 'starting') and task['Cleanup'] != 'stopping':
+                logging.info('Stopping DMS task {0}..'.format(task['ReplicationTaskIdentifier']))
+                act(dms_client.stop_replication_task, task, 'stopping')
+            elif status in ('stopped', 'ready', 'failed') and task['Cleanup'] != 'deleting':
+                logging.info('Deleting DMS task {0}..'.format(task['ReplicationTaskIdentifier']))
+                act(dms_client.delete_replication_task, task, 'deleting')
+            if task['Cleanup'] in ('deleted', 'failed'):
+                del in_progress[task_arn]
+
+        if not any(queues.values()) and not in_progress:
+            break
+        if time.monotonic() > deadline:
+            for task in list(in_progress.values()) + [task for queue in queues.values() for task in queue]:
+                logging.info('DMS task {0} was not deleted within {1} seconds..'.format(
+                    task['ReplicationTaskIdentifier'], config.cleanup_timeout))
+                task['Cleanup'] = 'failed'
+            break
+        time.sleep(config.cleanup_poll_interval)
+
+    return tasks
+
+
+# Function to get the old endpoints of the transforms which no task of the account uses anymore, leaving out the given
+# superseded tasks. Endpoints matched by pattern rules cannot be described by name, hence with pattern rules every
+# endpoint is listed and the old ones are those the rules move to another endpoint, the new endpoints being left out
+def get_unused_old_endpoints(superseded_arns=()):
+    endpoint_rules = transform_rules().endpoints
+    if any(rule_set.patterns for rule_set in endpoint_rules.values()):
+        inventory = EndpointInventory().load()
+        old_arns, new_arns = [], set()
+        for endpoint_type in endpoint_rules:
+            for endpoint_arn in list(inventory.by_type[endpoint_type]):
+                new_endpoint_arn = inventory.new_endpoint_arn(endpoint_type, endpoint_arn)
+                if new_endpoint_arn is not None and new_endpoint_arn != endpoint_arn:
+                    old_arns.append(endpoint_arn)
+                    new_arns.add(new_endpoint_arn)
+        old_arns = [endpoint_arn for endpoint_arn in dict.fromkeys(old_arns) if endpoint_arn not in new_arns]
+    else:
+        old_keys = list(config.src_endpoint_transforms) + list(config.tgt_endpoint_transforms)
+        inventory = EndpointInventory().refresh(old_keys)
+        old_arns = [key if config.use_arn_db_transforms == 'Y' else inventory.arn_by_identifier.get(key) for key in old_keys]
+        old_arns = [endpoint_arn for endpoint_arn in dict.fromkeys(old_arns) if endpoint_arn in inventory.endpoints_by_arn]
+
+    used_arns = set()
+    for endpoint_arns in chunk_filter_values(old_arns):
+        filters = [{"Name": 'endpoint-arn', "Values": endpoint_arns}]
+        for task in paginate(dms_client.describe_replication_tasks, 'ReplicationTasks', Filters=filters,
+                             WithoutSettings=True):
+            if task['ReplicationTaskArn'] not in superseded_arns:
+                used_arns.update((task['SourceEndpointArn'], task['TargetEndpointArn']))
+
+    for endpoint_arn in old_arns:
+        if endpoint_arn in used_arns:
+            logging.info('End Point {0} is still used by other tasks..Hence it is kept'.format(
+                inventory.endpoints_by_arn[endpoint_arn]['EndpointIdentifier']))
+
+    return [inventory.endpoints_by_arn[endpoint_arn] for endpoint_arn in old_arns if endpoint_arn not in used_arns]
+
+
+# Function to delete endpoints concurrently and poll them in batches until they are gone. Returns the outcome of every
+# endpoint
+def cleanup_endpoints(endpoints):
+    throttle = AdaptiveThrottle()
+    outcomes = {endpoint['EndpointArn']: 'deleting' for endpoint in endpoints}
+
+    def delete_endpoint(endpoint):
+        try:
+            call_with_retries(dms_client.delete_endpoint, throttle, EndpointArn=endpoint['EndpointArn'])
+            logging.info('Deleting End Point {0}..'.format(endpoint['EndpointIdentifier']))
+        except ClientError as e:
+            logging.info('Error in deleting End Point {0} : {1}'.format(endpoint['EndpointIdentifier'], e))
+            outcomes[endpoint['EndpointArn']] = 'failed'
+
+    with ThreadPoolExecutor(max_workers=max(1, min(config.max_create_workers, len(endpoints)))) as executor:
+        for future in [submit_in_context(executor, delete_endpoint, endpoint) for endpoint in endpoints]:
+            future.result()
+
+    deadline = time.monotonic() + config.cleanup_timeout
+    pending = [endpoint_arn for endpoint_arn, outcome in outcomes.items() if outcome == 'deleting']
+    while pending:
+        remaining = set()
+        for endpoint_arns in chunk_filter_values(pending):
+            filters = [{"Name": 'endpoint-arn', "Values": endpoint_arns}]
+            remaining.update(endpoint['EndpointArn'] for endpoint in paginate(
+                dms_client.describe_endpoints, 'Endpoints', throttle, Filters=filters))
+        for endpoint_arn in set(pending) - remaining:
+            outcomes[endpoint_arn] = 'deleted'
+        pending = [endpoint_arn for endpoint_arn in pending if endpoint_arn in remaining]
+
+        if pending and time.monotonic() > deadline:
+            for endpoint_arn in pending:
+                logging.info('End Point {0} was not deleted within {1} seconds..'.format(endpoint_arn, config.cleanup_timeout))
+                outcomes[endpoint_arn] = 'failed'
+            break
+        if pending:
+            time.sleep(config.cleanup_poll_interval)
 
-                for keys, values in dict_tgt_arns.items():
-                    if values == new_tgt_endpnt_id:
-                        new_target_endpoint_arn = keys
+    return outcomes
 
-            if check_endpoint_arn(config.replication_instance_arn, new_source_endpoint_arn) \
-                    and check_endpoint_arn(config.replication_instance_arn, new_target_endpoint_arn):
 
-                if config.change_replication_instance == 'Y':
-                    logging.info('Change in Replication instance..Switching to new replication instance for creation of new task..')
-                    ReplicationInstanceArn = config.new_replication_inst_arn
+# Function to clean up after a completed plan : stop and delete the original tasks it superseded, then delete the old
+# endpoints of the transforms no task uses anymore. With cleanup_dry_run set to Y the clean up is only logged
+def run_cleanup():
+    tasks = get_superseded_tasks()
+    dry_run = config.cleanup_dry_run == 'Y'
+    logging.info('{0} {1} superseded tasks..'.format('Dry run of the clean up of' if dry_run else 'Cleaning up', len(tasks)))
 
-                # Printing the values in the log file
-                logging.info('''Parameters for the program are :
-                        CurrentReplicationTaskIdentifier : {0}
-                        NewReplicationTaskIdentifier     : {1}
-                        CurrentReplicationInstanceArn    : {2}
-                        CurrentSourceEndpointArn         : {3}
-                        NewSourceEndpointArn             : {4}
-                        CurrentTargetEndpointArn         : {5}
-                        NewTargetEndpointArn             : {6}
-                        MigrationType                    : {7}'''.format(ReplicationTaskIdentifier, rep_task_edited_name, ReplicationInstanceArn,
-                                            SourceEndpointArn, new_source_endpoint_arn, TargetEndpointArn, new_target_endpoint_arn, MigrationType))
+    with metrics.phase('cleanup'):
+        if dry_run:
+            for task in tasks:
+                logging.info('Dry run : DMS task {0} would be stopped and deleted'.format(task['ReplicationTaskIdentifier']))
+                task['Cleanup'] = 'dry run'
+        else:
+            cleanup_tasks(tasks)
+
+        failed_tasks = [task for task in tasks if task['Cleanup'] == 'failed']
+        endpoints = []
+        if config.delete_old_endpoints == 'Y' and not failed_tasks:
+            endpoints = get_unused_old_endpoints(set(task['ReplicationTaskArn'] for task in tasks))
+            if dry_run:
+                for endpoint in endpoints:
+                    logging.info('Dry run : End Point {0} would be deleted'.format(endpoint['EndpointIdentifier']))
+                endpoint_outcomes = {endpoint['EndpointArn']: 'dry run' for endpoint in endpoints}
+            else:
+                endpoint_outcomes = cleanup_endpoints(endpoints)
+        else:
+            endpoint_outcomes = {}
+
+    failed_endpoints = [endpoint_arn for endpoint_arn, outcome in endpoint_outcomes.items() if outcome == 'failed']
+    print('{0} : {1} tasks and {2} End Points{3}..'.format(
+        'Dry run of the clean up' if dry_run else 'Clean up done', len(tasks) - len(failed_tasks),
+        len(endpoints) - len(failed_endpoints), '' if dry_run else ' deleted'))
+    if failed_tasks or failed_endpoints:
+        print('{0} tasks and {1} End Points could not be deleted..Kindly check the log file {2}'.format(
+            len(failed_tasks), len(failed_endpoints), config.dms_op_log_filepath))
+        exit(1)
 
-                if TargetEndpointArn == new_target_endpoint_arn \
-                        and SourceEndpointArn != new_source_endpoint_arn:
-                    SourceEndpointArn = new_source_endpoint_arn
+    return tasks, endpoint_outcomes
+
+
+# Class keeping what the watch mode knows of the account between two polls : the digest of every task and the state
+# of the endpoints. Only the tasks listed by the last poll are kept, so its size follows the account and not the time
+# the watch has been running. What a poll finds is only committed once the poll has been applied, so that a poll which
+# fails is fully retried by the next one
+class WatchState:
+
+    def __init__(self):
+        self.task_signatures = {}     # ReplicationTaskArn -> digest of the task at the last applied poll
+        self.unplanned_arns = set()   # ReplicationTaskArns which got no plan entry, retried when the endpoints change
+        self.endpoint_signature = None
+        self.polled_signatures = {}   # ReplicationTaskArn -> digest of the task at the current poll
+        self.polled_endpoint_signature = None
+
+    # Function to list the tasks and give the ARNs of the tasks new or changed since the last applied poll, and the full
+    # description of these tasks and of the unplanned ones by ARN
+    def diff_tasks(self):
+        self.polled_signatures = {}
+        tasks_by_arn = {}
+        changed_arns = []
+        for task in get_replication_tasks():
+            task_arn = task['ReplicationTaskArn']
+            signature = hashlib.sha256(json.dumps([task.get(field) for field in WATCH_SIGNATURE_FIELDS],
+                                                  default=str).encode()).hexdigest()
+            self.polled_signatures[task_arn] = signature
+            if self.task_signatures.get(task_arn) != signature:
+                changed_arns.append(task_arn)
+                tasks_by_arn[task_arn] = task
+            elif task_arn in self.unplanned_arns:
+                tasks_by_arn[task_arn] = task
+
+        logging.info('Watch poll of the tasks : {0} listed, {1} new or changed, {2} removed..'.format(
+            len(self.polled_signatures), len(changed_arns), len(set(self.task_signatures) - set(self.polled_signatures))))
+
+        return changed_arns, tasks_by_arn
+
+    # Function to tell whether the endpoints changed since the last applied poll
+    def endpoints_changed(self, inventory):
+        self.polled_endpoint_signature = frozenset((endpoint['EndpointArn'], endpoint.get('Status'))
+                                                   for endpoints in inventory.endpoints_by_type().values()
+                                                   for endpoint in endpoints)
+
+        return self.endpoint_signature is not None and self.polled_endpoint_signature != self.endpoint_signature
+
+    # Function to commit what the current poll found once it has been applied
+    def commit(self):
+        self.task_signatures = self.polled_signatures
+        self.unplanned_arns &= set(self.polled_signatures)
+        self.endpoint_signature = self.polled_endpoint_signature
+
+    # Function to forget a task so that it is cloned again at the next poll
+    def forget(self, ReplicationTaskArn):
+        self.task_signatures.pop(ReplicationTaskArn, None)
+
+
+# Function to bring the clones of the changed tasks which already exist in line with them. A clone is modified with the
+# table mappings, settings and migration type of its plan entry unless it is running. The clones are described by
+# identifier as the listing of the watch may not cover them, under task_names or on another replication instance
+def fix_existing_clones(results, plan, changed_arns):
+    entries = {entry['ReplicationTaskIdentifier']: entry for entry in plan}
+    results = [result for result in results if result['Result'] == 'exists'
+               and entries[result['ReplicationTaskIdentifier']]['CurrentReplicationTaskArn'] in changed_arns]
+    throttle = AdaptiveThrottle()
+    clones = describe_tasks_by_identifier([result['ReplicationTaskIdentifier'] for result in results], throttle)
+    for result in results:
+        entry = entries[result['ReplicationTaskIdentifier']]
+        clone = clones.get(result['ReplicationTaskIdentifier'])
+        if clone is None:
+            continue
+        if clone['Status'] not in ('ready', 'stopped', 'failed'):
+            logging.info('DMS task {0} changed but its clone is {1}..Hence the clone is left as it is'.format(
+                entry['CurrentReplicationTaskIdentifier'], clone['Status']))
+            continue
 
-                    logging.info('Change in Source End Point ARN. Hence proceeding to create tasks only for whose source arn changed..')
+        try:
+            call_with_retries(dms_client.modify_replication_task, throttle,
+                              ReplicationTaskArn=clone['ReplicationTaskArn'],
+                              MigrationType=entry['MigrationType'],
+                              TableMappings=entry['TableMappings'],
+                              ReplicationTaskSettings=entry['ReplicationTaskSettings'])
+            logging.info('DMS task {0} changed..Its clone {1} has been modified accordingly'.format(
+                entry['CurrentReplicationTaskIdentifier'], result['ReplicationTaskIdentifier']))
+            result['Result'] = 'modified'
+        except ClientError as e:
+            logging.info('Error in modifying DMS task {0} : {1}'.format(result['ReplicationTaskIdentifier'], e))
+
+
+# Function to run one poll of the watch mode : diff the tasks and endpoints against the last applied poll, then plan
+# and apply the clone of the new and changed tasks only. The poll is committed to the state once applied
+def run_watch_cycle(state):
+    with metrics.phase('watch_poll'):
+        inventory = build_endpoint_inventory()
+        changed_arns, tasks_by_arn = state.diff_tasks()
+        unplanned_arns = sorted(state.unplanned_arns & set(tasks_by_arn))
+        if state.endpoints_changed(inventory) and unplanned_arns:
+            logging.info('The End Points changed..Retrying the {0} tasks which could not be planned before'.format(
+                len(unplanned_arns)))
+            changed_arns = list(dict.fromkeys(changed_arns + unplanned_arns))
+
+    if not changed_arns:
+        state.commit()
+        return []
+
+    plan = build_plan(inventory, [tasks_by_arn[task_arn] for task_arn in changed_arns])
+    state.unplanned_arns |= set(changed_arns) - set(entry['CurrentReplicationTaskArn'] for entry in plan)
+    state.unplanned_arns -= set(entry['CurrentReplicationTaskArn'] for entry in plan)
+    if not plan:
+        state.commit()
+        return []
+
+    results = apply_plan(plan, report=False)
+    fix_existing_clones(results, plan, set(changed_arns))
+    state.commit()
+
+    entries = {entry['ReplicationTaskIdentifier']: entry for entry in plan}
+    for result in results:
+        if result['Result'] == 'failed':
+            logging.info('Creation of DMS task {0} failed : {1}..Retrying at the next poll'.format(
+                result['ReplicationTaskIdentifier'], result['Error']))
+            state.forget(entries[result['ReplicationTaskIdentifier']]['CurrentReplicationTaskArn'])
+    logging.info('Watch poll applied : {0}'.format(', '.join('{0} {1}'.format(
+        sum(1 for result in results if result['Result'] == outcome), outcome)
+        for outcome in ('created', 'modified', 'exists', 'failed'))))
+
+    return results
+
+
+# Function to run the watch mode : poll the account every watch_poll_interval seconds with the same client until
+# SIGTERM or SIGINT is received, or watch_max_cycles polls have run. A poll which fails is logged and the next poll
+# starts over from the last known state
+def run_watch():
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signal_number, lambda signum, frame: stop.set())
+
+    logging.info('Watching the tasks of {0} every {1} seconds..'.format(config.replication_instance_arn,
+                                                                       config.watch_poll_interval))
+    print('Watching the tasks of {0}..Send SIGTERM to stop'.format(config.replication_instance_arn))
+    state = WatchState()
+    cycles = 0
+
+    while not stop.is_set():
+        # Failed connection tests are not cached across polls so that fixed endpoints get tested again
+        for pair in [pair for pair, verdict in connection_verdicts.items() if not verdict]:
+            del connection_verdicts[pair]
 
-                    task_status = create_new_dms_tasks(rep_task_edited_name, SourceEndpointArn, TargetEndpointArn,
-                                                       ReplicationInstanceArn, MigrationType, TableMappings, ReplicationTaskSettings)
+        try:
+            run_watch_cycle(state)
+        except (BotoCoreError, ClientError, SystemExit) as e:
+            logging.info('Watch poll failed : {0}..Retrying at the next poll'.format(e))
+        except Exception as e:
+            logging.exception('Watch poll failed unexpectedly : {0}..Retrying at the next poll'.format(e))
+        if config.export_metrics == 'Y':
+            export_metrics()
+
+        cycles += 1
+        if config.watch_max_cycles is not None and cycles >= config.watch_max_cycles:
+            break
+        stop.wait(config.watch_poll_interval)
 
-                elif SourceEndpointArn == new_source_endpoint_arn \
-                        and TargetEndpointArn != new_target_endpoint_arn:
-                    TargetEndpointArn = new_target_endpoint_arn
+    logging.info('Watch stopped after {0} polls..'.format(cycles))
+    print('Watch stopped after {0} polls..'.format(cycles))
 
-                    logging.info('Change in Target End Point ARN. Hence proceeding to create tasks only for whose target arn changed..')
+    return state
 
-                    task_status = create_new_dms_tasks(rep_task_edited_name, SourceEndpointArn, TargetEndpointArn,
-                                                       ReplicationInstanceArn, MigrationType, TableMappings, ReplicationTaskSettings)
-                else:
-                    SourceEndpointArn = new_source_endpoint_arn
-                    TargetEndpointArn = new_target_endpoint_arn
-                    logging.info('Change in both Source and Target End Point ARN. Hence proceeding to create tasks only for whose target arn changed..')
 
-                    task_status = create_new_dms_tasks(rep_task_edited_name, SourceEndpointArn, TargetEndpointArn,
-                                                       ReplicationInstanceArn, MigrationType, TableMappings, ReplicationTaskSettings)
+# Function to build the configuration overrides of one fan-out job. The files of the run are suffixed with the region
+# and replication instance of the job so that the jobs do not share their plan, journal or snapshot
+def fanout_job_overrides(job):
+    unknown_keys = set(job) - set(FANOUT_JOB_KEYS)
+    if unknown_keys:
+        raise ValueError('Unsupported keys in fan-out job : {0}'.format(', '.join(sorted(unknown_keys))))
+    missing_keys = {'aws_region', 'replication_instance_arn'} - set(job)
+    if missing_keys:
+        raise ValueError('Missing keys in fan-out job : {0}'.format(', '.join(sorted(missing_keys))))
 
-                if task_status:
-                    logging.info('Continuing with next task..' + '\n')
-                    # break
-                else:
-                    logging.info('Terminating the loop..')
-                    break
-            else:
-                logging.exception('Provided Target End point is not valid/active...Please rectify and run again')
-                print('Provided Target End point is not valid/active...Please rectify and run again')
-                exit(1)
+    overrides = dict(job)
+    instance_id = overrides.setdefault('replication_instance_id', job['replication_instance_arn'].split(':')[-1])
+    overrides['job_name'] = '{0}/{1}'.format(job['aws_region'], instance_id)
+
+    for file_setting in ('plan_file', 'journal_file', 'inventory_snapshot_file'):
+        file_root, file_ext = os.path.splitext(getattr(dms_tasks_config, file_setting))
+        overrides[file_setting] = '{0}_{1}_{2}{3}'.format(file_root, job['aws_region'], instance_id, file_ext)
+
+    return overrides
+
+
+# Function to run one fan-out job with its own configuration overrides, the DMS and CloudWatch clients and the API limits
+# of its region. An exit of the job is reported as its failure instead of stopping the other jobs
+def run_fanout_job(job, client_factory, cloudwatch_factory):
+    overrides = fanout_job_overrides(job)
+    job_overrides.set(overrides)
+    job_client.set(client_factory(job['aws_region']))
+    if config.start_new_tasks == 'Y':
+        job_cloudwatch_client.set(cloudwatch_factory(job['aws_region']))   # for the CDC latency of the started tasks
+    job_api_limits.set(get_regional_api_limits(job['aws_region']))
+    job_rules.set(None)         # the rules are compiled again with the overrides of the job
+    summary = {'job': overrides['job_name'], 'aws_region': job['aws_region'],
+               'replication_instance_arn': job['replication_instance_arn']}
+    started = time.monotonic()
+
+    try:
+        compile_transform_rules()
+        results = run_clone()
+        summary['status'] = 'failed' if any(result['Result'] == 'failed' for result in results) else 'succeeded'
+    except SystemExit:
+        results = []
+        summary['status'] = 'failed'
+    except Exception as e:
+        logging.exception('Fan-out job {0} failed : {1}'.format(overrides['job_name'], e))
+        results = []
+        summary['status'] = 'failed'
+
+    summary['elapsed_sec'] = round(time.monotonic() - started, 3)
+    summary['results'] = [{key: value for key, value in result.items() if key != 'Error' or value}
+                          for result in results]
+    for result_type in ('created', 'exists', 'failed'):
+        summary[result_type] = sum(1 for result in results if result['Result'] == result_type)
+
+    return summary
+
+
+# Function to run the fan-out jobs of the configuration in parallel, at most fanout_max_parallel_jobs at a time, and
+# consolidate their results in one report. The jobs are all validated before any of them is started
+def run_fanout(jobs, client_factory=None, cloudwatch_factory=None):
+    invalid_jobs = []
+    for job_number, job in enumerate(jobs, 1):
+        try:
+            fanout_job_overrides(job)
+        except ValueError as e:
+            invalid_jobs.append((job_number, e))
+    if invalid_jobs:
+        for job_number, e in invalid_jobs:
+            logging.info('Fan-out job {0} is invalid : {1}'.format(job_number, e))
+        print('{0} invalid fan-out jobs present in config file..Kindly check the log file {1}'.format(
+            len(invalid_jobs), config.dms_op_log_filepath))
+        exit(1)
+
+    client_factory = client_factory or get_regional_dms_client
+    cloudwatch_factory = cloudwatch_factory or get_regional_cloudwatch_client
+    with regional_clients_lock:
+        regional_api_limits.clear()     # the limits are sized as per the configuration of the run
+    workers = max(1, min(config.fanout_max_parallel_jobs, len(jobs)))
+    logging.info('Running {0} fan-out jobs using {1} workers..'.format(len(jobs), workers))
+    print('Running {0} fan-out jobs using {1} workers..'.format(len(jobs), workers))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [submit_in_context(executor, run_fanout_job, job, client_factory, cloudwatch_factory) for job in jobs]
+        summaries = [future.result() for future in futures]
+
+    report = {'jobs': summaries}
+    for result_type in ('created', 'exists', 'failed'):
+        report[result_type] = sum(summary[result_type] for summary in summaries)
+    report['failed_jobs'] = [summary['job'] for summary in summaries if summary['status'] == 'failed']
+
+    with open(config.fanout_result_file, 'w') as result_file:
+        json.dump(report, result_file, indent=2, default=str)
+
+    for summary in summaries:
+        logging.info('Fan-out job {0} {1} : {2} created, {3} already existing, {4} failed'.format(
+            summary['job'], summary['status'], summary['created'], summary['exists'], summary['failed']))
+    print('{0} fan-out jobs completed : {1} tasks created, {2} already existing, {3} failed..Consolidated result in {4}'.format(
+        len(summaries), report['created'], report['exists'], report['failed'], config.fanout_result_file))
+
+    if report['failed_jobs']:
+        print('Failed fan-out jobs : {0}..Kindly check the log file {1}'.format(', '.join(report['failed_jobs']),
+                                                                             config.dms_op_log_filepath))
+        exit(1)
+
+    return report
+
+
+def main(client=None, cloudwatch=None):
+    init_dms_client(client)
+    connection_verdicts.clear()
+    table_sizes_cache.clear()
+    document_cache.clear()
+    metrics.reset()
+    compile_transform_rules()
+
+    try:
+        with metrics.phase('total'):
+            if config.run_comparison == 'Y':
+                init_cloudwatch_client(cloudwatch)
+                return run_comparison()
+            if config.start_new_tasks == 'Y':
+                init_cloudwatch_client(cloudwatch)      # the CDC latency of the started tasks is read from CloudWatch
+                if config.wait_for_ready_tasks != 'Y':
+                    logging.info('The new tasks are waited for as they can only be started once ready..')
+            if config.run_cleanup == 'Y':
+                return run_cleanup()
+
+            if config.use_watch_mode == 'Y':
+                return run_watch()
+
+            if config.use_fanout == 'Y':
+                return run_fanout(config.fanout_jobs, (lambda region: client) if client is not None else None,
+                                  (lambda region: cloudwatch) if cloudwatch is not None else None)
+
+            return run_clone()
+    finally:
+        if config.export_metrics == 'Y':
+            export_metrics()
+
+
+# Function to summarise the results of the task creation in the log file and on screen
+def report_task_creation(results):
+    created = [result for result in results if result['Result'] == 'created']
+    existing = [result for result in results if result['Result'] == 'exists']
+    failed = [result for result in results if result['Result'] == 'failed']
+
+    if created:
+        logging.info('{0} tasks have been successfully created..'.format(len(created)))
+        print('{0} tasks have been successfully created..'.format(len(created)))
+    else:
+        logging.info('No tasks have been created..')
+        print('No tasks have been created..')
+
+    resumed = [result for result in results if result.get('Resumed')]
+    if resumed:
+        logging.info('{0} of these tasks were completed by a previous run of the plan..'.format(len(resumed)))
+        print('{0} of these tasks were completed by a previous run of the plan..'.format(len(resumed)))
+
+    if existing:
+        logging.info('{0} tasks already existed hence their creation was skipped..'.format(len(existing)))
+        print('{0} tasks already existed hence their creation was skipped..'.format(len(existing)))
+
+    if (config.wait_for_ready_tasks == 'Y' or config.start_new_tasks == 'Y') and created:
+        not_ready = [result for result in created if result['Status'] != 'ready']
+        logging.info('Readiness report of the new tasks :\n' + '\n'.join(
+            '    {0:<60} {1}'.format(result['ReplicationTaskIdentifier'], result['Status']) for result in created))
+        if not_ready:
+            print('{0} of the {1} new tasks are not ready..Kindly check the log file {2}'.format(
+                len(not_ready), len(created), config.dms_op_log_filepath))
         else:
-            if counter('Y') > 0:
-                logging.info('{0} tasks have been successfully created..'.format(counter('Y')))
-                print('{0} tasks have been successfully created..'.format(counter('Y')))
-            elif reg_cnt > config.src_endpoint_counts and tsk_exists != 'N':
-                logging.info('Provided ARNs are not part of the replication tasks..Hence no tasks are created')
-                print('Provided ARNs are not part of the replication tasks..Hence no tasks are created')
-            else:
-                logging.info('No tasks have been created..')
-                print('No tasks have been created..')
+            print('All the {0} new tasks are ready..'.format(len(created)))
 
-    except ClientError as e:
-        logging.exception(e)
+    if config.start_new_tasks == 'Y' and created:
+        started = [result for result in created if result.get('StartStatus') == 'started']
+        logging.info('{0} of the {1} new tasks have been started..'.format(len(started), len(created)))
+        print('{0} of the {1} new tasks have been started..'.format(len(started), len(created)))
+
+    if failed:
+        for result in failed:
+            logging.info('Creation of DMS task {0} failed : {1}'.format(result['ReplicationTaskIdentifier'], result['Error']))
+        print('{0} tasks failed to be created..Kindly check the log file {1}'.format(len(failed), config.dms_op_log_filepath))
         exit(1)
 
 
 if __name__ == '__main__':
+    init_logging()
     main()
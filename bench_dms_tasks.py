@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+'''
+    Script Name : bench_dms_tasks.py
+    Author : Debraj Ganguly
+    Purpose :This script benchmarks the full clone flow of auto_dms_tasks.py against the local DMS stand-in of fake_dms.py.
+            For every requested size it builds an account with that many tasks and endpoints, runs main() and reports the
+            wall time, the API calls per operation and the peak memory, so that scaling regressions are caught before
+            they reach a live account.
+    Dependencies : auto_dms_tasks.py, fake_dms.py
+    Usage : python bench_dms_tasks.py [--sizes 10 1000 10000] [--latency 0.0] [--throttle-rate 0.0] [--async-engine]
+                                      [--json FILE]
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+import fake_dms
+
+REPLICATION_INSTANCE_ARN = 'arn:aws:dms:us-east-1:123456789012:rep:FAKEINSTANCE'
+
+TASK_SETTINGS = json.dumps({
+    'TargetMetadata': {'SupportLobs': True, 'FullLobMode': False, 'LobChunkSize': 64, 'LimitedSizeLobMode': True,
+                       'LobMaxSize': 32, 'ParallelLoadThreads': 0, 'ParallelLoadBufferSize': 0},
+    'FullLoadSettings': {'TargetTablePrepMode': 'DO_NOTHING', 'MaxFullLoadSubTasks': 8, 'CommitRate': 10000},
+    'Logging': {'EnableLogging': False, 'CloudWatchLogGroup': None, 'CloudWatchLogStream': None},
+    'ChangeProcessingTuning': {'BatchApplyMemoryLimit': 500, 'MemoryLimitTotal': 1024, 'MemoryKeepTime': 60}
+})
+
+
+# Function to build the configuration module used by auto_dms_tasks.py during the benchmark
+def bench_config(log_file):
+    return types.SimpleNamespace(
+        aws_region='us-east-1',
+        dms_op_log_filepath=log_file,
+        replication_instance_arn=REPLICATION_INSTANCE_ARN,
+        replicationtaskid_prefix='bench-',
+        replication_task_filter='replication-instance-arn',
+        max_records=100,
+        max_filter_values=50,
+        use_arn_db_transforms='N',
+        use_specific_tasks='N',
+        task_names=[],
+        change_replication_instance='N',
+        use_instance_pool='N',
+        replication_instance_pool=[],
+        full_load_placement_round=8,
+        task_load_source='mappings',
+        pattern_rule_table_estimate=10,
+        placement_file=os.path.join(tempfile.gettempdir(), 'bench_dms_placement.json'),
+        endpoint_type='endpoint-type',
+        endpoint_type_val='Target',
+        enable_logging=True,
+        max_create_workers=10,
+        document_cache_size=256,
+        use_async_engine='N',
+        async_queue_size=100,
+        async_transform_workers=4,
+        max_api_retries=8,
+        throttle_base_delay=0.01,
+        throttle_max_delay=0.5,
+        max_connection_test_workers=10,
+        connection_poll_interval=0.01,
+        connection_test_timeout=60,
+        wait_for_ready_tasks='Y',
+        ready_poll_interval=0.01,
+        ready_poll_max_interval=0.1,
+        ready_wait_timeout=60,
+        start_new_tasks='N',
+        max_concurrent_full_loads_per_instance=2,
+        cdc_settle_latency=60,
+        cdc_settle_seconds=0,
+        start_poll_interval=0.01,
+        start_timeout=60,
+        use_inventory_snapshot='N',
+        inventory_snapshot_file=os.path.join(tempfile.gettempdir(), 'bench_dms_inventory.json'),
+        inventory_snapshot_ttl=900,
+        force_full_refresh='N',
+        use_run_journal='N',
+        plan_file=os.path.join(tempfile.gettempdir(), 'bench_dms_plan.json'),
+        journal_file=os.path.join(tempfile.gettempdir(), 'bench_dms_journal.jsonl'),
+        use_fanout='N',
+        fanout_jobs=[],
+        fanout_max_parallel_jobs=4,
+        fanout_max_pool_connections=50,
+        fanout_max_api_concurrency=20,
+        fanout_result_file=os.path.join(tempfile.gettempdir(), 'bench_dms_fanout.json'),
+        use_watch_mode='N',
+        watch_poll_interval=0.01,
+        watch_max_cycles=1,
+        export_metrics='N',
+        metrics_json_file=os.path.join(tempfile.gettempdir(), 'bench_dms_metrics.json'),
+        metrics_prom_file=os.path.join(tempfile.gettempdir(), 'bench_dms_metrics.prom'),
+        run_comparison='N',
+        comparison_period_hours=24,
+        comparison_metric_period=300,
+        max_comparison_workers=10,
+        comparison_regression_threshold=20,
+        comparison_file=os.path.join(tempfile.gettempdir(), 'bench_dms_comparison.json'),
+        run_cleanup='N',
+        cleanup_dry_run='Y',
+        delete_old_endpoints='Y',
+        max_cleanup_tasks_per_instance=4,
+        cleanup_poll_interval=0.01,
+        cleanup_timeout=60,
+        use_task_sharding='N',
+        task_shard_counts={},
+        table_stats_source='dms',
+        table_stats_file=os.path.join(tempfile.gettempdir(), 'bench_table_stats.json'),
+        task_settings_profiles={},
+        default_task_settings_profile=None,
+        task_settings_profile_rules=[],
+        task_rename_rules=None,
+        src_endpoint_transforms={},
+        tgt_endpoint_transforms={}
+    )
+
+
+# Function to fill a fake account with as many tasks as the size and as many endpoints (old and new, source and target)
+def build_account(size, config, latency, throttle_rate):
+    client = fake_dms.FakeDMSClient(seed=size)
+    pairs = max(1, size // 4)
+
+    config.src_endpoint_transforms = {}
+    config.tgt_endpoint_transforms = {}
+    old_sources, old_targets = [], []
+    for idx in range(pairs):
+        old_sources.append(client.add_endpoint('bench-src-old-{0}'.format(idx), 'Source'))
+        client.add_endpoint('bench-src-new-{0}'.format(idx), 'Source')
+        old_targets.append(client.add_endpoint('bench-tgt-old-{0}'.format(idx), 'Target'))
+        client.add_endpoint('bench-tgt-new-{0}'.format(idx), 'Target')
+        config.src_endpoint_transforms['bench-src-old-{0}'.format(idx)] = 'bench-src-new-{0}'.format(idx)
+        config.tgt_endpoint_transforms['bench-tgt-old-{0}'.format(idx)] = 'bench-tgt-new-{0}'.format(idx)
+
+    for idx in range(size):
+        table_mappings = json.dumps({'rules': [{
+            'rule-type': 'selection', 'rule-id': '1', 'rule-name': '1', 'rule-action': 'include',
+            'object-locator': {'schema-name': 'SCHEMA{0}'.format(idx % 50), 'table-name': 'TABLE{0}'.format(idx)}}]})
+        client.add_task('prod-bench-task-{0}'.format(idx), old_sources[idx % pairs], old_targets[idx % pairs],
+                        REPLICATION_INSTANCE_ARN, 'full-load-and-cdc', table_mappings, TASK_SETTINGS)
+
+    # Latency and throttling only apply to the calls made by the run, not to the set up of the account
+    client.latency = latency
+    client.throttle_rate = throttle_rate
+    client.calls.clear()
+
+    return client
+
+
+# Function to run the clone flow once and measure it
+def run_benchmark(auto_dms_tasks, config, size, latency, throttle_rate):
+    client = build_account(size, config, latency, throttle_rate)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = auto_dms_tasks.main(client)
+    wall_time = time.perf_counter() - started
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'size': size,
+        'wall_time_sec': round(wall_time, 3),
+        'peak_memory_mb': round(peak_memory / (1024 * 1024), 2),
+        'tasks_created': sum(1 for result in results if result['Result'] == 'created'),
+        'api_calls': dict(sorted(client.calls.items())),
+        'total_api_calls': sum(count for operation, count in client.calls.items() if not operation.startswith('throttled:'))
+    }
+
+
+# Function to print the benchmark results as a table
+def print_report(reports):
+    operations = sorted(set(operation for report in reports for operation in report['api_calls']))
+    print('{0:>8} {1:>10} {2:>10} {3:>8} {4:>10}'.format('size', 'wall(s)', 'peak(MB)', 'created', 'api calls'))
+    for report in reports:
+        print('{0:>8} {1:>10} {2:>10} {3:>8} {4:>10}'.format(report['size'], report['wall_time_sec'],
+                                                           report['peak_memory_mb'], report['tasks_created'],
+                                                           report['total_api_calls']))
+    print()
+    print('{0:<40}'.format('api calls per operation') + ''.join('{0:>10}'.format(report['size']) for report in reports))
+    for operation in operations:
+        print('{0:<40}'.format(operation) + ''.join('{0:>10}'.format(report['api_calls'].get(operation, 0))
+                                                  for report in reports))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the DMS task clone flow against a local DMS stand-in')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000],
+                        help='Number of tasks and endpoints of each benchmarked account')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every fake API call')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of the fake API calls being throttled')
+    parser.add_argument('--async-engine', action='store_true', help='Run the clone through the asyncio pipeline')
+    parser.add_argument('--json', help='File to write the benchmark results to as JSON')
+    args = parser.parse_args()
+
+    log_file = os.path.join(tempfile.gettempdir(), 'bench_dms_tasks.log')
+    config = bench_config(log_file)
+    config.use_async_engine = 'Y' if args.async_engine else 'N'
+    sys.modules['dms_tasks_config'] = config     # auto_dms_tasks.py imports its configuration under this name
+    import auto_dms_tasks
+
+    reports = [run_benchmark(auto_dms_tasks, config, size, args.latency, args.throttle_rate) for size in args.sizes]
+    print_report(reports)
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(reports, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
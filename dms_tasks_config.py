@@ -34,6 +34,7 @@ replication_instance_arn = <Replication Instance ARN> # Parameter stating the re
 replicationtaskid_prefix = <Prefix Name>
 replication_task_filter = 'replication-instance-arn'  # Parameter to identify what filter to use to extract the tasks
 max_records = 100                                     # Parameter to determine how many response can be extracted in one go
+max_filter_values = 50                                # Parameter to determine how many values are sent in one filter
 use_arn_db_transforms = 'N'      # Parameter to determine whether the transform will be based on ARNs or identifiers
 use_specific_tasks = 'Y'
 change_replication_instance = 'N'
@@ -41,10 +42,122 @@ change_replication_instance = 'N'
 if change_replication_instance == 'Y':
     new_replication_inst_arn = ''
 
+use_instance_pool = 'N'          # Parameter to spread the cloned tasks over the replication instances of the pool
+full_load_placement_round = 8    # Parameter for the number of full load tasks placed on each instance before any instance takes more, None to place by load only (not a runtime limit)
+task_load_source = 'mappings'    # Parameter for the task load estimate : 'mappings' (tables selected) or 'stats' (table sizes too)
+pattern_rule_table_estimate = 10 # Parameter for the number of tables assumed for a selection rule with a wildcard
+placement_file = os.path.join(log_home, 'dms_placement_{}.json'.format(replication_instance_id))
+
+if use_instance_pool == 'Y':
+    replication_instance_pool = [<Replication Instance ARN1>, <Replication Instance ARN2>]
+
 endpoint_type = 'endpoint-type'  # Parameter to identify the filter used to extract the endpoints
 endpoint_type_val = 'Target'     # Parameter to identify the value for the filter
 enable_logging = True            # Parameter to enable Cloudwatch logging
 
+max_create_workers = 10          # Parameter to determine how many tasks are created concurrently
+document_cache_size = 256        # Parameter for the number of unique settings and table mapping documents kept transformed
+use_async_engine = 'N'           # Parameter to run the listing, transforms and connection tests as an asyncio pipeline, the tasks are created once all passed
+async_queue_size = 100           # Parameter for the number of items waiting between two stages of the asyncio pipeline
+async_transform_workers = 4      # Parameter to determine how many tasks are transformed concurrently by the asyncio pipeline
+max_api_retries = 8              # Parameter to determine how many times a throttled API call is retried
+throttle_base_delay = 0.5        # Parameter for the initial back off (in seconds) once the API calls get throttled
+throttle_max_delay = 20          # Parameter for the maximum back off (in seconds) between throttled API calls
+max_connection_test_workers = 10 # Parameter to determine how many endpoint connection tests are started concurrently
+connection_poll_interval = 5     # Parameter for the interval (in seconds) between two polls of the connection tests
+connection_test_timeout = 600    # Parameter for the time (in seconds) after which a connection test is treated as failed
+
+wait_for_ready_tasks = 'Y'       # Parameter to determine whether the script waits for the new tasks to be ready
+ready_poll_interval = 5          # Parameter for the initial interval (in seconds) between two polls of the new tasks
+ready_poll_max_interval = 60     # Parameter for the maximum interval (in seconds) between two polls of the new tasks
+ready_wait_timeout = 1800        # Parameter for the time (in seconds) after which the script stops waiting for the tasks
+
+start_new_tasks = 'N'            # Parameter to start the new tasks once ready (waiting for them even without wait_for_ready_tasks), staggered per replication instance
+max_concurrent_full_loads_per_instance = 2   # Parameter for the number of tasks loading at the same time on one instance
+cdc_settle_latency = 60          # Parameter for the CDC latency (in seconds, from CloudWatch) under which a CDC only task lets the next task start
+cdc_settle_seconds = 300         # Parameter for the time (in seconds) a CDC only task runs before the next task is started, without CDC latency
+start_poll_interval = 60         # Parameter for the interval (in seconds) between two polls of the started tasks
+start_timeout = 172800           # Parameter for the time (in seconds) after which the remaining tasks are not started
+
+use_inventory_snapshot = 'N'     # Parameter to determine whether the endpoints and tasks are cached on disk between runs
+inventory_snapshot_file = os.path.join(log_home, 'dms_inventory_{}.json'.format(replication_instance_id))
+inventory_snapshot_ttl = 900     # Parameter for the age (in seconds) until which the snapshot is used without refresh, tasks created or modified meanwhile are missed
+force_full_refresh = 'N'         # Parameter to ignore the snapshot and list all the endpoints and tasks again
+
+use_run_journal = 'N'            # Parameter to plan the run first and journal every applied step to resume a failed run, with the same configuration only
+plan_file = os.path.join(log_home, 'dms_plan_{}.json'.format(replication_instance_id))
+journal_file = os.path.join(log_home, 'dms_journal_{}.jsonl'.format(replication_instance_id))
+
+use_fanout = 'N'                 # Parameter to clone the tasks of all the replication instances listed in fanout_jobs
+fanout_max_parallel_jobs = 4     # Parameter to determine how many fan-out jobs run at the same time
+fanout_max_pool_connections = 50 # Parameter for the size of the connection pool of the DMS client of each region
+fanout_max_api_concurrency = 20  # Parameter for the number of DMS API calls in flight at the same time in each region, shared by its jobs
+fanout_result_file = os.path.join(log_home, 'dms_fanout_{}.json'.format(datetime.datetime.now().strftime("%y-%m-%d-%H-%M-%S")))
+
+use_watch_mode = 'N'             # Parameter to keep running and clone the new or changed tasks at every poll
+watch_poll_interval = 300        # Parameter for the interval (in seconds) between two polls of the watch mode
+watch_max_cycles = None          # Parameter for the number of polls after which the watch stops, None runs until SIGTERM
+
+export_metrics = 'Y'             # Parameter to export the API call and phase metrics of the run at its end
+metrics_json_file = os.path.join(log_home, 'auto_dms_tasks_metrics.json')
+metrics_prom_file = os.path.join(log_home, 'auto_dms_tasks.prom')    # Point it to the node exporter textfile directory
+
+run_comparison = 'N'             # Parameter to compare the tasks cloned by the last plan with their original tasks instead of cloning
+comparison_period_hours = 24     # Parameter for the time window (in hours) of the CloudWatch metrics compared
+comparison_metric_period = 300   # Parameter for the period (in seconds) of the CloudWatch datapoints
+max_comparison_workers = 10      # Parameter to determine how many tasks have their table statistics collected concurrently
+comparison_regression_threshold = 20  # Parameter for the drop of throughput or rise of latency (in %) reported as a regression
+comparison_file = os.path.join(log_home, 'dms_comparison_{}.json'.format(replication_instance_id))
+
+run_cleanup = 'N'                # Parameter to delete the tasks superseded by the last completed plan and their old endpoints
+cleanup_dry_run = 'Y'            # Parameter to only log what the clean up would stop and delete
+delete_old_endpoints = 'Y'       # Parameter to delete the old endpoints of the transforms once no task uses them
+max_cleanup_tasks_per_instance = 4    # Parameter for the number of tasks stopped or deleted at the same time on one instance
+cleanup_poll_interval = 15       # Parameter for the interval (in seconds) between two polls of the tasks and endpoints deleted
+cleanup_timeout = 3600           # Parameter for the time (in seconds) after which a task or endpoint not deleted is reported
+
+use_task_sharding = 'N'          # Parameter to split the tasks listed in task_shard_counts into balanced parallel tasks
+table_stats_source = 'dms'       # Parameter for the table sizes used to balance the shards : 'dms' or 'file'
+table_stats_file = os.path.join(script_home, 'table-stats.json')     # JSON document of "SCHEMA.TABLE": rows
+
+if use_task_sharding == 'Y':
+    task_shard_counts = {
+        <task name or pattern1> : <number of shards1>,
+        <task name or pattern2> : <number of shards2>
+    }
+
+# Performance profiles rewriting the load tuning sections of the ReplicationTaskSettings of the cloned tasks. The profile
+# of a task is the one of the first rule of task_settings_profile_rules matching its name, else the default profile
+task_settings_profiles = {
+    'bulk-full-load': {
+        'FullLoadSettings': {'MaxFullLoadSubTasks': 16, 'CommitRate': 50000},
+        'TargetMetadata': {'ParallelLoadThreads': 8, 'ParallelLoadBufferSize': 500}
+    },
+    'low-latency-cdc': {
+        'TargetMetadata': {'BatchApplyEnabled': True},
+        'ChangeProcessingTuning': {'BatchApplyPreserveTransaction': True, 'BatchApplyTimeoutMin': 1, 'BatchApplyTimeoutMax': 10,
+                                   'BatchApplyMemoryLimit': 500, 'MinTransactionSize': 1000, 'CommitTimeout': 1,
+                                   'MemoryLimitTotal': 2048, 'MemoryKeepTime': 60}
+    },
+    'memory-constrained': {
+        'FullLoadSettings': {'MaxFullLoadSubTasks': 4, 'CommitRate': 5000},
+        'TargetMetadata': {'ParallelLoadThreads': 0, 'ParallelLoadBufferSize': 0, 'BatchApplyEnabled': False},
+        'ChangeProcessingTuning': {'BatchApplyMemoryLimit': 250, 'MemoryLimitTotal': 512, 'MemoryKeepTime': 30,
+                                   'StatementCacheSize': 50}
+    }
+}
+default_task_settings_profile = None     # Parameter for the profile of the tasks matching no rule, None keeps their tuning
+task_settings_profile_rules = [          # List of (task name pattern, profile name), the first matching rule wins
+    # ('*-bulk-*', 'bulk-full-load'),
+]
+
+# Rules renaming the cloned tasks before replicationtaskid_prefix is prepended : (task name pattern, text to replace,
+# replacement), the first matching rule wins. None keeps the default rules dropping the 'non-prod-' and 'prod-' prefixes.
+# In task_names, the transforms and all the rules, a key with * ? or [ is a glob and a key starting with 're:' is a
+# regular expression. The new endpoint of a glob fills its wildcards with what they matched, e.g.
+# '*-ora-old-*' : '*-ora-new-*', the new endpoint of a regular expression can use its groups as \1
+task_rename_rules = None
+
 ###############################################################################################################################
 
 if use_arn_db_transforms == 'Y':
@@ -69,3 +182,21 @@ else:
 
 if use_specific_tasks == 'Y':
     task_names = [<task name 1>, <task name 2>]
+
+# Jobs run by the fan-out mode. Each job names its region and replication instance and can override the transforms, the
+# task selection and the other values listed in FANOUT_JOB_KEYS of auto_dms_tasks.py
+if use_fanout == 'Y':
+    fanout_jobs = [
+        {
+            'aws_region': <Region1>,
+            'replication_instance_arn': <Replication Instance ARN1>,
+            'src_endpoint_transforms': {<Old Source Endpoint Identifier1> : <New Source Endpoint Identifier1>},
+            'tgt_endpoint_transforms': {<Old Target Endpoint Identifier1> : <New Target Endpoint Identifier1>}
+        },
+        {
+            'aws_region': <Region2>,
+            'replication_instance_arn': <Replication Instance ARN2>,
+            'src_endpoint_transforms': {<Old Source Endpoint Identifier2> : <New Source Endpoint Identifier2>},
+            'tgt_endpoint_transforms': {<Old Target Endpoint Identifier2> : <New Target Endpoint Identifier2>}
+        }
+    ]
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+
+'''
+    Script Name : fake_dms.py
+    Author : Debraj Ganguly
+    Purpose :This script provides a local, in-process stand-in for the boto3 DMS client. It keeps endpoints and replication
+            tasks in memory and supports the Marker pagination and filters of the describe APIs, test_connection,
+            throttling and latency injection, so that auto_dms_tasks.py can be measured without a live AWS account.
+            A stand-in for the CloudWatch client serves the GetMetricData calls of the comparison mode.
+    Dependencies : botocore (for the ClientError raised by the fake API calls)
+'''
+
+import collections
+import datetime
+import random
+import threading
+import time
+import types
+from botocore.exceptions import ClientError
+
+# Names of the filters supported by the fake describe APIs, mapped to the attribute of the resource they match
+ENDPOINT_FILTERS = {
+    'endpoint-arn': 'EndpointArn',
+    'endpoint-type': 'EndpointType',
+    'endpoint-id': 'EndpointIdentifier',
+    'engine-name': 'EngineName'
+}
+
+TASK_FILTERS = {
+    'replication-task-arn': 'ReplicationTaskArn',
+    'replication-task-id': 'ReplicationTaskIdentifier',
+    'migration-type': 'MigrationType',
+    'endpoint-arn': ('SourceEndpointArn', 'TargetEndpointArn'),
+    'replication-instance-arn': 'ReplicationInstanceArn'
+}
+
+INSTANCE_FILTERS = {
+    'replication-instance-arn': 'ReplicationInstanceArn',
+    'replication-instance-id': 'ReplicationInstanceIdentifier',
+    'replication-instance-class': 'ReplicationInstanceClass'
+}
+
+CONNECTION_FILTERS = {
+    'endpoint-arn': 'EndpointArn',
+    'replication-instance-arn': 'ReplicationInstanceArn'
+}
+
+
+# Function to build a ClientError shaped like the ones raised by botocore
+def client_error(error_class, code, message, operation_name):
+    return error_class({'Error': {'Code': code, 'Message': message},
+                        'ResponseMetadata': {'HTTPStatusCode': 400}}, operation_name)
+
+
+# Class accounting for the calls of a fake AWS client, with the latency and throttling errors requested
+class FakeAWSClient:
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, seed=None):
+        self.latency = latency                                  # Seconds added to every API call
+        self.throttle_rate = throttle_rate                      # Share of the API calls failing with a throttling error
+        self.random = random.Random(seed)
+        self.calls = collections.Counter()    # API operation -> number of calls
+        self.lock = threading.RLock()
+
+    # Function to account for one API call, adding the latency and the throttling errors requested
+    def _call(self, operation_name):
+        with self.lock:
+            self.calls[operation_name] += 1
+            throttled = self.throttle_rate and self.random.random() < self.throttle_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            with self.lock:
+                self.calls['throttled:' + operation_name] += 1
+            raise client_error(ClientError, 'ThrottlingException', 'Rate exceeded', operation_name)
+
+
+# Class implementing the subset of the boto3 DMS client used by auto_dms_tasks.py
+class FakeDMSClient(FakeAWSClient):
+
+    def __init__(self, region='us-east-1', account='123456789012', latency=0.0, throttle_rate=0.0,
+                 task_ready_delay=0.0, connection_test_delay=0.0, full_load_duration=0.0, delete_delay=0.0, seed=None):
+        super().__init__(latency, throttle_rate, seed)
+        self.region = region
+        self.account = account
+        self.task_ready_delay = task_ready_delay                # Seconds a new task stays in the creating state
+        self.connection_test_delay = connection_test_delay      # Seconds a connection test stays in the testing state
+        self.full_load_duration = full_load_duration            # Seconds the full load of a started task takes
+        self.delete_delay = delete_delay                        # Seconds a task takes to stop and a resource to be deleted
+
+        self.endpoints = {}                   # EndpointArn -> endpoint description
+        self.tasks = {}                       # ReplicationTaskArn -> task description
+        self.task_identifiers = set()         # ReplicationTaskIdentifiers in use
+        self.connections = {}                 # (ReplicationInstanceArn, EndpointArn) -> connection description
+        self.failing_endpoints = set()        # EndpointArns whose connection tests fail
+        self.table_statistics = {}            # ReplicationTaskArn -> list of table statistics
+        self.replication_instances = {}       # ReplicationInstanceArn -> replication instance description
+        self.sequence = 0
+
+        self.exceptions = types.SimpleNamespace(
+            ResourceAlreadyExistsFault=type('ResourceAlreadyExistsFault', (ClientError,), {}),
+            ResourceNotFoundFault=type('ResourceNotFoundFault', (ClientError,), {}),
+            InvalidResourceStateFault=type('InvalidResourceStateFault', (ClientError,), {}),
+            InvalidParameterValueException=type('InvalidParameterValueException', (ClientError,), {})
+        )
+
+    # Function to generate an ARN for a new resource
+    def _arn(self, resource_type):
+        self.sequence = self.sequence + 1
+        return 'arn:aws:dms:{0}:{1}:{2}:FAKE{3:012d}'.format(self.region, self.account, resource_type, self.sequence)
+
+    # Function to return one page of items as per MaxRecords and the Marker of the previous page
+    def _page(self, items, result_key, MaxRecords=100, Marker=None):
+        MaxRecords = max(20, min(100, MaxRecords))
+        start = int(Marker) if Marker else 0
+        page = items[start:start + MaxRecords]
+        response = {result_key: page, 'ResponseMetadata': {'HTTPStatusCode': 200, 'RetryAttempts': 0,
+                                                           'HTTPHeaders': {'content-length': str(len(repr(page)))}}}
+        if start + MaxRecords < len(items):
+            response['Marker'] = str(start + MaxRecords)
+
+        return response
+
+    # Function to apply describe filters on the resources. A filter on the ARN the resources are keyed by is resolved
+    # through the key instead of scanning every resource
+    @staticmethod
+    def _filter(resources, filters, supported_filters, operation_name, arn_filter=None):
+        filters = list(filters or [])
+        arn_values = [item_filter['Values'] for item_filter in filters if item_filter['Name'] == arn_filter]
+        if arn_values:
+            items = [resources[arn] for arn in dict.fromkeys(arn_values[0]) if arn in resources]
+        else:
+            items = list(resources.values())
+
+        for item_filter in filters:
+            attributes = supported_filters.get(item_filter['Name'])
+            if attributes is None:
+                raise client_error(ClientError, 'InvalidParameterValueException',
+                                   'Filter {0} is not supported'.format(item_filter['Name']), operation_name)
+            if isinstance(attributes, str):
+                attributes = (attributes,)
+            values = set(value.lower() for value in item_filter['Values'])
+            items = [item for item in items if any(str(item.get(attribute)).lower() in values for attribute in attributes)]
+
+        return items
+
+    # Function to add an endpoint to the fake account
+    def add_endpoint(self, EndpointIdentifier, EndpointType, EngineName='oracle'):
+        with self.lock:
+            endpoint_arn = self._arn('endpoint')
+            self.endpoints[endpoint_arn] = {
+                'EndpointIdentifier': EndpointIdentifier,
+                'EndpointType': EndpointType.upper(),
+                'EngineName': EngineName,
+                'EndpointArn': endpoint_arn,
+                'Status': 'active'
+            }
+
+        return endpoint_arn
+
+    # Function to add a replication instance to the fake account
+    def add_replication_instance(self, ReplicationInstanceIdentifier, ReplicationInstanceClass='dms.r5.large'):
+        with self.lock:
+            instance_arn = self._arn('rep')
+            self.replication_instances[instance_arn] = {
+                'ReplicationInstanceIdentifier': ReplicationInstanceIdentifier,
+                'ReplicationInstanceClass': ReplicationInstanceClass,
+                'ReplicationInstanceArn': instance_arn,
+                'ReplicationInstanceStatus': 'available'
+            }
+
+        return instance_arn
+
+    # Function to add an existing replication task to the fake account
+    def add_task(self, ReplicationTaskIdentifier, SourceEndpointArn, TargetEndpointArn, ReplicationInstanceArn,
+                 MigrationType, TableMappings, ReplicationTaskSettings, Status='ready'):
+        with self.lock:
+            task_arn = self._arn('task')
+            self.task_identifiers.add(ReplicationTaskIdentifier)
+            self.tasks[task_arn] = {
+                'ReplicationTaskIdentifier': ReplicationTaskIdentifier,
+                'SourceEndpointArn': SourceEndpointArn,
+                'TargetEndpointArn': TargetEndpointArn,
+                'ReplicationInstanceArn': ReplicationInstanceArn,
+                'MigrationType': MigrationType,
+                'TableMappings': TableMappings,
+                'ReplicationTaskSettings': ReplicationTaskSettings,
+                'Status': Status,
+                'ReplicationTaskCreationDate': datetime.datetime.now(datetime.timezone.utc),
+                'ReplicationTaskArn': task_arn,
+                '_ready_at': 0.0
+            }
+
+        return task_arn
+
+    # Function to remove the tasks and endpoints whose deletion has completed
+    def _purge(self):
+        now = time.monotonic()
+        for resources in (self.tasks, self.endpoints):
+            for arn in [arn for arn, resource in resources.items() if resource.get('_deleted_at', now + 1) <= now]:
+                resource = resources.pop(arn)
+                self.task_identifiers.discard(resource.get('ReplicationTaskIdentifier'))
+
+    # Function to give the public view of a task, moving it out of the creating state once its delay has passed,
+    # through its full load once it has been started and to stopped once it has been asked to stop
+    def _task_view(self, task, without_settings=False):
+        if task['Status'] == 'creating' and time.monotonic() >= task['_ready_at']:
+            task['Status'] = 'ready'
+        if task['Status'] == 'stopping' and time.monotonic() >= task['_stopped_at']:
+            task['Status'] = 'stopped'
+            task['StopReason'] = 'STOPPED_BY_USER'
+        if task['Status'] == 'running' and task['MigrationType'] != 'cdc':
+            progress = 100
+            if self.full_load_duration:
+                progress = min(100, int(100 * (time.monotonic() - task['_started_at']) / self.full_load_duration))
+            task['ReplicationTaskStats'].update(FullLoadProgressPercent=progress,
+                                                TablesLoaded=1 if progress == 100 else 0,
+                                                TablesLoading=0 if progress == 100 else 1)
+            if progress == 100 and task['MigrationType'] == 'full-load':
+                task['Status'] = 'stopped'
+                task['StopReason'] = 'FULL_LOAD_ONLY_FINISHED'
+        view = {key: value for key, value in task.items() if not key.startswith('_')}
+        if without_settings:
+            view.pop('TableMappings', None)
+            view.pop('ReplicationTaskSettings', None)
+
+        return view
+
+    def describe_replication_instances(self, Filters=None, MaxRecords=100, Marker=None):
+        self._call('DescribeReplicationInstances')
+        with self.lock:
+            instances = self._filter(self.replication_instances, Filters, INSTANCE_FILTERS, 'DescribeReplicationInstances',
+                                     'replication-instance-arn')
+            return self._page([dict(instance) for instance in instances], 'ReplicationInstances', MaxRecords, Marker)
+
+    def describe_endpoints(self, Filters=None, MaxRecords=100, Marker=None):
+        self._call('DescribeEndpoints')
+        with self.lock:
+            self._purge()
+            endpoints = self._filter(self.endpoints, Filters, ENDPOINT_FILTERS, 'DescribeEndpoints', 'endpoint-arn')
+            return self._page([{key: value for key, value in endpoint.items() if not key.startswith('_')}
+                               for endpoint in endpoints], 'Endpoints', MaxRecords, Marker)
+
+    def describe_replication_tasks(self, Filters=None, MaxRecords=100, Marker=None, WithoutSettings=False):
+        self._call('DescribeReplicationTasks')
+        with self.lock:
+            self._purge()
+            tasks = self._filter(self.tasks, Filters, TASK_FILTERS, 'DescribeReplicationTasks', 'replication-task-arn')
+            if Filters and not tasks:
+                raise client_error(self.exceptions.ResourceNotFoundFault, 'ResourceNotFoundFault',
+                                   'No Replication Tasks found matching provided filters', 'DescribeReplicationTasks')
+            response = self._page(tasks, 'ReplicationTasks', MaxRecords, Marker)
+            response['ReplicationTasks'] = [self._task_view(task, WithoutSettings) for task in response['ReplicationTasks']]
+            return response
+
+    def create_replication_task(self, ReplicationTaskIdentifier, SourceEndpointArn, TargetEndpointArn,
+                                ReplicationInstanceArn, MigrationType, TableMappings, ReplicationTaskSettings=None,
+                                **kwargs):
+        self._call('CreateReplicationTask')
+        with self.lock:
+            if ReplicationTaskIdentifier in self.task_identifiers:
+                raise client_error(self.exceptions.ResourceAlreadyExistsFault, 'ResourceAlreadyExistsFault',
+                                   'ReplicationTaskIdentifier already in use', 'CreateReplicationTask')
+            for endpoint_arn in (SourceEndpointArn, TargetEndpointArn):
+                if endpoint_arn not in self.endpoints:
+                    raise client_error(self.exceptions.ResourceNotFoundFault, 'ResourceNotFoundFault',
+                                       'Endpoint {0} not found'.format(endpoint_arn), 'CreateReplicationTask')
+
+            task_arn = self.add_task(ReplicationTaskIdentifier, SourceEndpointArn, TargetEndpointArn,
+                                     ReplicationInstanceArn, MigrationType, TableMappings, ReplicationTaskSettings,
+                                     Status='creating')
+            self.tasks[task_arn]['_ready_at'] = time.monotonic() + self.task_ready_delay
+            task = self.tasks[task_arn]
+            return {'ReplicationTask': {key: value for key, value in task.items() if not key.startswith('_')},
+                    'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def modify_replication_task(self, ReplicationTaskArn, **kwargs):
+        self._call('ModifyReplicationTask')
+        with self.lock:
+            task = self.tasks.get(ReplicationTaskArn)
+            if task is None:
+                raise client_error(self.exceptions.ResourceNotFoundFault, 'ResourceNotFoundFault',
+                                   'Replication Task {0} not found'.format(ReplicationTaskArn), 'ModifyReplicationTask')
+            if self._task_view(task)['Status'] not in ('ready', 'stopped', 'failed'):
+                raise client_error(self.exceptions.InvalidResourceStateFault, 'InvalidResourceStateFault',
+                                   'Replication Task cannot be modified in state {0}'.format(task['Status']),
+                                   'ModifyReplicationTask')
+            task.update({key: value for key, value in kwargs.items()
+                         if key in ('MigrationType', 'TableMappings', 'ReplicationTaskSettings')})
+            return {'ReplicationTask': self._task_view(task), 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def start_replication_task(self, ReplicationTaskArn, StartReplicationTaskType, **kwargs):
+        self._call('StartReplicationTask')
+        with self.lock:
+            task = self.tasks.get(ReplicationTaskArn)
+            if task is None:
+                raise client_error(self.exceptions.ResourceNotFoundFault, 'ResourceNotFoundFault',
+                                   'Replication Task {0} not found'.format(ReplicationTaskArn), 'StartReplicationTask')
+            if self._task_view(task)['Status'] not in ('ready', 'stopped', 'failed'):
+                raise client_error(self.exceptions.InvalidResourceStateFault, 'InvalidResourceStateFault',
+                                   'Replication Task cannot be started in state {0}'.format(task['Status']),
+                                   'StartReplicationTask')
+            task['Status'] = 'running'
+            task['ReplicationTaskStartDate'] = datetime.datetime.now(datetime.timezone.utc)
+            task['ReplicationTaskStats'] = {'FullLoadProgressPercent': 0, 'ElapsedTimeMillis': 0, 'TablesLoaded': 0,
+                                            'TablesLoading': 0, 'TablesQueued': 0, 'TablesErrored': 0}
+            task['_started_at'] = time.monotonic()
+            return {'ReplicationTask': self._task_view(task), 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def stop_replication_task(self, ReplicationTaskArn):
+        self._call('StopReplicationTask')
+        with self.lock:
+            self._purge()
+            task = self.tasks.get(ReplicationTaskArn)
+            if task is None:
+                raise client_error(self.exceptions.ResourceNotFoundFault, 'ResourceNotFoundFault',
+                                   'Replication Task {0} not found'.format(ReplicationTaskArn), 'StopReplicationTask')
+            if self._task_view(task)['Status'] != 'running':
+                raise client_error(self.exceptions.InvalidResourceStateFault, 'InvalidResourceStateFault',
+                                   'Replication Task is not running', 'StopReplicationTask')
+            task['Status'] = 'stopping'
+            task['_stopped_at'] = time.monotonic() + self.delete_delay
+            return {'ReplicationTask': self._task_view(task), 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def delete_replication_task(self, ReplicationTaskArn):
+        self._call('DeleteReplicationTask')
+        with self.lock:
+            self._purge()
+            task = self.tasks.get(ReplicationTaskArn)
+            if task is None:
+                raise client_error(self.exceptions.ResourceNotFoundFault, 'ResourceNotFoundFault',
+                                   'Replication Task {0} not found'.format(ReplicationTaskArn), 'DeleteReplicationTask')
+            if self._task_view(task)['Status'] in ('running', 'starting', 'stopping', 'creating'):
+                raise client_error(self.exceptions.InvalidResourceStateFault, 'InvalidResourceStateFault',
+                                   'Replication Task cannot be deleted in state {0}'.format(task['Status']),
+                                   'DeleteReplicationTask')
+            task['Status'] = 'deleting'
+            task['_deleted_at'] = time.monotonic() + self.delete_delay
+            return {'ReplicationTask': self._task_view(task), 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def delete_endpoint(self, EndpointArn):
+        self._call('DeleteEndpoint')
+        with self.lock:
+            self._purge()
+            endpoint = self.endpoints.get(EndpointArn)
+            if endpoint is None:
+                raise client_error(self.exceptions.ResourceNotFoundFault, 'ResourceNotFoundFault',
+                                   'Endpoint {0} not found'.format(EndpointArn), 'DeleteEndpoint')
+            if any(EndpointArn in (task['SourceEndpointArn'], task['TargetEndpointArn']) for task in self.tasks.values()):
+                raise client_error(self.exceptions.InvalidResourceStateFault, 'InvalidResourceStateFault',
+                                   'Endpoint is used by replication tasks', 'DeleteEndpoint')
+            endpoint['Status'] = 'deleting'
+            endpoint['_deleted_at'] = time.monotonic() + self.delete_delay
+            return {'Endpoint': {key: value for key, value in endpoint.items() if not key.startswith('_')},
+                    'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def test_connection(self, ReplicationInstanceArn, EndpointArn):
+        self._call('TestConnection')
+        with self.lock:
+            if EndpointArn not in self.endpoints:
+                raise client_error(self.exceptions.ResourceNotFoundFault, 'ResourceNotFoundFault',
+                                   'Endpoint {0} not found'.format(EndpointArn), 'TestConnection')
+            connection = self.connections.get((ReplicationInstanceArn, EndpointArn))
+            if connection is not None and connection['Status'] == 'testing' \
+                    and time.monotonic() < connection['_done_at']:
+                raise client_error(self.exceptions.InvalidResourceStateFault, 'InvalidResourceStateFault',
+                                   'Test connection already in progress', 'TestConnection')
+            connection = {
+                'ReplicationInstanceArn': ReplicationInstanceArn,
+                'EndpointArn': EndpointArn,
+                'EndpointIdentifier': self.endpoints[EndpointArn]['EndpointIdentifier'],
+                'Status': 'testing',
+                '_done_at': time.monotonic() + self.connection_test_delay
+            }
+            self.connections[(ReplicationInstanceArn, EndpointArn)] = connection
+            return {'Connection': self._connection_view(connection), 'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    # Function to give the public view of a connection, settling its test once its delay has passed
+    def _connection_view(self, connection):
+        if connection['Status'] == 'testing' and time.monotonic() >= connection['_done_at']:
+            if connection['EndpointArn'] in self.failing_endpoints:
+                connection['Status'] = 'failed'
+                connection['LastFailureMessage'] = 'Test connection failed for endpoint'
+            else:
+                connection['Status'] = 'successful'
+
+        return {key: value for key, value in connection.items() if not key.startswith('_')}
+
+    def describe_connections(self, Filters=None, MaxRecords=100, Marker=None):
+        self._call('DescribeConnections')
+        with self.lock:
+            connections = self._filter(self.connections, Filters, CONNECTION_FILTERS, 'DescribeConnections')
+            connections = [self._connection_view(connection) for connection in connections]
+            return self._page(connections, 'Connections', MaxRecords, Marker)
+
+    # Function to set the table statistics of a task from a dictionary of "SCHEMA.TABLE": full load rows. When given, the
+    # full load of every table ended full_load_seconds after it started
+    def set_table_statistics(self, ReplicationTaskArn, table_rows, full_load_seconds=None):
+        ended = datetime.datetime.now(datetime.timezone.utc)
+        with self.lock:
+            self.table_statistics[ReplicationTaskArn] = [
+                {'SchemaName': key.split('.', 1)[0], 'TableName': key.split('.', 1)[1], 'FullLoadRows': rows,
+                 'Inserts': 0, 'Deletes': 0, 'Updates': 0, 'Ddls': 0, 'TableState': 'Table completed'}
+                for key, rows in table_rows.items()]
+            if full_load_seconds is not None:
+                for table in self.table_statistics[ReplicationTaskArn]:
+                    table['FullLoadStartTime'] = ended - datetime.timedelta(seconds=full_load_seconds)
+                    table['FullLoadEndTime'] = ended
+
+    def describe_table_statistics(self, ReplicationTaskArn, MaxRecords=100, Marker=None, Filters=None):
+        self._call('DescribeTableStatistics')
+        with self.lock:
+            if ReplicationTaskArn not in self.tasks:
+                raise client_error(self.exceptions.ResourceNotFoundFault, 'ResourceNotFoundFault',
+                                   'Replication Task {0} not found'.format(ReplicationTaskArn), 'DescribeTableStatistics')
+            statistics = [dict(table) for table in self.table_statistics.get(ReplicationTaskArn, [])]
+            statistics = self._filter({idx: table for idx, table in enumerate(statistics)}, Filters,
+                                      {'schema-name': 'SchemaName', 'table-name': 'TableName', 'table-state': 'TableState'},
+                                      'DescribeTableStatistics')
+            response = self._page(statistics, 'TableStatistics', MaxRecords, Marker)
+            response['ReplicationTaskArn'] = ReplicationTaskArn
+            return response
+
+
+# Class implementing the GetMetricData call of the boto3 CloudWatch client for the metrics of the AWS/DMS namespace
+class FakeCloudWatchClient(FakeAWSClient):
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, results_per_page=100, seed=None):
+        super().__init__(latency, throttle_rate, seed)
+        self.results_per_page = results_per_page      # Query results returned per page before a NextToken
+        self.datapoints = {}                          # (instance id, task resource id, metric name) -> values
+
+    # Function to set the datapoints of one metric of a task
+    def set_task_metric(self, ReplicationInstanceIdentifier, ReplicationTaskArn, MetricName, values):
+        with self.lock:
+            self.datapoints[(ReplicationInstanceIdentifier, ReplicationTaskArn.split(':')[-1], MetricName)] = list(values)
+
+    def get_metric_data(self, MetricDataQueries, StartTime, EndTime, NextToken=None, **kwargs):
+        self._call('GetMetricData')
+        if len(MetricDataQueries) > 500:
+            raise client_error(ClientError, 'ValidationError', 'The collection MetricDataQueries must not have a size '
+                               'greater than 500', 'GetMetricData')
+
+        start = int(NextToken) if NextToken else 0
+        results = []
+        with self.lock:
+            for query in MetricDataQueries[start:start + self.results_per_page]:
+                metric = query['MetricStat']['Metric']
+                dimensions = {dimension['Name']: dimension['Value'] for dimension in metric['Dimensions']}
+                values = self.datapoints.get((dimensions.get('ReplicationInstanceIdentifier'),
+                                              dimensions.get('ReplicationTaskIdentifier'), metric['MetricName']), [])
+                results.append({'Id': query['Id'], 'Label': metric['MetricName'], 'Values': list(values),
+                                'Timestamps': [EndTime - datetime.timedelta(seconds=query['MetricStat']['Period'] * idx)
+                                               for idx in range(len(values))],
+                                'StatusCode': 'Complete'})
+
+        response = {'MetricDataResults': results, 'ResponseMetadata': {'HTTPStatusCode': 200}}
+        if start + self.results_per_page < len(MetricDataQueries):
+            response['NextToken'] = str(start + self.results_per_page)
+
+        return response
@@ -0,0 +1,862 @@
+#!/usr/bin/env python3
+
+'''
+    Script Name : test_auto_dms_tasks.py
+    Author : Debraj Ganguly
+    Purpose :This script tests auto_dms_tasks.py against the local DMS and CloudWatch stand-ins of fake_dms.py, using the
+            benchmark configuration of bench_dms_tasks.py in place of dms_tasks_config.py.
+    Dependencies : auto_dms_tasks.py, bench_dms_tasks.py, fake_dms.py, pytest
+    Usage : python -m pytest -q test_auto_dms_tasks.py
+'''
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+import bench_dms_tasks
+import fake_dms
+
+# auto_dms_tasks.py imports its configuration under this name, the module is refilled by the config fixture of each test
+sys.modules['dms_tasks_config'] = bench_dms_tasks.bench_config(os.path.join(tempfile.gettempdir(), 'test_dms_tasks.log'))
+import auto_dms_tasks    # noqa: E402
+
+INSTANCE_ARN = bench_dms_tasks.REPLICATION_INSTANCE_ARN
+
+
+# Fixture resetting the configuration and the state kept by auto_dms_tasks.py between runs. Every file written by the
+# run goes to the temporary directory of the test
+@pytest.fixture
+def config(tmp_path):
+    config_module = sys.modules['dms_tasks_config']
+    config_module.__dict__.clear()
+    config_module.__dict__.update(vars(bench_dms_tasks.bench_config(str(tmp_path / 'dms_tasks.log'))))
+    for setting, value in vars(config_module).items():
+        if setting.endswith('_file'):
+            setattr(config_module, setting, str(tmp_path / os.path.basename(value)))
+
+    auto_dms_tasks.job_rules.set(None)
+    auto_dms_tasks.connection_verdicts.clear()
+    auto_dms_tasks.table_sizes_cache.clear()
+    auto_dms_tasks.document_cache.clear()
+    auto_dms_tasks.metrics.reset()
+    return config_module
+
+
+# Function to build a fake account with the given number of tasks, see bench_dms_tasks.build_account
+def build_account(config, size, **settings):
+    client = bench_dms_tasks.build_account(size, config, 0.0, 0.0)
+    for setting, value in settings.items():
+        setattr(client, setting, value)
+    return client
+
+
+def test_paginate_follows_the_marker(config):
+    client = build_account(config, 250)
+    auto_dms_tasks.init_dms_client(client)
+
+    tasks = list(auto_dms_tasks.get_replication_tasks())
+
+    assert len(tasks) == 250
+    assert len(set(task['ReplicationTaskArn'] for task in tasks)) == 250
+    assert client.calls['DescribeReplicationTasks'] == 3
+
+
+def test_paginate_treats_an_unknown_filter_value_as_empty(config):
+    client = build_account(config, 4)
+    auto_dms_tasks.init_dms_client(client)
+    filters = [{'Name': 'replication-task-arn', 'Values': ['arn:aws:dms:us-east-1:123456789012:task:MISSING']}]
+
+    assert list(auto_dms_tasks.paginate(client.describe_replication_tasks, 'ReplicationTasks', Filters=filters)) == []
+
+
+def test_throttled_calls_are_retried(config):
+    client = build_account(config, 250, throttle_rate=0.5)
+    auto_dms_tasks.init_dms_client(client)
+
+    tasks = list(auto_dms_tasks.get_replication_tasks())
+
+    assert len(tasks) == 250
+    assert client.calls['throttled:DescribeReplicationTasks'] > 0
+    assert auto_dms_tasks.metrics.as_dict()['operations']['describe_replication_tasks']['retries'] > 0
+
+
+def test_throttling_gives_up_after_max_api_retries(config):
+    config.max_api_retries = 2
+    client = build_account(config, 4, throttle_rate=1.0)
+    auto_dms_tasks.init_dms_client(client)
+
+    with pytest.raises(auto_dms_tasks.ClientError):
+        list(auto_dms_tasks.get_replication_tasks())
+    assert client.calls['DescribeReplicationTasks'] == 3
+
+
+def test_each_connection_is_tested_once_per_run(config):
+    client = build_account(config, 40)
+    auto_dms_tasks.init_dms_client(client)
+    endpoint_arns = sorted(client.endpoints)
+    pairs = [(INSTANCE_ARN, endpoint_arn) for endpoint_arn in endpoint_arns] * 2
+
+    verdicts = auto_dms_tasks.test_endpoint_connections(pairs)
+    assert auto_dms_tasks.check_endpoint_arn(INSTANCE_ARN, endpoint_arns[0])
+
+    assert all(verdicts[(INSTANCE_ARN, endpoint_arn)] for endpoint_arn in endpoint_arns)
+    assert client.calls['TestConnection'] == len(endpoint_arns)
+
+
+def test_failed_connection_tests_are_reported(config):
+    client = build_account(config, 4)
+    auto_dms_tasks.init_dms_client(client)
+    failing_arn = sorted(client.endpoints)[0]
+    client.failing_endpoints.add(failing_arn)
+
+    verdicts = auto_dms_tasks.test_endpoint_connections([(INSTANCE_ARN, arn) for arn in client.endpoints])
+
+    assert verdicts[(INSTANCE_ARN, failing_arn)] is False
+    assert sum(verdicts.values()) == len(client.endpoints) - 1
+
+
+def test_clone_creates_every_task(config):
+    client = build_account(config, 20)
+
+    results = auto_dms_tasks.main(client)
+
+    assert [result['Result'] for result in results] == ['created'] * 20
+    assert all(result['Status'] == 'ready' for result in results)
+    assert {result['ReplicationTaskIdentifier'] for result in results} == \
+        {'bench-bench-task-{0}'.format(idx) for idx in range(20)}
+    clones = [task for task in client.tasks.values() if task['ReplicationTaskIdentifier'].startswith('bench-')]
+    assert all(client.endpoints[task['SourceEndpointArn']]['EndpointIdentifier'].startswith('bench-src-new-')
+               for task in clones)
+    assert all(client.endpoints[task['TargetEndpointArn']]['EndpointIdentifier'].startswith('bench-tgt-new-')
+               for task in clones)
+
+
+def test_clone_skips_existing_tasks(config):
+    client = build_account(config, 8)
+    auto_dms_tasks.main(client)
+
+    results = auto_dms_tasks.main(client)
+
+    assert [result['Result'] for result in results] == ['exists'] * 8
+    assert all(result['ReplicationTaskArn'] is None for result in results)
+
+
+def test_failed_creates_stop_the_run(config):
+    client = build_account(config, 8)
+    create_replication_task = client.create_replication_task
+
+    def failing_create(**kwargs):
+        if kwargs['ReplicationTaskIdentifier'] == 'bench-bench-task-3':
+            raise fake_dms.client_error(client.exceptions.InvalidParameterValueException,
+                                        'InvalidParameterValueException', 'Invalid settings', 'CreateReplicationTask')
+        return create_replication_task(**kwargs)
+    client.create_replication_task = failing_create
+
+    with pytest.raises(SystemExit):
+        auto_dms_tasks.main(client)
+    assert sum(1 for task in client.tasks.values() if task['ReplicationTaskIdentifier'].startswith('bench-')) == 7
+
+
+def test_create_results_are_journaled(config):
+    config.use_run_journal = 'Y'
+    client = build_account(config, 6)
+
+    auto_dms_tasks.main(client)
+
+    with open(config.journal_file) as journal_file:
+        entries = [json.loads(line) for line in journal_file]
+    creates = [entry for entry in entries if entry['step'] == 'create']
+    assert len(creates) == 6
+    assert all(entry['Result'] == 'created' and entry['ReplicationTaskArn'] in client.tasks for entry in creates)
+
+
+# Function to take an inventory snapshot of the account and read it back as the next run would
+def take_inventory_snapshot(config, client):
+    config.use_inventory_snapshot = 'Y'
+    auto_dms_tasks.init_dms_client(client)
+    auto_dms_tasks.load_inventory()
+    return auto_dms_tasks.read_inventory_snapshot()
+
+
+def test_inventory_snapshot_is_json(config):
+    client = build_account(config, 8)
+
+    snapshot = take_inventory_snapshot(config, client)
+
+    with open(config.inventory_snapshot_file) as snapshot_file:
+        assert json.load(snapshot_file)['version'] == auto_dms_tasks.INVENTORY_SNAPSHOT_VERSION
+    assert len(snapshot['tasks']) == 8
+
+
+def test_snapshot_refresh_reads_the_modified_tasks_again(config):
+    client = build_account(config, 8)
+    snapshot = take_inventory_snapshot(config, client)
+    task_arn = sorted(client.tasks)[0]
+    client.modify_replication_task(ReplicationTaskArn=task_arn, TableMappings='{"rules": []}')
+
+    tasks = {task['ReplicationTaskArn']: task for task in auto_dms_tasks.refresh_snapshot_tasks(snapshot['tasks'])}
+
+    assert tasks[task_arn]['TableMappings'] == '{"rules": []}'
+    assert len(tasks) == 8
+
+
+def test_snapshot_refresh_keeps_the_running_tasks(config):
+    client = build_account(config, 8)
+    for task_arn in client.tasks:
+        client.start_replication_task(ReplicationTaskArn=task_arn, StartReplicationTaskType='start-replication')
+    snapshot = take_inventory_snapshot(config, client)
+    client.calls.clear()
+
+    tasks = auto_dms_tasks.refresh_snapshot_tasks(snapshot['tasks'])
+
+    assert len(tasks) == 8
+    assert client.calls['DescribeReplicationTasks'] == 1
+
+
+def test_identical_settings_are_transformed_once(config, monkeypatch):
+    client = build_account(config, 8)
+    auto_dms_tasks.init_dms_client(client)
+    transformed = []
+    edit_task_settings = auto_dms_tasks.edit_task_settings
+
+    def counting_edit_task_settings(*args):
+        transformed.append(args)
+        return edit_task_settings(*args)
+    monkeypatch.setattr(auto_dms_tasks, 'edit_task_settings', counting_edit_task_settings)
+
+    plan = auto_dms_tasks.build_plan()
+
+    assert len(plan) == 8
+    assert len(transformed) == 1
+    assert auto_dms_tasks.metrics.as_dict()['caches']['ReplicationTaskSettings'] == {'hits': 7, 'misses': 1}
+
+
+def test_identical_documents_are_shared_by_the_plan_entries(config):
+    client = build_account(config, 4)
+    for task in client.tasks.values():
+        task['TableMappings'] = table_mappings(('HR', 'EMP'))
+    auto_dms_tasks.init_dms_client(client)
+
+    plan = auto_dms_tasks.build_plan()
+
+    assert all(entry['TableMappings'] is plan[0]['TableMappings'] for entry in plan)
+    assert all(entry['ReplicationTaskSettings'] is plan[0]['ReplicationTaskSettings'] for entry in plan)
+    assert auto_dms_tasks.metrics.as_dict()['caches']['TableMappings'] == {'hits': 3, 'misses': 1}
+
+
+def test_document_cache_evicts_the_least_recently_used_documents(config):
+    config.document_cache_size = 2
+    cache = auto_dms_tasks.document_cache
+
+    first = cache.intern('TableMappings', table_mappings(('HR', 'EMP')))
+    cache.intern('TableMappings', table_mappings(('HR', 'DEPT')))
+    assert cache.intern('TableMappings', table_mappings(('HR', 'EMP'))) is first
+    cache.intern('TableMappings', table_mappings(('SALES', 'ORDERS')))
+
+    assert len(cache.results) == 2
+    assert cache.intern('TableMappings', table_mappings(('HR', 'EMP'))) is first
+    assert cache.intern('TableMappings', table_mappings(('HR', 'DEPT'))) is not None
+    assert auto_dms_tasks.metrics.as_dict()['caches']['TableMappings'] == {'hits': 2, 'misses': 4}
+
+
+def test_plan_key_covers_the_planning_settings(config):
+    key = auto_dms_tasks.plan_key()
+
+    config.replicationtaskid_prefix = 'other-'
+    assert auto_dms_tasks.plan_key() != key
+    config.replicationtaskid_prefix = 'bench-'
+    config.task_settings_profiles = {'small': {'FullLoadSettings': {'MaxFullLoadSubTasks': 4}}}
+    assert auto_dms_tasks.plan_key() != key
+
+
+def test_completed_plan_of_another_configuration_is_replaced(config):
+    config.use_run_journal = 'Y'
+    client = build_account(config, 4)
+    auto_dms_tasks.main(client)
+
+    config.replicationtaskid_prefix = 'other-'
+    results = auto_dms_tasks.main(client)
+
+    assert [result['Result'] for result in results] == ['created'] * 4
+    assert all(result['ReplicationTaskIdentifier'].startswith('other-') for result in results)
+
+
+def test_unfinished_plan_of_another_configuration_is_not_resumed(config):
+    config.use_run_journal = 'Y'
+    client = build_account(config, 4)
+    auto_dms_tasks.init_dms_client(client)
+    auto_dms_tasks.write_plan(auto_dms_tasks.build_plan())
+
+    config.replicationtaskid_prefix = 'other-'
+    with pytest.raises(SystemExit):
+        auto_dms_tasks.main(client)
+    assert not any(task['ReplicationTaskIdentifier'].startswith('other-') for task in client.tasks.values())
+
+
+# Function to make the calls of a fake client last a little and record the peak number of calls in flight
+def probe_concurrency(client):
+    probe = {'in_flight': 0, 'peak': 0}
+    call = client._call
+
+    def probed_call(operation_name):
+        with client.lock:
+            probe['in_flight'] += 1
+            probe['peak'] = max(probe['peak'], probe['in_flight'])
+        try:
+            time.sleep(0.002)
+            call(operation_name)
+        finally:
+            with client.lock:
+                probe['in_flight'] -= 1
+    client._call = probed_call
+
+    return probe
+
+
+def test_invalid_fanout_job_stops_the_run_before_any_job(config):
+    client = build_account(config, 4)
+    auto_dms_tasks.init_dms_client(client)
+    jobs = [{'aws_region': 'us-east-1', 'replication_instance_arn': INSTANCE_ARN},
+            {'aws_region': 'us-east-1', 'replication_instance_arn': INSTANCE_ARN, 'task_prefix': 'typo-'}]
+
+    with pytest.raises(SystemExit):
+        auto_dms_tasks.run_fanout(jobs, lambda region: client)
+    assert sum(client.calls.values()) == 0
+
+
+def test_fanout_jobs_of_a_region_share_the_api_limits(config):
+    config.fanout_max_api_concurrency = 2
+    client = build_account(config, 40)
+    auto_dms_tasks.init_dms_client(client)
+    probe = probe_concurrency(client)
+    jobs = [{'aws_region': 'us-east-1', 'replication_instance_arn': INSTANCE_ARN, 'replicationtaskid_prefix': prefix}
+            for prefix in ('a-', 'b-', 'c-')]
+
+    report = auto_dms_tasks.run_fanout(jobs, lambda region: client)
+
+    assert report['created'] == 120
+    assert probe['peak'] <= 2
+
+
+# Function to build table mappings including the given (schema, table) object locators
+def table_mappings(*locators):
+    return json.dumps({'rules': [{'rule-type': 'selection', 'rule-id': str(idx), 'rule-name': str(idx),
+                                  'rule-action': 'include',
+                                  'object-locator': {'schema-name': schema_name, 'table-name': table_name}}
+                                 for idx, (schema_name, table_name) in enumerate(locators, 1)]})
+
+
+# Function to get the tables selected by each shard of sharded table mappings
+def shard_tables(sharded_mappings, table_keys):
+    return [auto_dms_tasks.selected_table_keys(json.loads(mappings)['rules'], table_keys)
+            for mappings, _ in sharded_mappings]
+
+
+def test_sharding_balances_the_explicit_tables(config):
+    table_sizes = {'HR.EMP': 100, 'HR.DEPT': 60, 'SALES.ORDERS': 50, 'SALES.ITEMS': 10}
+    mappings = table_mappings(('HR', 'EMP'), ('HR', 'DEPT'), ('SALES', 'ORDERS'), ('SALES', 'ITEMS'))
+
+    sharded_mappings = auto_dms_tasks.shard_table_mappings(mappings, 2, table_sizes)
+
+    assert [load for _, load in sharded_mappings] == [110, 110]
+    assert shard_tables(sharded_mappings, table_sizes) == [{'HR.EMP', 'SALES.ITEMS'}, {'HR.DEPT', 'SALES.ORDERS'}]
+
+
+def test_sharding_keeps_the_tables_of_a_wildcard_together(config):
+    table_sizes = {'HR.EMP': 100, 'HR.DEPT': 60, 'SALES.ORDERS': 50, 'SALES.ITEMS': 10}
+    mappings = table_mappings(('HR', '%'), ('HR', 'EMP'), ('HR', 'DEPT'), ('SALES', 'ORDERS'), ('SALES', 'ITEMS'))
+
+    sharded_mappings = auto_dms_tasks.shard_table_mappings(mappings, 3, table_sizes)
+
+    tables = shard_tables(sharded_mappings, table_sizes)
+    assert tables == [{'HR.EMP', 'HR.DEPT'}, {'SALES.ORDERS'}, {'SALES.ITEMS'}]
+    assert [load for _, load in sharded_mappings] == [160, 50, 10]
+
+
+def test_sharding_keeps_overlapping_wildcards_together(config):
+    table_sizes = {'HR.EMP': 100, 'HR.DEPT': 60, 'SALES.EMP': 50, 'SALES.ITEMS': 10}
+    mappings = table_mappings(('HR', '%'), ('%', 'EMP'), ('SALES', 'ITEMS'))
+
+    sharded_mappings = auto_dms_tasks.shard_table_mappings(mappings, 3, table_sizes)
+
+    tables = shard_tables(sharded_mappings, table_sizes)
+    assert tables == [{'HR.EMP', 'HR.DEPT', 'SALES.EMP'}, {'SALES.ITEMS'}]
+
+
+def test_sharding_spreads_the_explicit_selections(config):
+    table_sizes = {'S.BIG': 20, 'HR.EMP': 10, 'HR.DEPT': 10}
+    rules = json.loads(table_mappings(('HR', 'EMP'), ('HR', 'DEPT')))['rules']
+    rules.append({'rule-type': 'selection', 'rule-id': '3', 'rule-name': '3', 'rule-action': 'explicit',
+                  'object-locator': {'schema-name': 'S', 'table-name': 'BIG'}})
+
+    sharded_mappings = auto_dms_tasks.shard_table_mappings(json.dumps({'rules': rules}), 2, table_sizes)
+
+    assert shard_tables(sharded_mappings, table_sizes) == [{'S.BIG'}, {'HR.EMP', 'HR.DEPT'}]
+    assert [load for _, load in sharded_mappings] == [20, 20]
+
+
+def test_table_stats_file_is_read_once_per_run(config):
+    config.table_stats_source = 'file'
+    with open(config.table_stats_file, 'w') as stats_file:
+        json.dump({'hr.emp': 100}, stats_file)
+
+    table_sizes = auto_dms_tasks.get_table_sizes('arn:aws:dms:us-east-1:123456789012:task:ONE')
+    os.remove(config.table_stats_file)
+
+    assert table_sizes == {'HR.EMP': 100}
+    assert auto_dms_tasks.get_table_sizes('arn:aws:dms:us-east-1:123456789012:task:TWO') is table_sizes
+
+
+def test_settings_validation_rejects_booleans(config):
+    problems = auto_dms_tasks.validate_task_settings({'FullLoadSettings': {'MaxFullLoadSubTasks': True}}, 'full-load')
+
+    assert problems == ['FullLoadSettings.MaxFullLoadSubTasks is True but must be an integer between 1 and 49']
+
+
+def test_tasks_not_cloned_do_not_fail_the_settings_validation(config):
+    config.task_settings_profiles = {'batch': {'TargetMetadata': {'BatchApplyEnabled': True}}}
+    config.default_task_settings_profile = 'batch'
+    client = build_account(config, 4)
+    source_arn = client.add_endpoint('other-src', 'Source')
+    target_arn = client.add_endpoint('other-tgt', 'Target')
+    client.add_task('prod-other-task', source_arn, target_arn, INSTANCE_ARN, 'full-load',
+                    table_mappings(('HR', 'EMP')), bench_dms_tasks.TASK_SETTINGS)
+    auto_dms_tasks.init_dms_client(client)
+
+    plan = auto_dms_tasks.build_plan()
+
+    assert sorted(entry['CurrentReplicationTaskIdentifier'] for entry in plan) == \
+        ['prod-bench-task-{0}'.format(idx) for idx in range(4)]
+
+
+def test_placement_spreads_the_full_loads_in_rounds(config):
+    client = build_account(config, 20)
+    config.use_instance_pool = 'Y'
+    config.replication_instance_pool = [client.add_replication_instance('pool-{0}'.format(idx)) for idx in range(2)]
+    auto_dms_tasks.init_dms_client(client)
+
+    placement = auto_dms_tasks.place_plan_entries(auto_dms_tasks.build_plan())
+
+    assert [instance['FullLoads'] for instance in placement.values()] == [10, 10]
+
+
+def test_new_tasks_are_started_without_wait_for_ready_tasks(config):
+    config.wait_for_ready_tasks = 'N'
+    config.start_new_tasks = 'Y'
+    client = build_account(config, 6, task_ready_delay=0.05)
+
+    results = auto_dms_tasks.main(client, fake_dms.FakeCloudWatchClient())
+
+    assert [result['StartStatus'] for result in results] == ['started'] * 6
+
+
+def test_plan_of_tasks_not_ready_in_time_stays_unfinished(config):
+    config.start_new_tasks = 'Y'
+    config.use_run_journal = 'Y'
+    config.ready_wait_timeout = 0.05
+    client = build_account(config, 4, task_ready_delay=0.5)
+
+    results = auto_dms_tasks.main(client, fake_dms.FakeCloudWatchClient())
+
+    assert [result['StartStatus'] for result in results] == ['not started'] * 4
+    assert not auto_dms_tasks.read_run_journal()['complete']
+
+    client.task_ready_delay = 0.0
+    time.sleep(0.5)
+    results = auto_dms_tasks.main(client, fake_dms.FakeCloudWatchClient())
+
+    assert [result['StartStatus'] for result in results] == ['started'] * 4
+    assert auto_dms_tasks.read_run_journal()['complete']
+
+
+def test_tasks_started_by_a_previous_run_hold_their_slot(config):
+    config.start_new_tasks = 'Y'
+    config.max_concurrent_full_loads_per_instance = 2
+    config.start_timeout = 0.2
+    client = build_account(config, 4, full_load_duration=3600)
+    auto_dms_tasks.init_dms_client(client)
+    auto_dms_tasks.init_cloudwatch_client(fake_dms.FakeCloudWatchClient())
+    plan = auto_dms_tasks.build_plan()
+    results = auto_dms_tasks.create_dms_tasks(plan)
+    auto_dms_tasks.wait_for_tasks_ready(results)
+    first_arn = results[0]['ReplicationTaskArn']
+    client.start_replication_task(ReplicationTaskArn=first_arn, StartReplicationTaskType='start-replication')
+
+    auto_dms_tasks.start_tasks_staggered(results, plan, started_arns={first_arn})
+
+    assert sorted(result['StartStatus'] for result in results) == ['not started'] * 2 + ['started'] * 2
+
+
+def test_fanout_jobs_read_the_cdc_latency_in_their_region(config):
+    config.start_new_tasks = 'Y'
+    client = build_account(config, 4)
+    regions = []
+
+    def cloudwatch_factory(region):
+        regions.append(region)
+        return fake_dms.FakeCloudWatchClient()
+    jobs = [{'aws_region': region, 'replication_instance_arn': INSTANCE_ARN, 'replicationtaskid_prefix': prefix}
+            for region, prefix in (('us-east-1', 'a-'), ('eu-west-1', 'b-'))]
+
+    auto_dms_tasks.run_fanout(jobs, lambda region: client, cloudwatch_factory)
+
+    assert sorted(regions) == ['eu-west-1', 'us-east-1']
+
+
+# Function to create the clones of CDC only tasks without starting them, returning the results and the plan
+def create_cdc_clones(config, size):
+    client = build_account(config, size)
+    for task in client.tasks.values():
+        task['MigrationType'] = 'cdc'
+    results = auto_dms_tasks.main(client)
+    config.max_concurrent_full_loads_per_instance = 1
+    config.cdc_settle_seconds = 3600
+    config.start_timeout = 0.2
+    return client, results, auto_dms_tasks.build_plan()
+
+
+def test_cdc_tasks_hold_their_slot_until_the_timer_without_latency(config):
+    client, results, plan = create_cdc_clones(config, 4)
+    auto_dms_tasks.init_cloudwatch_client(fake_dms.FakeCloudWatchClient())
+
+    auto_dms_tasks.start_tasks_staggered(results, plan)
+
+    assert sorted(result['StartStatus'] for result in results) == ['not started'] * 3 + ['started']
+
+
+def test_cdc_tasks_free_their_slot_once_caught_up(config):
+    client, results, plan = create_cdc_clones(config, 4)
+    cloudwatch = auto_dms_tasks.init_cloudwatch_client(fake_dms.FakeCloudWatchClient())
+    for result in results:
+        for metric_name in auto_dms_tasks.CDC_LATENCY_METRICS:
+            cloudwatch.set_task_metric('FAKEINSTANCE', result['ReplicationTaskArn'], metric_name, [5.0, 900.0])
+
+    auto_dms_tasks.start_tasks_staggered(results, plan)
+
+    assert [result['StartStatus'] for result in results] == ['started'] * 4
+
+
+def test_percentile_uses_the_nearest_rank(config):
+    assert auto_dms_tasks.percentile([1, 2], 50) == 1
+    assert auto_dms_tasks.percentile([3, 1, 2, 4], 50) == 2
+    assert auto_dms_tasks.percentile(list(range(1, 11)), 90) == 9
+    assert auto_dms_tasks.percentile(list(range(1, 11)), 99) == 10
+    assert auto_dms_tasks.percentile([5], 0) == 5
+    assert auto_dms_tasks.percentile([], 50) is None
+
+
+# Function to find the task of the fake account with the given identifier
+def task_arn_of(client, ReplicationTaskIdentifier):
+    return next(task_arn for task_arn, task in client.tasks.items()
+                if task['ReplicationTaskIdentifier'] == ReplicationTaskIdentifier)
+
+
+def test_comparison_pairs_the_shards_and_flags_the_regressions(config):
+    config.use_run_journal = 'Y'
+    config.use_task_sharding = 'Y'
+    config.task_shard_counts = {'prod-bench-task-0': 2}
+    client = build_account(config, 2)
+    old_arns = [task_arn_of(client, 'prod-bench-task-{0}'.format(idx)) for idx in range(2)]
+    client.tasks[old_arns[0]]['TableMappings'] = table_mappings(('S', 'A'), ('S', 'B'))
+    client.set_table_statistics(old_arns[0], {'S.A': 1000, 'S.B': 1000}, full_load_seconds=100)
+    client.set_table_statistics(old_arns[1], {'S.C': 1000}, full_load_seconds=10)
+    auto_dms_tasks.main(client)
+
+    shard_arns = [task_arn_of(client, 'bench-bench-task-0-shard-0{0}'.format(idx)) for idx in (1, 2)]
+    new_arn = task_arn_of(client, 'bench-bench-task-1')
+    client.set_table_statistics(shard_arns[0], {'S.A': 1000}, full_load_seconds=50)
+    client.set_table_statistics(shard_arns[1], {'S.B': 1000}, full_load_seconds=40)
+    client.set_table_statistics(new_arn, {'S.C': 1000}, full_load_seconds=20)
+    cloudwatch = fake_dms.FakeCloudWatchClient()
+    for task_arn, latencies in ((old_arns[0], [1, 2]), (shard_arns[0], [1]), (shard_arns[1], [2]),
+                                (old_arns[1], [10]), (new_arn, [30])):
+        cloudwatch.set_task_metric('FAKEINSTANCE', task_arn, 'CDCLatencyTarget', latencies)
+    config.run_comparison = 'Y'
+
+    report = auto_dms_tasks.main(client, cloudwatch)
+
+    assert [row['ReplicationTaskIdentifier'] for row in report] == ['prod-bench-task-0', 'prod-bench-task-1']
+    sharded, single = report
+    assert sharded['New']['Tasks'] == 2
+    assert sharded['New']['FullLoadRows'] == 2000
+    assert sharded['New']['FullLoadRowsPerSec'] == 40
+    assert sharded['Change']['FullLoadRowsPerSec'] == 100
+    assert sharded['New']['CDCLatencyTarget'] == sharded['Old']['CDCLatencyTarget'] == {'p50': 1, 'p90': 2, 'p99': 2}
+    assert sharded['Regressions'] == []
+    assert single['Change']['FullLoadRowsPerSec'] == -50
+    assert single['Regressions'] == ['FullLoadRowsPerSec', 'CDCLatencyTarget.p50', 'CDCLatencyTarget.p90',
+                                     'CDCLatencyTarget.p99']
+
+
+def test_watch_ignores_a_start_of_the_original_task(config):
+    client = build_account(config, 4)
+    auto_dms_tasks.init_dms_client(client)
+    state = auto_dms_tasks.WatchState()
+    assert len(auto_dms_tasks.run_watch_cycle(state)) == 4
+
+    original_arn = task_arn_of(client, 'prod-bench-task-0')
+    client.start_replication_task(ReplicationTaskArn=original_arn, StartReplicationTaskType='start-replication')
+
+    assert auto_dms_tasks.run_watch_cycle(state) == []
+    assert client.calls['ModifyReplicationTask'] == 0
+
+
+def test_watch_modifies_the_clone_of_a_changed_task(config):
+    client = build_account(config, 4)
+    auto_dms_tasks.init_dms_client(client)
+    state = auto_dms_tasks.WatchState()
+    auto_dms_tasks.run_watch_cycle(state)
+
+    client.modify_replication_task(ReplicationTaskArn=task_arn_of(client, 'prod-bench-task-0'),
+                                   TableMappings=table_mappings(('HR', 'EMP')))
+    results = auto_dms_tasks.run_watch_cycle(state)
+
+    assert [(result['ReplicationTaskIdentifier'], result['Result']) for result in results] == \
+        [('bench-bench-task-0', 'modified')]
+    assert client.tasks[task_arn_of(client, 'bench-bench-task-0')]['TableMappings'] == table_mappings(('HR', 'EMP'))
+
+
+def test_watch_modifies_the_clone_of_a_task_selected_by_name(config):
+    config.use_specific_tasks = 'Y'
+    config.task_names = ['prod-bench-task-0', 'prod-bench-task-1']
+    client = build_account(config, 4)
+    auto_dms_tasks.init_dms_client(client)
+    state = auto_dms_tasks.WatchState()
+    assert len(auto_dms_tasks.run_watch_cycle(state)) == 2
+
+    client.modify_replication_task(ReplicationTaskArn=task_arn_of(client, 'prod-bench-task-0'),
+                                   TableMappings=table_mappings(('HR', 'EMP')))
+    results = auto_dms_tasks.run_watch_cycle(state)
+
+    assert [(result['ReplicationTaskIdentifier'], result['Result']) for result in results] == \
+        [('bench-bench-task-0', 'modified')]
+    assert client.tasks[task_arn_of(client, 'bench-bench-task-0')]['TableMappings'] == table_mappings(('HR', 'EMP'))
+
+
+def test_watch_retries_a_failed_poll(config):
+    client = build_account(config, 4)
+    auto_dms_tasks.init_dms_client(client)
+    failing_arn = sorted(client.endpoints)[1]
+    client.failing_endpoints.add(failing_arn)
+    state = auto_dms_tasks.WatchState()
+    with pytest.raises(SystemExit):
+        auto_dms_tasks.run_watch_cycle(state)
+
+    client.failing_endpoints.clear()
+    auto_dms_tasks.connection_verdicts.clear()
+    results = auto_dms_tasks.run_watch_cycle(state)
+
+    assert [result['Result'] for result in results] == ['created'] * 4
+
+
+def test_watch_survives_a_transient_connection_error(config, monkeypatch):
+    config.watch_max_cycles = 2
+    config.watch_poll_interval = 0
+    client = build_account(config, 4)
+    auto_dms_tasks.init_dms_client(client)
+    monkeypatch.setattr(auto_dms_tasks.signal, 'signal', lambda signal_number, handler: None)
+    describe_replication_tasks = client.describe_replication_tasks
+    failures = [EndpointConnectionError(endpoint_url='https://dms.us-east-1.amazonaws.com')]
+
+    def flaky_describe_replication_tasks(**kwargs):
+        if failures:
+            raise failures.pop()
+        return describe_replication_tasks(**kwargs)
+    monkeypatch.setattr(client, 'describe_replication_tasks', flaky_describe_replication_tasks)
+
+    state = auto_dms_tasks.run_watch()
+
+    assert len(state.task_signatures) == 4
+    assert client.calls['CreateReplicationTask'] == 4
+
+
+def test_async_engine_creates_every_task(config):
+    config.use_async_engine = 'Y'
+    client = build_account(config, 40)
+
+    results = auto_dms_tasks.main(client)
+
+    assert {result['ReplicationTaskIdentifier'] for result in results} == \
+        {'bench-bench-task-{0}'.format(idx) for idx in range(40)}
+    assert [result['Result'] for result in results] == ['created'] * 40
+
+
+def test_async_engine_creates_nothing_when_a_connection_fails(config):
+    config.use_async_engine = 'Y'
+    client = build_account(config, 40)
+    client.failing_endpoints.add(sorted(client.endpoints)[-1])
+
+    with pytest.raises(SystemExit):
+        auto_dms_tasks.main(client)
+    assert client.calls['CreateReplicationTask'] == 0
+
+
+def test_async_engine_stops_on_a_failed_connection_poll(config):
+    config.use_async_engine = 'Y'
+    client = build_account(config, 40)
+
+    def describe_connections(**kwargs):
+        raise fake_dms.client_error(ClientError, 'AccessDeniedException', 'Access denied', 'DescribeConnections')
+    client.describe_connections = describe_connections
+
+    with pytest.raises(SystemExit):
+        auto_dms_tasks.main(client)
+    assert client.calls['CreateReplicationTask'] == 0
+
+
+def test_async_engine_falls_back_for_the_inventory_snapshot(config):
+    config.use_async_engine = 'Y'
+    config.use_inventory_snapshot = 'Y'
+    client = build_account(config, 8)
+
+    results = auto_dms_tasks.main(client)
+
+    assert [result['Result'] for result in results] == ['created'] * 8
+    assert os.path.exists(config.inventory_snapshot_file)
+
+
+# Function to clone the tasks of an account with the run journal, leaving the original tasks running, and switch the
+# configuration to the clean up
+def clone_for_cleanup(config, client, dry_run):
+    config.use_run_journal = 'Y'
+    auto_dms_tasks.main(client)
+    for task_arn, task in client.tasks.items():
+        if task['ReplicationTaskIdentifier'].startswith('prod-'):
+            client.start_replication_task(ReplicationTaskArn=task_arn, StartReplicationTaskType='start-replication')
+    config.run_cleanup = 'Y'
+    config.cleanup_dry_run = 'Y' if dry_run else 'N'
+
+
+# Function to get the identifiers of the tasks and endpoints left in a fake account
+def account_identifiers(client):
+    return ({task['ReplicationTaskIdentifier'] for task in client.tasks.values()},
+            {endpoint['EndpointIdentifier'] for endpoint in client.endpoints.values()})
+
+
+def test_cleanup_stops_and_deletes_the_superseded_tasks_then_the_old_endpoints(config):
+    client = build_account(config, 8)
+    clone_for_cleanup(config, client, dry_run=False)
+
+    tasks, endpoint_outcomes = auto_dms_tasks.main(client)
+
+    assert [task['Cleanup'] for task in tasks] == ['deleted'] * 8
+    assert client.calls['StopReplicationTask'] == 8
+    assert sorted(endpoint_outcomes.values()) == ['deleted'] * 4
+    task_ids, endpoint_ids = account_identifiers(client)
+    assert task_ids == {'bench-bench-task-{0}'.format(idx) for idx in range(8)}
+    assert endpoint_ids == {'bench-{0}-new-{1}'.format(side, idx) for side in ('src', 'tgt') for idx in range(2)}
+
+
+def test_cleanup_deletes_the_old_endpoints_of_pattern_rules(config):
+    client = build_account(config, 8)
+    config.src_endpoint_transforms = {'bench-src-old-*': 'bench-src-new-*'}
+    config.tgt_endpoint_transforms = {r're:bench-tgt-old-(\d+)': r'bench-tgt-new-\1'}
+    clone_for_cleanup(config, client, dry_run=False)
+
+    tasks, endpoint_outcomes = auto_dms_tasks.main(client)
+
+    assert [task['Cleanup'] for task in tasks] == ['deleted'] * 8
+    assert sorted(endpoint_outcomes.values()) == ['deleted'] * 4
+    assert account_identifiers(client)[1] == \
+        {'bench-{0}-new-{1}'.format(side, idx) for side in ('src', 'tgt') for idx in range(2)}
+
+
+def test_cleanup_dry_run_changes_nothing(config):
+    client = build_account(config, 8)
+    clone_for_cleanup(config, client, dry_run=True)
+    before = account_identifiers(client)
+    client.calls.clear()
+
+    tasks, endpoint_outcomes = auto_dms_tasks.main(client)
+
+    assert [task['Cleanup'] for task in tasks] == ['dry run'] * 8
+    assert sorted(endpoint_outcomes.values()) == ['dry run'] * 4
+    assert account_identifiers(client) == before
+    assert not any(operation.startswith(('Stop', 'Delete')) for operation in client.calls)
+
+
+def test_cleanup_keeps_the_task_whose_existing_clone_does_not_match(config):
+    client = build_account(config, 8)
+    original = client.tasks[task_arn_of(client, 'prod-bench-task-0')]
+    client.add_task('bench-bench-task-0', original['SourceEndpointArn'], original['TargetEndpointArn'],
+                    'arn:aws:dms:us-east-1:123456789012:rep:OTHERINSTANCE', 'full-load-and-cdc',
+                    original['TableMappings'], original['ReplicationTaskSettings'])
+    clone_for_cleanup(config, client, dry_run=False)
+
+    tasks, endpoint_outcomes = auto_dms_tasks.main(client)
+
+    assert sorted(task['ReplicationTaskIdentifier'] for task in tasks) == \
+        sorted('prod-bench-task-{0}'.format(idx) for idx in range(1, 8))
+    assert 'prod-bench-task-0' in account_identifiers(client)[0]
+    assert len(endpoint_outcomes) == 2
+
+
+def test_rules_with_a_backreference_are_matched_on_their_own(config):
+    rules = auto_dms_tasks.RuleSet('task_names', [('re:x.*', 'first'), (r're:(ab)-\1', 'repeated')])
+
+    assert rules.lookup('ab-ab') == 'repeated'
+    assert rules.lookup('ab-cd') is None
+    assert rules.lookup('xab') == 'first'
+
+
+def test_rules_may_reuse_a_group_name(config):
+    rules = auto_dms_tasks.RuleSet('src_endpoint_transforms', [(r're:(?P<env>dev)-(\w+)', r'\2-test'),
+                                                               (r're:(?P<env>prd)-(\w+)', r'\2-live')])
+
+    assert rules.rewrite('dev-sales') == 'sales-test'
+    assert rules.rewrite('prd-sales') == 'sales-live'
+
+
+def test_rules_may_set_an_inline_flag(config):
+    rules = auto_dms_tasks.RuleSet('task_names', [('re:hr-.*', 'hr'), ('re:(?i)sales-.*', 'sales')])
+
+    assert rules.lookup('SALES-orders') == 'sales'
+    assert rules.lookup('hr-emp') == 'hr'
+
+
+def test_first_rule_wins_across_combined_and_separate_rules(config):
+    rules = auto_dms_tasks.RuleSet('task_names', [('hr-*', 'glob'), ('re:(?i)HR-.*', 'flagged'), ('re:sales-.*', 'plain'),
+                                                  ('re:(?i)SALES-EU', 'flagged'), ('sales-eu', 'exact')])
+
+    assert rules.lookup('hr-emp') == 'glob'
+    assert rules.lookup('HR-emp') == 'flagged'
+    assert rules.lookup('sales-eu') == 'plain'
+    assert rules.lookup('Sales-eu') == 'flagged'
+
+
+def test_invalid_rule_names_itself(config, capsys):
+    config.src_endpoint_transforms = {'re:(dev': 'test'}
+
+    with pytest.raises(SystemExit):
+        auto_dms_tasks.compile_transform_rules()
+    assert 'Rule re:(dev of src_endpoint_transforms' in capsys.readouterr().out
+
+
+def test_glob_matching_the_text_of_a_later_glob_does_not_shadow_it(config):
+    config.src_endpoint_transforms = {'db-?-old': 'db-?-new', 'db-*-old': 'db-*-new'}
+
+    rules = auto_dms_tasks.compile_transform_rules()
+
+    assert rules.endpoints['Source'].shadowed_rules() == []
+    assert rules.endpoints['Source'].rewrite('db-abc-old') == 'db-abc-new'
+
+
+def test_regex_matching_the_text_of_a_later_glob_does_not_shadow_it(config):
+    config.src_endpoint_transforms = {'re:app.x': 'first', 'app*x': 'second'}
+
+    rules = auto_dms_tasks.compile_transform_rules()
+
+    assert rules.endpoints['Source'].shadowed_rules() == []
+    assert rules.endpoints['Source'].rewrite('app-long-x') == 'second'
+
+
+def test_glob_covering_a_later_glob_shadows_it(config):
+    config.src_endpoint_transforms = {'db-*': 'db-*-new', 'db-?-old': 'db-?-new'}
+
+    with pytest.raises(SystemExit):
+        auto_dms_tasks.compile_transform_rules()